@@ -1,131 +1,418 @@
-from ultralytics import YOLO
-from deep_sort_realtime.deepsort_tracker import DeepSort
 import cv2
+import os
+import threading
+import time
 import numpy as np
+from carevision_comum import metricas
+from carevision_comum.metricas import cronometro
+from escalonador import EscalonadorInferencia
+from pipeline import FilaLimitada, BLOQUEAR, DESCARTAR_ANTIGO, fonte_ao_vivo
+from compensacao import estimar_movimento
+from estado_tracks import EstadoTracks
+from carevision_comum.backends import carregar_modelo, ler_input_size
+from carevision_comum.fontes import abrir_fonte
+from carevision_comum.sob_demanda import SobDemanda, aquecer_modelo
+from analise import (detectar_e_trackear_veiculos, detectar_e_trackear_com_porta,
+                     detectar_e_trackear_em_ladrilhos, detectar_e_trackear_controlado, processar_tracks,
+                     criar_tracker, LIMIAR_VELOCIDADE, CLASSES_VEICULOS, MAX_AGE)
+from porta_movimento import PortaMovimento
+from carevision_comum.ladrilhos import DetectorLadrilhado
+from controle_fps import ControladorFPS
+from clipes import BufferClipes, GravadorClipes
+from carevision_comum.armazenamento import ArmazemEventos
+from carevision_comum.envio_alerta import DespachanteAlertas, ler_destinos
 
-model_yolo = YOLO("Modelo-PréTreinado/best.pt")
-FRAMES_PARADO = 10
-LIMIAR_VELOCIDADE = 1.0
-CLASSES_VEICULOS = [3, 4, 5, 8, 9]
-
-tracker = DeepSort(max_age=30)
-historico = {}  # {track_id: {'pos': (x, y), 'parado': 0}}
-
-# === FUNÇÃO DETECÇÃO + TRACKING ===
-def detectar_e_trackear_veiculos(frame, model_yolo, tracker, classes_veiculos):
-    results = model_yolo.predict(source=frame, conf=0.5, classes=classes_veiculos, stream=True)
-    detections = []
-    for r in results:
-        for box in r.boxes:
-            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-            conf = float(box.conf[0])
-            cls = int(box.cls[0])
-            if cls in classes_veiculos:
-                detections.append(([x1, y1, x2 - x1, y2 - y1], conf, cls))
-    tracks = tracker.update_tracks(detections, frame=frame)
-    return tracks
-
-def compensar_movimento_camera(prev_gray, curr_gray):
+# "pytorch", ou "onnx"/"openvino" nas máquinas sem GPU (exportado e validado na primeira execução)
+BACKEND_INFERENCIA = "pytorch"
+CAMINHO_MODELO = os.environ.get("CAREVISION_MODELO", "Modelo-PréTreinado/best.pt")
+# "denso" (referência), "denso_reduzido", "lucas_kanade", "afim" ou "homografia"
+METODO_COMPENSACAO = "denso"
+# Carrega e aquece o modelo numa thread enquanto o menu espera a escolha do usuário
+AQUECER_EM_SEGUNDO_PLANO = True
+# Clipes de evento: segundos guardados antes/depois de um "VEICULO PARADO!" e teto de memória por câmera
+SEGUNDOS_ANTES_EVENTO = 10.0
+SEGUNDOS_DEPOIS_EVENTO = 5.0
+MEMORIA_CLIPES_MB = 64
+# Vídeo de drone em alta resolução (opção 1l): "adaptativo" só roda os ladrilhos com detecção recente, "todos" roda todos
+MODO_LADRILHOS = "adaptativo"
+# Controle de FPS do rodar_video com fonte ao vivo (câmera/stream): passo de inferência, imgsz e máximo
+# de detecções se ajustam para manter o FPS alvo (None = FPS da fonte) e a latência máxima de um frame
+# inferido. Arquivos gravados nunca passam por ele: todo frame é analisado, com o mesmo resultado do
+# rodar_video_pipeline
+CONTROLE_FPS = True
+FPS_ALVO = None
+LATENCIA_MAXIMA_MS = 200
+# "deepsort", "deepsort_cache" (mesmo DeepSort, só calcula embedding de detecção nova, ambígua ou com
+# embedding velho) ou "leve" (só movimento: bem mais rápido em CPU com muitos veículos, sem reidentificação)
+TRACKER = os.environ.get("CAREVISION_TRACKER", "deepsort_cache")
+# Webhooks que recebem os eventos de veículo parado (URLs separadas por vírgula); vazio = não envia
+DESTINOS_ALERTA = ler_destinos(os.environ.get("CAREVISION_WEBHOOKS"))
+
+# Modelo e tracker só são construídos no primeiro uso (ou pelo aquecimento)
+model_yolo = SobDemanda(lambda: carregar_modelo(CAMINHO_MODELO, BACKEND_INFERENCIA), "modelo")
+tracker = SobDemanda(lambda: criar_tracker(TRACKER), "tracker")
+if os.environ.get("CAREVISION_CARREGAMENTO") == "imediato":
+    # Comportamento antigo, usado como referência pelo perfil_inicializacao.py
+    model_yolo.obter()
+    tracker.obter()
+
+def aquecer_em_segundo_plano():
+    model_yolo.aquecer_em_segundo_plano(lambda modelo: aquecer_modelo(modelo, ler_input_size()))
+    tracker.aquecer_em_segundo_plano()
+
+estado_tracks = EstadoTracks(LIMIAR_VELOCIDADE, max_age=MAX_AGE)
+
+# === ANÁLISE DE UM FRAME (compensação + detecção + tracking + desenho) ===
+def analisar_frame(frame, prev_gray, media_flow, caixas=None, porta=None, ao_parar=None, ao_atualizar=None,
+                   ladrilhos=None, controle=None, ao_detectar=None):
+    with cronometro("estagio", estagio="compensacao"):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if prev_gray is not None:
+            media_flow = estimar_movimento(prev_gray, gray, METODO_COMPENSACAO, caixas)
+
+    if ladrilhos is not None:
+        tracks = detectar_e_trackear_em_ladrilhos(frame, ladrilhos, tracker, ao_detectar)
+    elif controle is not None:
+        tracks = detectar_e_trackear_controlado(frame, model_yolo, tracker, CLASSES_VEICULOS, controle, ao_detectar)
+    elif porta is None:
+        tracks = detectar_e_trackear_veiculos(frame, model_yolo, tracker, CLASSES_VEICULOS, ao_detectar)
+    else:
+        tracks = detectar_e_trackear_com_porta(frame, model_yolo, tracker, CLASSES_VEICULOS, porta, ao_detectar)
+
+    caixas = processar_tracks(frame, tracks, media_flow, estado_tracks, ao_parar, ao_atualizar)
+    return gray, media_flow, caixas
+
+def criar_despachante():
+    return DespachanteAlertas(DESTINOS_ALERTA) if DESTINOS_ALERTA else None
+
+def criar_registro_eventos(gravador, armazem, camera, despachante=None):
     """
-    Calcula o movimento médio global entre dois frames (optical flow).
-    Retorna vetor (dx, dy) a ser subtraído do movimento dos objetos.
+    Buffer de clipes da câmera e os callbacks que guardam detecções, tracks e
+    eventos no armazém e, com `despachante`, mandam os eventos para os webhooks.
     """
-    flow = cv2.calcOpticalFlowFarneback(prev_gray, curr_gray, None,
-                                        pyr_scale=0.5, levels=3, winsize=15,
-                                        iterations=3, poly_n=5, poly_sigma=1.2, flags=0)
-    media_flow = np.mean(flow.reshape(-1, 2), axis=0)
-    return media_flow
+    clipes = BufferClipes(gravador, camera, SEGUNDOS_ANTES_EVENTO, SEGUNDOS_DEPOIS_EVENTO,
+                          memoria_max=MEMORIA_CLIPES_MB * 1024 * 1024)
+
+    def ao_parar(track_id, caixa):
+        clipes.disparar({"tipo": "veiculo_parado", "track_id": track_id, "caixa": caixa})
+        id_evento = armazem.registrar_evento(camera, "veiculo_parado", track_id=track_id, caixa=caixa)
+        if despachante is not None:
+            # Só enfileira: o envio (e as novas tentativas) acontece na thread do despachante
+            despachante.enviar({"id": id_evento, "tipo": "veiculo_parado", "camera": str(camera),
+                                "track_id": str(track_id), "caixa": list(caixa)})
+        print(f"[evento] Veículo {track_id} parado em {caixa}; gravando clipe")
+
+    def ao_atualizar(track_ids, caixas, velocidades, parados):
+        armazem.registrar_tracks(camera, time.time(), track_ids, caixas, velocidades, parados)
+
+    def ao_detectar(deteccoes):
+        armazem.registrar_deteccoes(camera, time.time(), deteccoes)
+
+    return clipes, ao_parar, ao_atualizar, ao_detectar
+
+def relogio_da_fonte(cap, fonte):
+    """
+    Tempo de cada frame para o BufferClipes, sempre de um relógio só por fonte:
+    arquivos usam o do próprio vídeo (índice do frame / FPS; o POS_MSEC vale 0
+    no primeiro frame e nem todo backend o preenche), câmeras e streams o do
+    sistema (None). Misturar os dois estraga a poda por tempo do buffer.
+    """
+    if fonte_ao_vivo(fonte):
+        return lambda n_frame: None
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    return lambda n_frame: n_frame / fps
+
+def criar_controle(cap):
+    """
+    Chamado depois do primeiro frame: um stream (FonteStream) só conhece o FPS
+    depois de conectar. Sem FPS_ALVO, o orçamento segue o FPS medido do stream.
+    """
+    fps_fonte = None
+    if FPS_ALVO is None and hasattr(cap, "fps"):
+        fps_fonte = lambda: cap.fps
+    fps_alvo = FPS_ALVO or cap.get(cv2.CAP_PROP_FPS) or 30.0
+    return ControladorFPS(fps_alvo, LATENCIA_MAXIMA_MS / 1000, fps_fonte=fps_fonte)
 
 # === FUNÇÃO DE VÍDEO ===
-def rodar_video(video_path):
-    cap = cv2.VideoCapture(video_path)
+def rodar_video(video_path, usar_porta=False, usar_ladrilhos=False):
+    """
+    `usar_porta=True` liga a PortaMovimento (só faz sentido com câmera fixa):
+    frames sem mudança não passam pelo YOLO. `usar_ladrilhos=True` roda o YOLO
+    em ladrilhos do tamanho de entrada do modelo, para veículos pequenos em
+    vídeo de drone 4K. Nos outros casos, com fonte ao vivo, o ControladorFPS
+    (CONTROLE_FPS) cuida de não ficar para trás da fonte; um arquivo não tem
+    pressa e tem todos os frames analisados.
+    """
+    cap = abrir_fonte(video_path)
     prev_gray = None
     media_flow = np.array([0, 0])
+    caixas = None
+    porta = PortaMovimento() if usar_porta else None
+    ladrilhos = None
+    if usar_ladrilhos:
+        ladrilhos = DetectorLadrilhado(model_yolo, CLASSES_VEICULOS, ler_input_size(),
+                                       adaptativo=MODO_LADRILHOS == "adaptativo")
+    controle = None
+    usar_controle = CONTROLE_FPS and fonte_ao_vivo(video_path) and not usar_porta and not usar_ladrilhos
+    gravador = GravadorClipes()
+    armazem = ArmazemEventos()
+    despachante = criar_despachante()
+    clipes, ao_parar, ao_atualizar, ao_detectar = criar_registro_eventos(
+        gravador, armazem, os.path.splitext(os.path.basename(str(video_path)))[0], despachante)
+    tempo_do_frame = relogio_da_fonte(cap, video_path)
+    n_frame = 0
     while cap.isOpened():
-        ret, frame = cap.read()
+        with cronometro("estagio", estagio="decodificacao"):
+            ret, frame = cap.read()
         if not ret:
             break
-    
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        if prev_gray is not None:
-            media_flow = compensar_movimento_camera(prev_gray, gray)
-        prev_gray = gray
-
-        tracks = detectar_e_trackear_veiculos(frame, model_yolo, tracker, CLASSES_VEICULOS)
-
-        for track in tracks:
-                    if not track.is_confirmed():
-                        continue
-                    track_id = track.track_id
-                    ltrb = track.to_ltrb()
-                    x1, y1, x2, y2 = map(int, ltrb)
-                    cx, cy = int((x1 + x2) / 2), int((y1 + y2) / 2)
-
-                    # Calcular velocidade
-                    if track_id in historico:
-                        px, py = historico[track_id]['pos']
-                        dx = (cx - px) - media_flow[0]
-                        dy = (cy - py) - media_flow[1]
-                        velocidade = np.linalg.norm([dx, dy])
-                        if velocidade < LIMIAR_VELOCIDADE:
-                            historico[track_id]['parado'] += 1
-                        else:
-                            historico[track_id]['parado'] = 0
-                    else:
-                        velocidade = -1
-                        historico[track_id] = {'pos': (cx, cy), 'parado': 0}
-
-                    historico[track_id]['pos'] = (cx, cy)
-
-                    # Desenhar caixas e alertas
-                    cor = (0, 255, 0)
-                    if historico[track_id]['parado'] >= FRAMES_PARADO:
-                        cor = (0, 0, 255)
-                        cv2.putText(frame, "VEICULO PARADO!", (x1, y1 - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, cor, 2)
-
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), cor, 2)
-                    cv2.putText(frame, f"ID {track_id} V:{velocidade:.1f}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, cor, 2)
-
-        cv2.imshow("YOLO + Rastreamento + Compensação Drone", frame)        
+        t_captura = time.perf_counter()
+        if usar_controle and controle is None:
+            controle = criar_controle(cap)
+
+        prev_gray, media_flow, caixas = analisar_frame(frame, prev_gray, media_flow, caixas, porta,
+                                                       ao_parar, ao_atualizar, ladrilhos, controle, ao_detectar)
+        clipes.adicionar(frame, tempo_do_frame(n_frame))
+        n_frame += 1
+
+        metricas.desenhar_overlay(frame)
+        with cronometro("estagio", estagio="exibicao"):
+            cv2.imshow("YOLO + Rastreamento + Compensação Drone", frame)
+        metricas.observar("latencia_captura_exibicao", time.perf_counter() - t_captura)
+        if controle is not None:
+            controle.fim_frame(t_captura)
+
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+
+    cap.release()
+    cv2.destroyAllWindows()
+    clipes.finalizar()
+    gravador.parar()
+    armazem.fechar()
+    if despachante is not None:
+        despachante.fechar()
+    if gravador.gravados:
+        print(f"Clipes de evento gravados: {len(gravador.gravados)} em {gravador.pasta}")
+    if porta is not None:
+        imprimir_estatisticas_porta(porta)
+    imprimir_estatisticas_embeddings()
+    if controle is not None:
+        stats = controle.estatisticas()
+        print(f"Controle de FPS: {stats['degradacoes']} degradação(ões), {stats['recuperacoes']} recuperação(ões); "
+              f"final: passo {stats['passo']}, imgsz {stats['imgsz']}, "
+              f"max_deteccoes {stats['max_deteccoes'] or 'sem limite'}")
+    if ladrilhos is not None:
+        stats = ladrilhos.estatisticas()
+        print(f"Ladrilhos: {stats['ladrilhos_por_frame']:.1f} de {stats['ladrilhos']} por frame "
+              f"({stats['fracao_rodada']:.0%})")
+
+def imprimir_estatisticas_embeddings():
+    # Só o tracker "deepsort_cache" reaproveita embeddings
+    if TRACKER != "deepsort_cache" or not tracker.carregado():
+        return
+    stats = tracker.estatisticas()
+    print(f"Embeddings: {stats['taxa_reuso']:.1%} reaproveitados ({stats['reaproveitados']} de {stats['deteccoes']}), "
+          f"~{stats['segundos_economizados']:.1f} s de CNN economizados")
+
+def imprimir_estatisticas_porta(porta):
+    stats = porta.estatisticas()
+    print(f"Inferência: {stats['total']} frames | pulados {stats['fracao_pulada']:.1%} | "
+          f"recortados {stats['fracao_recortada']:.1%} | completos {stats['completo']}")
+
+# === VÍDEO EM PIPELINE (leitura / análise / exibição em threads separadas) ===
+def rodar_video_pipeline(fonte, ao_vivo=None, capacidade=4):
+    """
+    Mesmo processamento do rodar_video, mas com leitura, análise e exibição
+    ligadas por filas limitadas. Arquivos usam filas que bloqueiam (resultado
+    idêntico ao modo sequencial); fontes ao vivo descartam o frame mais antigo,
+    então a análise sempre trabalha no frame mais recente.
+    """
+    if ao_vivo is None:
+        ao_vivo = fonte_ao_vivo(fonte)
+    if ao_vivo:
+        fila_frames = FilaLimitada(1, DESCARTAR_ANTIGO, nome="frames")
+        fila_exibicao = FilaLimitada(1, DESCARTAR_ANTIGO, nome="exibicao")
+    else:
+        fila_frames = FilaLimitada(capacidade, BLOQUEAR, nome="frames")
+        fila_exibicao = FilaLimitada(capacidade, BLOQUEAR, nome="exibicao")
+
+    cap = abrir_fonte(fonte)
+
+    def leitor():
+        while cap.isOpened():
+            with cronometro("estagio", estagio="decodificacao"):
+                ret, frame = cap.read()
+            # Cada item leva o instante da captura para medir a latência até a exibição
+            if not ret or not fila_frames.colocar((frame, time.perf_counter())):
+                break
+        fila_frames.fechar()
+
+    def analise():
+        prev_gray = None
+        media_flow = np.array([0, 0])
+        caixas = None
+        while True:
+            item = fila_frames.retirar()
+            if item is None:
+                break
+            frame, t_captura = item
+            prev_gray, media_flow, caixas = analisar_frame(frame, prev_gray, media_flow, caixas)
+            if not fila_exibicao.colocar((frame, t_captura)):
+                break
+        fila_frames.fechar()
+        fila_exibicao.fechar()
+
+    thread_leitor = threading.Thread(target=leitor, daemon=True)
+    thread_analise = threading.Thread(target=analise, daemon=True)
+    thread_leitor.start()
+    thread_analise.start()
 
+    # A exibição fica na thread principal (exigência do HighGUI)
+    while True:
+        item = fila_exibicao.retirar()
+        if item is None:
+            break
+        frame, t_captura = item
+        metricas.desenhar_overlay(frame)
+        with cronometro("estagio", estagio="exibicao"):
+            cv2.imshow("YOLO + Rastreamento + Compensação Drone", frame)
+        metricas.observar("latencia_captura_exibicao", time.perf_counter() - t_captura)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
+    fila_exibicao.fechar()
+    fila_frames.fechar()
+    thread_analise.join()
+    thread_leitor.join(timeout=1.0)
     cap.release()
     cv2.destroyAllWindows()
+    print(f"Frames descartados: leitura {fila_frames.descartados} | exibição {fila_exibicao.descartados}")
 
 # === FUNÇÃO DE WEBCAM ===
 def rodar_webcam():
     cap = cv2.VideoCapture(0)
+    # Webcam é fixa: a porta de movimento evita rodar o YOLO com a cena parada
+    porta = PortaMovimento()
+    prev_gray = None
+    media_flow = np.array([0, 0])
+    caixas = None
+    gravador = GravadorClipes()
+    armazem = ArmazemEventos()
+    despachante = criar_despachante()
+    clipes, ao_parar, ao_atualizar, ao_detectar = criar_registro_eventos(gravador, armazem, "webcam", despachante)
 
     while True:
         ret, frame = cap.read()
         if not ret:
             break
 
-
-        results = model_yolo.predict(source=frame, conf=0.5, stream=True)
+        prev_gray, media_flow, caixas = analisar_frame(frame, prev_gray, media_flow, caixas, porta,
+                                                       ao_parar, ao_atualizar, ao_detectar=ao_detectar)
+        clipes.adicionar(frame)
+        cv2.imshow("YOLO + Rastreamento - Webcam", frame)
 
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
     cap.release()
     cv2.destroyAllWindows()
+    clipes.finalizar()
+    gravador.parar()
+    armazem.fechar()
+    if despachante is not None:
+        despachante.fechar()
+    imprimir_estatisticas_porta(porta)
+    imprimir_estatisticas_embeddings()
+
+# === VÁRIAS FONTES COM INFERÊNCIA EM LOTE ===
+def rodar_multiplas_fontes(fontes, tamanho_lote=8, espera_max=0.02):
+    """
+    Lê um frame de cada fonte por ciclo e manda todos para o escalonador,
+    que roda um único predict em lote. Cada fonte tem tracker e estado de tracks próprios.
+    """
+    escalonador = EscalonadorInferencia(model_yolo, CLASSES_VEICULOS, tamanho_lote, espera_max)
+    caps = {}
+    estados = {}
+    prev_grays = {}
+    caixas = {}
+    for i, fonte in enumerate(fontes):
+        caps[i] = abrir_fonte(fonte)
+        escalonador.registrar_camera(i, criar_tracker(TRACKER))
+        estados[i] = EstadoTracks(LIMIAR_VELOCIDADE, max_age=MAX_AGE)
+        caixas[i] = None
+    escalonador.iniciar()
+
+    try:
+        while caps:
+            pedidos = {}
+            flows = {}
+            for i, cap in list(caps.items()):
+                ret, frame = cap.read()
+                if not ret:
+                    cap.release()
+                    del caps[i]
+                    continue
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                flows[i] = np.array([0, 0])
+                if i in prev_grays:
+                    flows[i] = estimar_movimento(prev_grays[i], gray, METODO_COMPENSACAO, caixas[i])
+                prev_grays[i] = gray
+                pedidos[i] = escalonador.enviar(i, frame)
+
+            for i, pedido in pedidos.items():
+                tracks = pedido.esperar()
+                caixas[i] = processar_tracks(pedido.frame, tracks, flows[i], estados[i])
+                cv2.imshow(f"YOLO em lote - Fonte {i + 1}", pedido.frame)
+
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    finally:
+        escalonador.parar()
+        for cap in caps.values():
+            cap.release()
+        cv2.destroyAllWindows()
+
+    stats = escalonador.estatisticas()
+    print(f"Throughput: {stats['fps']:.1f} FPS ({stats['frames']} frames, lote médio {stats['lote_medio']:.1f})")
+    for i, lat in stats['cameras'].items():
+        print(f"Fonte {i + 1}: p50 {lat['p50_ms']:.1f} ms | p99 {lat['p99_ms']:.1f} ms")
 
 # === INTERFACE DE USUÁRIO ===
 def iniciar_sess():
     print("Escolha uma opção:")
     print("1 - Rodar vídeo gravado")
+    print("1p - Rodar vídeo gravado de câmera fixa (pula o YOLO quando a cena está parada)")
+    print("1l - Rodar vídeo de drone em alta resolução (YOLO em ladrilhos)")
     print("2 - Usar webcam")
+    print("3 - Várias fontes (inferência em lote)")
+    print("4 - Vídeo ou câmera em pipeline (leitura/análise/exibição paralelas)")
 
-    numero = input("Digite 1 ou 2: ")
+    numero = input("Digite 1, 2, 3 ou 4: ")
 
     if numero == "1":
-        caminho_video = input("Digite o caminho do vídeo (ex: video.mp4): ")
+        caminho_video = input("Digite o caminho do vídeo ou a URL do stream (ex: video.mp4, rtsp://...): ")
         rodar_video(caminho_video)
+    elif numero == "1p":
+        caminho_video = input("Digite o caminho do vídeo (ex: video.mp4): ")
+        rodar_video(caminho_video, usar_porta=True)
+    elif numero == "1l":
+        caminho_video = input("Digite o caminho do vídeo ou a URL do stream (ex: video_4k.mp4): ")
+        rodar_video(caminho_video, usar_ladrilhos=True)
     elif numero == "2":
         rodar_webcam()
+    elif numero == "3":
+        entradas = input("Digite as fontes separadas por vírgula (ex: 0,video.mp4,rtsp://...): ")
+        fontes = [int(f) if f.strip().isdigit() else f.strip() for f in entradas.split(",") if f.strip()]
+        rodar_multiplas_fontes(fontes)
+    elif numero == "4":
+        fonte = input("Digite o caminho do vídeo, a URL do stream ou o índice da câmera: ").strip()
+        rodar_video_pipeline(int(fonte) if fonte.isdigit() else fonte)
     else:
         print("Opção inválida.")
 
-iniciar_sess()
\ No newline at end of file
+if __name__ == "__main__":
+    metricas.configurar_pelo_ambiente()
+    if AQUECER_EM_SEGUNDO_PLANO:
+        aquecer_em_segundo_plano()
+    iniciar_sess()
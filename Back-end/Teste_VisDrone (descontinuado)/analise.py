@@ -0,0 +1,162 @@
+import cv2
+import numpy as np
+from escalonador import extrair_deteccoes
+from porta_movimento import PULAR, COMPLETO, sobrepoe
+from carevision_comum.metricas import cronometro
+
+FRAMES_PARADO = 10
+LIMIAR_VELOCIDADE = 1.0
+CLASSES_VEICULOS = [3, 4, 5, 8, 9]
+MAX_AGE = 30
+# "deepsort" (movimento + aparência), "deepsort_cache" (o mesmo, reaproveitando embeddings entre
+# frames: cache_embeddings) ou "leve" (tracker_leve: só movimento, sem CNN por detecção)
+TRACKERS = ("deepsort", "deepsort_cache", "leve")
+
+def criar_tracker(tipo="deepsort", max_age=MAX_AGE):
+    if tipo == "leve":
+        from tracker_leve import TrackerLeve
+        return TrackerLeve(max_age=max_age)
+    if tipo not in TRACKERS:
+        raise ValueError(f"Tracker desconhecido: {tipo} (use um de {TRACKERS})")
+    # O import do deep_sort traz o torch junto: só acontece quando o tracker é usado
+    from deep_sort_realtime.deepsort_tracker import DeepSort
+    if tipo == "deepsort_cache":
+        from cache_embeddings import DeepSortComCache
+        return DeepSortComCache(DeepSort(max_age=max_age))
+    return DeepSort(max_age=max_age)
+
+# === FUNÇÃO DETECÇÃO + TRACKING ===
+def detectar_veiculos(frame, model_yolo, classes_veiculos, imgsz=None):
+    # Sem imgsz o predict usa o tamanho com que o modelo foi treinado
+    opcoes = {"imgsz": imgsz} if imgsz else {}
+    with cronometro("estagio", estagio="predict"):
+        results = model_yolo.predict(source=frame, conf=0.5, classes=classes_veiculos, stream=True, **opcoes)
+        detections = []
+        for r in results:
+            detections.extend(extrair_deteccoes(r, classes_veiculos))
+    return detections
+
+def atualizar_tracker(tracker, detections, frame, ao_detectar=None):
+    # `ao_detectar(detections)` recebe as detecções do frame antes do tracker (ex.: armazém)
+    if ao_detectar is not None:
+        ao_detectar(detections)
+    with cronometro("estagio", estagio="tracker"):
+        return tracker.update_tracks(detections, frame=frame)
+
+def prever_tracker(tracker):
+    """
+    Frame em que o YOLO não rodou: os tracks andam só pela predição do Kalman.
+    Um update_tracks com lista vazia contaria o frame como perdido e apagaria
+    os tracks tentativos, e um veículo novo nunca chegaria ao n_init.
+    """
+    with cronometro("estagio", estagio="tracker"):
+        if hasattr(tracker, "prever_tracks"):
+            return tracker.prever_tracks()
+        return prever_deepsort(tracker)
+
+def prever_deepsort(deepsort):
+    # O Tracker interno faz a predição sem a etapa de atualização. O DeepSort só casa por IoU
+    # tracks com time_since_update <= 1, então o frame sem inferência não entra nessa contagem
+    deepsort.tracker.predict()
+    for track in deepsort.tracker.tracks:
+        track.time_since_update -= 1
+    return list(deepsort.tracker.tracks)
+
+def detectar_e_trackear_veiculos(frame, model_yolo, tracker, classes_veiculos, ao_detectar=None):
+    # `tracker` é qualquer backend de criar_tracker: todos têm o update_tracks do DeepSort
+    detections = detectar_veiculos(frame, model_yolo, classes_veiculos)
+    tracks = atualizar_tracker(tracker, detections, frame, ao_detectar)
+    return tracks
+
+def detectar_e_trackear_com_porta(frame, model_yolo, tracker, classes_veiculos, porta, ao_detectar=None):
+    """
+    Igual ao detectar_e_trackear_veiculos, mas só roda o YOLO onde a PortaMovimento
+    viu mudança desde a última inferência.
+    """
+    modo, roi = porta.decidir(frame)
+    if modo == PULAR:
+        # Cena estática: sem YOLO, e as detecções da última inferência continuam valendo.
+        # Uma lista vazia contaria como frame perdido e apagaria os tracks tentativos.
+        # Não são detecções novas, então o `ao_detectar` não as recebe de novo
+        return atualizar_tracker(tracker, porta.ultimas_deteccoes, frame)
+
+    if modo == COMPLETO:
+        detections = detectar_veiculos(frame, model_yolo, classes_veiculos)
+    else:
+        x1, y1, x2, y2 = roi
+        novas = [([x + x1, y + y1, w, h], conf, cls)
+                 for (x, y, w, h), conf, cls in detectar_veiculos(frame[y1:y2, x1:x2], model_yolo, classes_veiculos)]
+        # Fora da região alterada nada mudou: as detecções anteriores dali continuam válidas
+        mantidas = [d for d in porta.ultimas_deteccoes if not sobrepoe(d, roi)]
+        detections = mantidas + novas
+    porta.ultimas_deteccoes = detections
+    return atualizar_tracker(tracker, detections, frame, ao_detectar)
+
+def detectar_e_trackear_em_ladrilhos(frame, detector, tracker, ao_detectar=None):
+    """Frames de drone em alta resolução: `detector` é um ladrilhos.DetectorLadrilhado."""
+    detections = detector.detectar(frame)
+    return atualizar_tracker(tracker, detections, frame, ao_detectar)
+
+def detectar_e_trackear_controlado(frame, model_yolo, tracker, classes_veiculos, controle, ao_detectar=None):
+    """
+    Segue as decisões de um controle_fps.ControladorFPS: o YOLO só roda nos
+    frames do passo atual, com o imgsz atual, e no máximo `max_deteccoes`
+    detecções vão ao tracker.
+    """
+    if not controle.inferir_agora():
+        # Os tracks seguem pela predição do Kalman até o próximo frame inferido
+        return prever_tracker(tracker)
+    with controle.medir("predict"):
+        detections = detectar_veiculos(frame, model_yolo, classes_veiculos, controle.imgsz)
+    detections = controle.limitar(detections)
+    with controle.medir("tracker"):
+        return atualizar_tracker(tracker, detections, frame, ao_detectar)
+
+# === VELOCIDADE E VEÍCULO PARADO ===
+def atualizar_tracks(tracks, media_flow, estado):
+    """
+    Atualiza o estado com os tracks confirmados. `media_flow` é o movimento da
+    câmera: vetor (dx, dy) ou matriz 3x3.
+    Retorna (track_ids, caixas Nx4 int, velocidades, parados).
+    """
+    with cronometro("estagio", estagio="estado_tracks"):
+        confirmados = [track for track in tracks if track.is_confirmed()]
+        track_ids = [track.track_id for track in confirmados]
+        caixas = np.array([track.to_ltrb() for track in confirmados], dtype=np.float64).reshape(-1, 4).astype(int)
+        centros = ((caixas[:, 0:2] + caixas[:, 2:4]) / 2).astype(int)
+
+        # Velocidade e contador de parado de todos os tracks de uma vez
+        velocidades, parados = estado.atualizar(track_ids, centros, media_flow)
+        # Tracks removidos pelo DeepSort (ou sem atualização há mais de max_age) saem do estado
+        estado.expirar([track.track_id for track in tracks])
+    return track_ids, caixas, velocidades, parados
+
+# === DESENHO ===
+def desenhar_tracks(frame, track_ids, caixas, velocidades, parados):
+    for track_id, (x1, y1, x2, y2), velocidade, parado in zip(track_ids, caixas.tolist(), velocidades, parados):
+        cor = (0, 255, 0)
+        if parado >= FRAMES_PARADO:
+            cor = (0, 0, 255)
+            cv2.putText(frame, "VEICULO PARADO!", (x1, y1 - 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, cor, 2)
+
+        cv2.rectangle(frame, (x1, y1), (x2, y2), cor, 2)
+        cv2.putText(frame, f"ID {track_id} V:{velocidade:.1f}", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, cor, 2)
+
+def processar_tracks(frame, tracks, media_flow, estado, ao_parar=None, ao_atualizar=None):
+    """
+    Atualiza o estado e desenha as caixas no frame.
+    `ao_parar(track_id, caixa)` é chamado uma vez por parada, no frame em que
+    o veículo passa a ser considerado parado; `ao_atualizar(track_ids, caixas,
+    velocidades, parados)` recebe o estado de todos os tracks a cada frame.
+    Retorna as caixas dos tracks confirmados (usadas para mascarar a compensação).
+    """
+    track_ids, caixas, velocidades, parados = atualizar_tracks(tracks, media_flow, estado)
+    with cronometro("estagio", estagio="desenho"):
+        desenhar_tracks(frame, track_ids, caixas, velocidades, parados)
+    if ao_atualizar is not None:
+        ao_atualizar(track_ids, caixas, velocidades, parados)
+    if ao_parar is not None:
+        for track_id, caixa, parado in zip(track_ids, caixas.tolist(), parados):
+            if parado == FRAMES_PARADO:
+                ao_parar(track_id, tuple(caixa))
+    return [tuple(caixa) for caixa in caixas.tolist()]
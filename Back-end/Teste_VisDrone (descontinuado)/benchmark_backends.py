@@ -0,0 +1,68 @@
+"""
+Compara a latência por frame dos backends de inferência (PyTorch, ONNX Runtime,
+OpenVINO) com os mesmos pesos. Na primeira execução os modelos são exportados
+e validados contra o PyTorch (ver backends.carregar_modelo).
+
+Uso:
+    python benchmark_backends.py Modelo-PréTreinado/best.pt
+    python benchmark_backends.py Modelo-PréTreinado/best.pt --video teste.mp4 --frames 100
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+from carevision_comum.backends import BACKENDS, carregar_modelo, ler_input_size
+
+
+def carregar_frames(video, n_frames):
+    if video is None:
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 256, size=(720, 1280, 3), dtype=np.uint8) for _ in range(n_frames)]
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < n_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def medir(modelo, frames, input_size, aquecimento=3):
+    for frame in frames[:aquecimento]:
+        modelo.predict(frame, imgsz=input_size, conf=0.5, verbose=False)
+    tempos = []
+    for frame in frames:
+        t0 = time.perf_counter()
+        modelo.predict(frame, imgsz=input_size, conf=0.5, verbose=False)
+        tempos.append(time.perf_counter() - t0)
+    tempos = np.array(tempos) * 1000
+    return {"media_ms": float(tempos.mean()), "p50_ms": float(np.percentile(tempos, 50)),
+            "p95_ms": float(np.percentile(tempos, 95)), "fps": float(1000 / tempos.mean())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência por frame de cada backend de inferência")
+    parser.add_argument("pesos")
+    parser.add_argument("--video", help="vídeo de entrada (padrão: frames sintéticos 1280x720)")
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    args = parser.parse_args()
+
+    frames = carregar_frames(args.video, args.frames)
+    input_size = ler_input_size()
+    print(f"{len(frames)} frames, input_size={input_size}")
+    print(f"{'backend':<10}{'média ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'FPS':>8}")
+    for backend in args.backends:
+        try:
+            modelo = carregar_modelo(args.pesos, backend)
+        except Exception as e:
+            print(f"{backend:<10}indisponível ({type(e).__name__}: {e})")
+            continue
+        r = medir(modelo, frames, input_size)
+        print(f"{backend:<10}{r['media_ms']:>10.1f}{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['fps']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Compara os estimadores de movimento da câmera (compensacao.METODOS) com o fluxo
+denso de referência: tempo por frame e erro de deslocamento, em pixels, medido
+numa grade de pontos do frame.
+
+Uso:
+    python benchmark_compensacao.py                  # sequência sintética (pan + rotação + zoom)
+    python benchmark_compensacao.py video.mp4 --frames 200
+"""
+import argparse
+import time
+import cv2
+import numpy as np
+from compensacao import METODOS, estimar_movimento, deslocar_ponto
+
+
+def gerar_sequencia_sintetica(n_frames=60, largura=960, altura=540, seed=0):
+    """
+    Textura aleatória vista por uma câmera que faz pan, gira e dá zoom, com
+    alguns "veículos" se movendo por conta própria. Retorna (frames, verdades, caixas)
+    onde verdades[k] é a matriz 3x3 real entre os frames k-1 e k.
+    """
+    rng = np.random.default_rng(seed)
+    cena = rng.integers(0, 256, size=(altura * 2, largura * 2), dtype=np.uint8)
+    cena = cv2.GaussianBlur(cena, (0, 0), 3)
+    centro = np.array([largura, altura], dtype=np.float64)
+
+    veiculos = [(rng.uniform(0.2, 0.7) * largura, rng.uniform(0.2, 0.7) * altura,
+                 rng.uniform(-6, 6), rng.uniform(-4, 4)) for _ in range(6)]
+
+    frames, verdades, caixas = [], [], []
+    anterior = None
+    for k in range(n_frames):
+        angulo = 0.15 * k
+        escala = 1.0 + 0.002 * k
+        R = cv2.getRotationMatrix2D(tuple(centro), angulo, escala)
+        R[:, 2] += [-largura / 2 - 3.0 * k, -altura / 2 - 1.5 * k]
+        M = np.vstack([R, [0.0, 0.0, 1.0]])
+        frame = cv2.warpAffine(cena, R, (largura, altura))
+
+        caixas_k = []
+        for x, y, vx, vy in veiculos:
+            x1, y1 = int(x + vx * k) % (largura - 60), int(y + vy * k) % (altura - 40)
+            cv2.rectangle(frame, (x1, y1), (x1 + 60, y1 + 40), 255, -1)
+            caixas_k.append((x1, y1, x1 + 60, y1 + 40))
+
+        frames.append(frame)
+        caixas.append(caixas_k)
+        verdades.append(M @ np.linalg.inv(anterior) if anterior is not None else np.eye(3))
+        anterior = M
+    return frames, verdades, caixas
+
+
+def ler_video(caminho, max_frames):
+    cap = cv2.VideoCapture(caminho)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    cap.release()
+    return frames
+
+
+def erro_medio(movimento, referencia, pontos):
+    """Distância média entre os pontos deslocados pelos dois movimentos."""
+    erros = []
+    for x, y in pontos:
+        ax, ay = deslocar_ponto(movimento, x, y)
+        bx, by = deslocar_ponto(referencia, x, y)
+        erros.append(np.hypot(ax - bx, ay - by))
+    return float(np.mean(erros))
+
+
+def rodar_benchmark(frames, verdades=None, caixas=None):
+    altura, largura = frames[0].shape[:2]
+    pontos = [(x, y) for x in np.linspace(0, largura - 1, 5) for y in np.linspace(0, altura - 1, 5)]
+
+    resultados = {}
+    referencias = []
+    for metodo in METODOS:
+        tempos, erros_ref, erros_real = [], [], []
+        for k in range(1, len(frames)):
+            caixas_k = caixas[k - 1] if caixas else None
+            t0 = time.perf_counter()
+            movimento = estimar_movimento(frames[k - 1], frames[k], metodo, caixas_k)
+            tempos.append(time.perf_counter() - t0)
+
+            if metodo == "denso":
+                referencias.append(movimento)
+            erros_ref.append(erro_medio(movimento, referencias[k - 1], pontos))
+            if verdades is not None:
+                erros_real.append(erro_medio(movimento, verdades[k], pontos))
+
+        resultados[metodo] = {
+            'ms_por_frame': 1000 * float(np.mean(tempos)),
+            'erro_vs_denso_px': float(np.mean(erros_ref)),
+            'erro_vs_real_px': float(np.mean(erros_real)) if erros_real else None,
+        }
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos estimadores de movimento da câmera")
+    parser.add_argument("video", nargs="?", help="vídeo para medir (padrão: sequência sintética)")
+    parser.add_argument("--frames", type=int, default=60)
+    args = parser.parse_args()
+
+    if args.video:
+        frames, verdades, caixas = ler_video(args.video, args.frames), None, None
+    else:
+        frames, verdades, caixas = gerar_sequencia_sintetica(args.frames)
+    if len(frames) < 2:
+        print("São necessários pelo menos 2 frames.")
+        return
+
+    resultados = rodar_benchmark(frames, verdades, caixas)
+    print(f"{'método':<16}{'ms/frame':>10}{'erro vs denso':>16}{'erro vs real':>15}")
+    for metodo, r in resultados.items():
+        real = f"{r['erro_vs_real_px']:.2f}" if r['erro_vs_real_px'] is not None else "-"
+        print(f"{metodo:<16}{r['ms_por_frame']:>10.2f}{r['erro_vs_denso_px']:>16.2f}{real:>15}")
+
+
+if __name__ == "__main__":
+    main()
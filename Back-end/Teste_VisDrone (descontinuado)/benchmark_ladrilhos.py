@@ -0,0 +1,85 @@
+"""
+Compara a detecção numa passada só com a inferência em ladrilhos (todos e
+adaptativo) em vídeo sintético 4K com veículos pequenos: recall contra as
+caixas verdadeiras do video_sintetico, ladrilhos por frame e tempo por frame.
+
+Usa o ModeloSintetico com input_size=640, que reduz o frame como o YOLO e
+perde os veículos pequenos da mesma forma; com --modelo mede o YOLO de verdade.
+
+Uso:
+    python benchmark_ladrilhos.py --frames 60
+    python benchmark_ladrilhos.py --modelo pesos.pt --frames 30
+"""
+import argparse
+import time
+import numpy as np
+from analise import detectar_veiculos, CLASSES_VEICULOS
+from carevision_comum.ladrilhos import DetectorLadrilhado
+from modelo_sintetico import ModeloSintetico
+from video_sintetico import gerar_frames
+
+
+def recall(deteccoes, verdades, limiar_iou=0.5):
+    """Fração das caixas verdadeiras com alguma detecção de IoU >= limiar."""
+    if not verdades:
+        return 1.0
+    if not deteccoes:
+        return 0.0
+    d = np.array([[x, y, x + w, y + h] for (x, y, w, h), _, _ in deteccoes], dtype=np.float64)
+    v = np.array(verdades, dtype=np.float64)
+    x1 = np.maximum(v[:, None, 0], d[None, :, 0])
+    y1 = np.maximum(v[:, None, 1], d[None, :, 1])
+    x2 = np.minimum(v[:, None, 2], d[None, :, 2])
+    y2 = np.minimum(v[:, None, 3], d[None, :, 3])
+    inter = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    area_v = (v[:, 2] - v[:, 0]) * (v[:, 3] - v[:, 1])
+    area_d = (d[:, 2] - d[:, 0]) * (d[:, 3] - d[:, 1])
+    iou = inter / (area_v[:, None] + area_d[None, :] - inter)
+    return float((iou.max(axis=1) >= limiar_iou).mean())
+
+
+def medir(nome, detectar, frames):
+    recalls, tempos = [], []
+    for frame, verdades in frames:
+        t0 = time.perf_counter()
+        deteccoes = detectar(frame)
+        tempos.append(time.perf_counter() - t0)
+        recalls.append(recall(deteccoes, verdades))
+    return {"modo": nome, "recall": float(np.mean(recalls)), "ms": 1000 * float(np.median(tempos))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da inferência em ladrilhos")
+    parser.add_argument("--modelo", help="pesos YOLO (padrão: ModeloSintetico)")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--largura", type=int, default=3840)
+    parser.add_argument("--altura", type=int, default=2160)
+    parser.add_argument("--veiculos", type=int, default=40)
+    parser.add_argument("--tamanho", type=int, default=640, help="tamanho do ladrilho (input_size do modelo)")
+    args = parser.parse_args()
+
+    if args.modelo:
+        from carevision_comum.backends import carregar_modelo
+        modelo = carregar_modelo(args.modelo)
+    else:
+        modelo = ModeloSintetico(input_size=args.tamanho, area_minima=100)
+
+    # Os veículos precisam estar sempre no frame: o pan é pequeno e eles andam devagar
+    frames = list(gerar_frames(n_frames=args.frames, largura=args.largura, altura=args.altura,
+                               n_veiculos=args.veiculos, n_parados=args.veiculos // 4, pan=(1.0, 0.5)))
+    modos = [
+        ("uma_passada", lambda f: detectar_veiculos(f, modelo, CLASSES_VEICULOS)),
+        ("todos", DetectorLadrilhado(modelo, CLASSES_VEICULOS, args.tamanho).detectar),
+        ("adaptativo", DetectorLadrilhado(modelo, CLASSES_VEICULOS, args.tamanho, adaptativo=True).detectar),
+    ]
+    print(f"{len(frames)} frames {args.largura}x{args.altura}, ladrilhos de {args.tamanho} px")
+    print(f"{'modo':<14}{'recall':>8}{'ms/frame':>10}{'ladrilhos/frame':>17}")
+    for nome, detectar in modos:
+        r = medir(nome, detectar, frames)
+        detector = getattr(detectar, "__self__", None)
+        por_frame = detector.estatisticas()["ladrilhos_por_frame"] if detector is not None else 0.0
+        print(f"{nome:<14}{r['recall']:>8.1%}{r['ms']:>10.1f}{por_frame:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Benchmark reproduzível do pipeline do CareVision, estágio por estágio, sobre um
+vídeo sintético determinístico (video_sintetico.py). Roda offline em CPU com o
+ModeloSintetico no lugar do YOLO (ou com pesos reais via --modelo).
+
+Estágios medidos: decodificação, compensação de movimento, predict,
+tracker.update_tracks, atualização do estado dos tracks, desenho e a conversão
+de frame para QPixmap da interface (redimensionamento no QuadroCompartilhado +
+upload, o caminho da VideoWindow).
+
+O vídeo é processado --repeticoes vezes e cada número do resultado é a
+mediana das execuções. Uma execução isolada varia facilmente 20% no p95 de
+um estágio, então um estágio só é regressão se a mediana piorar mais que a
+tolerância, o que exige que a piora apareça na maioria das execuções.
+
+Uso:
+    python benchmark_pipeline.py --saida resultado.json
+    python benchmark_pipeline.py --saida baseline.json --frames 300 --repeticoes 5
+    python benchmark_pipeline.py --comparar baseline.json --tolerancia 0.20
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+from analise import (detectar_veiculos, atualizar_tracks, desenhar_tracks,
+                     CLASSES_VEICULOS, LIMIAR_VELOCIDADE, MAX_AGE)
+from compensacao import estimar_movimento
+from estado_tracks import EstadoTracks
+from modelo_sintetico import ModeloSintetico
+from video_sintetico import gravar_video
+
+PASTA_INTERFACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Front-end", "V_0.02")
+ESTAGIOS = ("decodificacao", "compensacao", "predict", "tracker", "estado_tracks", "desenho", "qt", "total")
+
+
+def carregar_conversao_qt():
+    """Monta a conversão frame -> QPixmap da interface; retorna None se o PyQt5 não estiver disponível."""
+    try:
+        from PyQt5.QtWidgets import QApplication
+        from PyQt5.QtCore import QSize
+    except ImportError:
+        return None, None
+    app = QApplication.instance() or QApplication(["benchmark", "-platform", "offscreen"])
+    sys.path.insert(0, PASTA_INTERFACE)
+    spec = importlib.util.spec_from_file_location("carevision_interface",
+                                                  os.path.join(PASTA_INTERFACE, "CareVision_0.02.py"))
+    interface = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(interface)
+    from renderizacao import QuadroCompartilhado
+
+    quadro = QuadroCompartilhado()
+
+    def frame_para_pixmap(frame, tamanho):
+        quadro.tamanho = (tamanho.width(), tamanho.height())
+        quadro.publicar(frame)
+        return interface.quadro_para_pixmap(quadro.pegar()[0])
+
+    return frame_para_pixmap, (app, QSize(900, 600))
+
+
+def resumir(tempos):
+    ms = np.asarray(tempos) * 1000
+    return {"media_ms": float(ms.mean()), "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)), "p99_ms": float(np.percentile(ms, 99)),
+            "fps": float(1000 / ms.mean()) if ms.mean() > 0 else 0.0}
+
+
+def mediana_das_execucoes(execucoes):
+    """Cada estatística de cada estágio vira a mediana dela entre as execuções."""
+    return {estagio: {chave: float(np.median([e[estagio][chave] for e in execucoes]))
+                      for chave in execucoes[0][estagio]}
+            for estagio in execucoes[0]}
+
+
+def rodar(caminho_video, modelo, metodo_compensacao, conversao_qt=(None, None)):
+    from deep_sort_realtime.deepsort_tracker import DeepSort
+
+    frame_para_pixmap, contexto_qt = conversao_qt
+    tempos = {estagio: [] for estagio in ESTAGIOS}
+    cap = cv2.VideoCapture(caminho_video)
+    tracker = DeepSort(max_age=MAX_AGE)
+    estado = EstadoTracks(LIMIAR_VELOCIDADE, max_age=MAX_AGE)
+    prev_gray = None
+    media_flow = np.array([0, 0])
+    caixas_anteriores = None
+
+    while True:
+        t_frame = time.perf_counter()
+        ret, frame = cap.read()
+        t = time.perf_counter()
+        if not ret:
+            break
+        tempos["decodificacao"].append(t - t_frame)
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if prev_gray is not None:
+            media_flow = estimar_movimento(prev_gray, gray, metodo_compensacao, caixas_anteriores)
+        prev_gray = gray
+        t, t0 = time.perf_counter(), t
+        tempos["compensacao"].append(t - t0)
+
+        detections = detectar_veiculos(frame, modelo, CLASSES_VEICULOS)
+        t, t0 = time.perf_counter(), t
+        tempos["predict"].append(t - t0)
+
+        tracks = tracker.update_tracks(detections, frame=frame)
+        t, t0 = time.perf_counter(), t
+        tempos["tracker"].append(t - t0)
+
+        track_ids, caixas, velocidades, parados = atualizar_tracks(tracks, media_flow, estado)
+        caixas_anteriores = [tuple(c) for c in caixas.tolist()]
+        t, t0 = time.perf_counter(), t
+        tempos["estado_tracks"].append(t - t0)
+
+        desenhar_tracks(frame, track_ids, caixas, velocidades, parados)
+        t, t0 = time.perf_counter(), t
+        tempos["desenho"].append(t - t0)
+
+        if frame_para_pixmap is not None:
+            frame_para_pixmap(frame, contexto_qt[1])
+            t, t0 = time.perf_counter(), t
+            tempos["qt"].append(t - t0)
+
+        tempos["total"].append(t - t_frame)
+    cap.release()
+
+    return {estagio: resumir(valores) for estagio, valores in tempos.items() if valores}
+
+
+def comparar(atual, baseline, tolerancia):
+    """
+    Marca como regressão todo estágio cujo p50 ou p95 (medianas das execuções)
+    piorou mais que `tolerancia` (fração). Devolve (estágio, métrica, antes,
+    depois, execuções que passaram do limite, execuções).
+    """
+    regressoes = []
+    execucoes = atual.get("execucoes") or [atual["estagios"]]
+    for estagio, base in baseline["estagios"].items():
+        if estagio not in atual["estagios"]:
+            continue
+        for metrica in ("p50_ms", "p95_ms"):
+            antes, depois = base[metrica], atual["estagios"][estagio][metrica]
+            limite = antes * (1 + tolerancia)
+            if antes > 0 and depois > limite:
+                acima = sum(1 for e in execucoes if e[estagio][metrica] > limite)
+                regressoes.append((estagio, metrica, antes, depois, acima, len(execucoes)))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark por estágio do pipeline do CareVision")
+    parser.add_argument("--saida", help="arquivo JSON com o resultado")
+    parser.add_argument("--comparar", help="JSON de baseline para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=0.20, help="piora aceitável (0.20 = 20%%)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções; o resultado é a mediana delas")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--largura", type=int, default=1280)
+    parser.add_argument("--altura", type=int, default=720)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compensacao", default="denso")
+    parser.add_argument("--modelo", help="pesos YOLO reais (padrão: ModeloSintetico)")
+    parser.add_argument("--sem-qt", action="store_true", help="não mede a conversão para QPixmap")
+    args = parser.parse_args()
+
+    if args.modelo:
+        from carevision_comum.backends import carregar_modelo
+        modelo = carregar_modelo(args.modelo)
+    else:
+        modelo = ModeloSintetico()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho_video = os.path.join(pasta, "sintetico.avi")
+        gravar_video(caminho_video, n_frames=args.frames, largura=args.largura,
+                     altura=args.altura, seed=args.seed)
+        conversao_qt = carregar_conversao_qt() if not args.sem_qt else (None, None)
+        execucoes = []
+        for i in range(max(1, args.repeticoes)):
+            execucoes.append(rodar(caminho_video, modelo, args.compensacao, conversao_qt))
+            print(f"execução {i + 1}/{args.repeticoes}: total p50 {execucoes[-1]['total']['p50_ms']:.2f} ms")
+        estagios = mediana_das_execucoes(execucoes)
+
+    resultado = {
+        "meta": {"frames": args.frames, "repeticoes": len(execucoes), "resolucao": [args.largura, args.altura],
+                 "seed": args.seed,
+                 "compensacao": args.compensacao, "modelo": args.modelo or "sintetico",
+                 "python": platform.python_version(), "opencv": cv2.__version__,
+                 "maquina": platform.machine(), "cpus": os.cpu_count()},
+        "estagios": estagios,
+        "execucoes": execucoes,
+    }
+
+    print(f"\nMedianas de {len(execucoes)} execução(ões):")
+    print(f"{'estágio':<15}{'média ms':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'FPS':>9}")
+    for estagio, r in estagios.items():
+        print(f"{estagio:<15}{r['media_ms']:>10.2f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+              f"{r['p99_ms']:>9.2f}{r['fps']:>9.1f}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressoes = comparar(resultado, baseline, args.tolerancia)
+        if regressoes:
+            print(f"\nREGRESSÕES (tolerância {args.tolerancia:.0%}):")
+            for estagio, metrica, antes, depois, acima, total in regressoes:
+                print(f"  {estagio} {metrica}: {antes:.2f} -> {depois:.2f} ms (+{depois / antes - 1:.0%}; "
+                      f"acima do limite em {acima} de {total} execuções)")
+            sys.exit(1)
+        print("\nSem regressões em relação ao baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Compara o DeepSort, com e sem o cache_embeddings, e o tracker_leve: tempo
+do update_tracks por frame e trocas de ID contra as identidades verdadeiras.
+As detecções são calculadas uma vez e as mesmas vão para todos os trackers,
+então a diferença é só do tracker; o FPS "com predict" soma o tempo médio do predict.
+
+Sem --video usa o video_sintetico (com os ids dos veículos) e o
+ModeloSintetico. Com --video, as identidades vêm de --gt no formato de
+anotação do VisDrone-MOT/MOTChallenge (frame, id, x, y, w, h, ...; frame a
+partir de 1); sem --gt só o tempo e o número de IDs criados são medidos.
+
+Com --passo N o tracker só recebe detecções 1 a cada N frames, como no
+controle_fps, e nos outros só faz a predição (analise.prever_tracker). Os
+veículos continuam tendo de ser confirmados: se algum tracker não confirmar
+nenhum, o script termina com erro.
+
+Uso:
+    python benchmark_trackers.py --frames 200 --veiculos 40
+    python benchmark_trackers.py --frames 200 --passo 3
+    python benchmark_trackers.py --video uav0000013_00000_v.mp4 --gt uav0000013_00000_v.txt \\
+        --modelo Modelo-PréTreinado/best.pt
+"""
+import argparse
+import sys
+import time
+import cv2
+import numpy as np
+from analise import detectar_veiculos, criar_tracker, prever_tracker, CLASSES_VEICULOS, MAX_AGE, TRACKERS
+from modelo_sintetico import ModeloSintetico
+from tracker_leve import associar
+from video_sintetico import gerar_frames
+
+
+def ler_anotacoes(caminho):
+    """frame (a partir de 0) -> (ids, caixas x1y1x2y2) de um arquivo de anotação MOT."""
+    anotacoes = {}
+    dados = np.loadtxt(caminho, delimiter=",", ndmin=2)
+    for linha in dados:
+        quadro, track_id, x, y, w, h = linha[:6]
+        ids, caixas = anotacoes.setdefault(int(quadro) - 1, ([], []))
+        ids.append(int(track_id))
+        caixas.append((x, y, x + w, y + h))
+    return anotacoes
+
+
+def carregar_clipe(video, caminho_gt, n_frames):
+    anotacoes = ler_anotacoes(caminho_gt) if caminho_gt else None
+    cap = cv2.VideoCapture(video)
+    quadros = []
+    while len(quadros) < n_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        verdade = None if anotacoes is None else anotacoes.get(len(quadros), ([], []))
+        quadros.append((frame, verdade))
+    cap.release()
+    return quadros
+
+
+def contar_trocas(verdades, saidas, limiar_iou=0.5):
+    """
+    Trocas de ID no sentido do CLEAR-MOT: cada identidade verdadeira casada
+    (IoU >= limiar) com um track diferente do da última vez conta uma troca.
+    Retorna (trocas, fração das caixas verdadeiras cobertas por algum track).
+    """
+    ultimo_track = {}
+    trocas = casadas = total = 0
+    for (ids, caixas), (track_ids, caixas_tracks) in zip(verdades, saidas):
+        total += len(ids)
+        pares, _, _ = associar(np.asarray(caixas, dtype=np.float64).reshape(-1, 4),
+                               np.asarray(caixas_tracks, dtype=np.float64).reshape(-1, 4), limiar_iou)
+        for i, j in pares.tolist():
+            casadas += 1
+            if ids[i] in ultimo_track and ultimo_track[ids[i]] != track_ids[j]:
+                trocas += 1
+            ultimo_track[ids[i]] = track_ids[j]
+    return trocas, casadas / total if total else 1.0
+
+
+def medir(tipo, quadros, deteccoes, passo=1):
+    tracker = criar_tracker(tipo, MAX_AGE)
+    tempos, saidas, ids_criados = [], [], set()
+    for i, ((frame, _), dets) in enumerate(zip(quadros, deteccoes)):
+        t0 = time.perf_counter()
+        if i % passo:
+            tracks = prever_tracker(tracker)
+        else:
+            tracks = tracker.update_tracks(dets, frame=frame)
+        tempos.append(time.perf_counter() - t0)
+        # No tracker_leve os frames só com predição contam no time_since_update
+        confirmados = [t for t in tracks if t.is_confirmed() and t.time_since_update < passo]
+        ids_criados.update(t.track_id for t in confirmados)
+        saidas.append(([t.track_id for t in confirmados], [t.to_ltrb() for t in confirmados]))
+    # O primeiro update do DeepSort inclui a carga do embedder
+    ms = 1000 * np.asarray(tempos[1:] or tempos)
+    return {"tracker": tipo, "ms": float(ms.mean()), "p95_ms": float(np.percentile(ms, 95)),
+            "ids": len(ids_criados), "saidas": saidas,
+            "embeddings": tracker.estatisticas() if tipo == "deepsort_cache" else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DeepSort x tracker leve: tempo por frame e trocas de ID")
+    parser.add_argument("--video", help="clipe gravado (padrão: vídeo sintético)")
+    parser.add_argument("--gt", help="anotação MOT/VisDrone-MOT do clipe, para contar trocas de ID")
+    parser.add_argument("--modelo", help="pesos YOLO (padrão: ModeloSintetico)")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--veiculos", type=int, default=40, help="veículos no vídeo sintético")
+    parser.add_argument("--trackers", nargs="+", default=list(TRACKERS), choices=TRACKERS)
+    parser.add_argument("--passo", type=int, default=1, help="detecções só 1 a cada N frames")
+    args = parser.parse_args()
+
+    if args.modelo:
+        from carevision_comum.backends import carregar_modelo
+        modelo = carregar_modelo(args.modelo)
+    else:
+        modelo = ModeloSintetico()
+
+    if args.video:
+        quadros = carregar_clipe(args.video, args.gt, args.frames)
+    else:
+        quadros = [(frame, (ids, caixas)) for frame, caixas, ids in
+                   gerar_frames(n_frames=args.frames, n_veiculos=args.veiculos, n_parados=args.veiculos // 4,
+                                com_ids=True)]
+
+    tempos_predict = []
+    deteccoes = []
+    for frame, _ in quadros:
+        t0 = time.perf_counter()
+        deteccoes.append(detectar_veiculos(frame, modelo, CLASSES_VEICULOS))
+        tempos_predict.append(time.perf_counter() - t0)
+    ms_predict = 1000 * float(np.mean(tempos_predict))
+    com_verdade = all(verdade is not None for _, verdade in quadros)
+
+    print(f"{len(quadros)} frames, {np.mean([len(d) for d in deteccoes]):.1f} detecções/frame, "
+          f"predict {ms_predict:.1f} ms/frame, detecções 1 a cada {args.passo} frame(s)")
+    print(f"{'tracker':<16}{'ms/frame':>10}{'p95 ms':>9}{'FPS':>8}{'FPS c/ predict':>16}"
+          f"{'IDs':>6}{'trocas ID':>11}{'cobertura':>11}")
+    sem_confirmacao = []
+    for tipo in args.trackers:
+        r = medir(tipo, quadros, deteccoes, args.passo)
+        if not r["ids"] and any(deteccoes):
+            sem_confirmacao.append(tipo)
+        linha = (f"{tipo:<16}{r['ms']:>10.2f}{r['p95_ms']:>9.2f}{1000 / max(r['ms'], 1e-6):>8.0f}"
+                 f"{1000 / (r['ms'] + ms_predict):>16.1f}{r['ids']:>6}")
+        if com_verdade:
+            trocas, cobertura = contar_trocas([verdade for _, verdade in quadros], r["saidas"])
+            linha += f"{trocas:>11}{cobertura:>11.1%}"
+        print(linha)
+        if r["embeddings"] is not None:
+            e = r["embeddings"]
+            print(f"{'':<16}embeddings reaproveitados: {e['taxa_reuso']:.1%} ({e['reaproveitados']} de "
+                  f"{e['deteccoes']}), ~{e['segundos_economizados']:.1f} s de CNN economizados")
+    if sem_confirmacao:
+        print(f"ERRO: nenhum veículo confirmado com detecções 1 a cada {args.passo} frame(s): "
+              f"{', '.join(sem_confirmacao)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
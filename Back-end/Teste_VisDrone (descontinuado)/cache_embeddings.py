@@ -0,0 +1,124 @@
+"""
+Reaproveitamento dos embeddings de aparência do DeepSort entre frames.
+
+O DeepSort passa cada detecção de cada frame pela CNN de aparência, mas um
+veículo cujo track casou no frame anterior e cuja caixa quase não mudou tem
+o mesmo vetor de antes. `DeepSortComCache` fica no lugar do DeepSort e, a
+cada `update_tracks`, só calcula embedding para as detecções:
+    - sem track anterior com IoU >= `iou_reuso` (novas ou que andaram muito);
+    - ambíguas: perto de mais de um track, ou disputadas por mais de uma
+      detecção (IoU >= `iou_ambiguo`), justamente onde a reidentificação importa;
+    - cujo embedding guardado já tem `intervalo_renovacao` frames.
+As demais recebem o embedding guardado do track. Os recortes que precisam de
+embedding vão à CNN numa chamada só, e os embeddings prontos entram no
+update_tracks do DeepSort pelo argumento `embeds`.
+"""
+import time
+import numpy as np
+from carevision_comum import metricas
+from carevision_comum.metricas import cronometro
+from tracker_leve import iou_matriz
+
+
+class DeepSortComCache:
+    def __init__(self, tracker, intervalo_renovacao=5, iou_reuso=0.7, iou_ambiguo=0.3):
+        self.tracker = tracker
+        self.intervalo_renovacao = intervalo_renovacao
+        self.iou_reuso = iou_reuso
+        self.iou_ambiguo = iou_ambiguo
+
+        # track_id -> {"embedding", "caixa" (x1, y1, x2, y2), "idade" (frames desde o cálculo), "frame"}
+        self.cache = {}
+        self.n_frame = 0
+        self.calculados = 0
+        self.reaproveitados = 0
+        self.segundos_embedder = 0.0
+
+    def __getattr__(self, nome):
+        # Só é chamado para atributos que não existem aqui: o resto vem do DeepSort
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        return getattr(self.tracker, nome)
+
+    def _candidatos(self, caixas):
+        """Para cada detecção, o track_id cujo embedding pode ser reaproveitado (ou None)."""
+        recentes = [(track_id, c) for track_id, c in self.cache.items() if c["frame"] == self.n_frame - 1]
+        if not recentes or not len(caixas):
+            return [None] * len(caixas)
+        caixas_cache = np.array([c["caixa"] for _, c in recentes], dtype=np.float64)
+        idades = np.array([c["idade"] for _, c in recentes])
+        iou = iou_matriz(caixas, caixas_cache)
+        melhor = iou.argmax(axis=1)
+        perto = iou >= self.iou_ambiguo
+        reusar = ((iou[np.arange(len(caixas)), melhor] >= self.iou_reuso)
+                  & (perto.sum(axis=1) == 1)
+                  & (perto.sum(axis=0)[melhor] == 1)
+                  & (idades[melhor] + 1 < self.intervalo_renovacao))
+        return [recentes[j][0] if r else None for j, r in zip(melhor.tolist(), reusar.tolist())]
+
+    def update_tracks(self, raw_detections, embeds=None, frame=None, **kwargs):
+        if embeds is not None or frame is None:
+            return self.tracker.update_tracks(raw_detections, embeds=embeds, frame=frame, **kwargs)
+
+        # O DeepSort descarta caixas vazias; filtrar antes mantém `embeds` alinhado com as detecções
+        deteccoes = [d for d in raw_detections if d[0][2] > 0 and d[0][3] > 0]
+        ltwh = np.array([d[0] for d in deteccoes], dtype=np.float64).reshape(-1, 4)
+        caixas = np.concatenate([ltwh[:, :2], ltwh[:, :2] + ltwh[:, 2:]], axis=1)
+        origens = self._candidatos(caixas)
+
+        embeds = [None if origem is None else self.cache[origem]["embedding"] for origem in origens]
+        calcular = [i for i, origem in enumerate(origens) if origem is None]
+        if calcular:
+            t0 = time.perf_counter()
+            with cronometro("estagio", estagio="embeddings"):
+                novos = self.tracker.generate_embeds(frame, [deteccoes[i] for i in calcular])
+            self.segundos_embedder += time.perf_counter() - t0
+            for i, embedding in zip(calcular, novos):
+                embeds[i] = embedding
+        self.calculados += len(calcular)
+        self.reaproveitados += len(deteccoes) - len(calcular)
+        metricas.incrementar("embeddings", len(calcular), origem="calculado")
+        metricas.incrementar("embeddings", len(deteccoes) - len(calcular), origem="cache")
+
+        tracks = self.tracker.update_tracks(deteccoes, embeds=embeds, frame=frame, **kwargs)
+        self._guardar(tracks, deteccoes, caixas, embeds, origens)
+        self.n_frame += 1
+        metricas.definir("embeddings_taxa_reuso", self.estatisticas()["taxa_reuso"])
+        return tracks
+
+    def prever_tracks(self):
+        # Frame sem inferência: nenhum embedding é calculado e o cache continua valendo
+        from analise import prever_deepsort
+        return prever_deepsort(self.tracker)
+
+    def _guardar(self, tracks, deteccoes, caixas, embeds, origens):
+        """Guarda o embedding de cada track atualizado neste frame e esquece os tracks removidos."""
+        ltwh32 = np.array([d[0] for d in deteccoes], dtype=np.float32).reshape(-1, 4)
+        vivos = set()
+        for track in tracks:
+            vivos.add(track.track_id)
+            if track.time_since_update != 0 or not len(ltwh32):
+                continue
+            # O track guarda a caixa da detecção que o atualizou (float32, como o Detection)
+            iguais = np.flatnonzero((ltwh32 == track.original_ltwh).all(axis=1))
+            if not len(iguais):
+                self.cache.pop(track.track_id, None)
+                continue
+            i = iguais[0]
+            if origens[i] is not None and origens[i] != track.track_id:
+                # O DeepSort casou a detecção com outro track: o embedding emprestado não é dele
+                self.cache.pop(track.track_id, None)
+                continue
+            idade = 0 if origens[i] is None else self.cache[origens[i]]["idade"] + 1
+            self.cache[track.track_id] = {"embedding": embeds[i], "caixa": caixas[i], "idade": idade,
+                                          "frame": self.n_frame}
+        for track_id in [t for t in self.cache if t not in vivos]:
+            del self.cache[track_id]
+
+    def estatisticas(self):
+        total = self.calculados + self.reaproveitados
+        por_embedding = self.segundos_embedder / self.calculados if self.calculados else 0.0
+        return {"deteccoes": total, "calculados": self.calculados, "reaproveitados": self.reaproveitados,
+                "taxa_reuso": self.reaproveitados / total if total else 0.0,
+                "ms_por_embedding": 1000 * por_embedding,
+                "segundos_economizados": self.reaproveitados * por_embedding}
@@ -0,0 +1,210 @@
+"""
+Clipes de evento (veículo parado, acidente) com os segundos antes e depois
+do disparo.
+
+Cada câmera mantém um BufferClipes: os frames entram já comprimidos em JPEG
+num buffer circular limitado por tempo e por memória. Quando um evento
+dispara, o clipe fica pendente até juntar os segundos de depois e então é
+entregue ao GravadorClipes, que decodifica e grava o vídeo (MJPG .avi) e o
+JSON de metadados numa thread própria; o laço de análise nunca espera disco.
+
+O limite de memória é rígido: os bytes no buffer, nos clipes pendentes e
+nos clipes ainda na fila de gravação nunca passam de `memoria_max`. Se for preciso, o frame
+mais antigo sai mesmo que um clipe pendente precise dele, e o clipe é
+marcado como truncado.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+from carevision_comum import metricas
+
+PASTA_CLIPES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "clipes_eventos")
+
+
+class GravadorClipes:
+    """Uma thread que grava os clipes prontos; a fila tem tamanho fixo e clipes além dela são descartados."""
+
+    def __init__(self, pasta=PASTA_CLIPES, max_pendentes=8):
+        self.pasta = pasta
+        self.fila = queue.Queue(maxsize=max_pendentes)
+        self.gravados = []
+        self.descartados = 0
+        self.thread = threading.Thread(target=self._rodar, daemon=True)
+        self.thread.start()
+
+    def enviar(self, clipe, ao_terminar):
+        """Enfileira o clipe sem bloquear. Retorna False se a fila estiver cheia."""
+        try:
+            self.fila.put_nowait((clipe, ao_terminar))
+            return True
+        except queue.Full:
+            self.descartados += 1
+            metricas.incrementar("clipes_descartados")
+            return False
+
+    def _rodar(self):
+        while True:
+            item = self.fila.get()
+            if item is None:
+                break
+            clipe, ao_terminar = item
+            try:
+                self.gravados.append(self.gravar(clipe))
+            except (OSError, cv2.error) as e:
+                print(f"[clipes] Falha ao gravar clipe {clipe['evento']}: {e}")
+            finally:
+                ao_terminar(clipe)
+
+    def gravar(self, clipe):
+        evento = clipe["evento"]
+        quadros = clipe["quadros"]
+        carimbo = time.strftime("%Y%m%d_%H%M%S", time.localtime(clipe["disparo_relogio"]))
+        nome = f"{clipe['camera']}_{carimbo}_{evento.get('tipo', 'evento')}"
+        if "track_id" in evento:
+            nome += f"_{evento['track_id']}"
+        os.makedirs(self.pasta, exist_ok=True)
+        base = os.path.join(self.pasta, nome)
+
+        duracao = quadros[-1][0] - quadros[0][0] if len(quadros) > 1 else 0.0
+        fps = (len(quadros) - 1) / duracao if duracao > 0 else 1.0
+        writer = None
+        for _, jpeg in quadros:
+            frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+            if writer is None:
+                altura, largura = frame.shape[:2]
+                writer = cv2.VideoWriter(base + ".avi", cv2.VideoWriter_fourcc(*"MJPG"), fps, (largura, altura))
+            writer.write(frame)
+        if writer is not None:
+            writer.release()
+
+        meta = {"camera": clipe["camera"], "evento": evento, "video": nome + ".avi",
+                "frames": len(quadros), "fps": round(fps, 2),
+                "antes_s": round(clipe["t_disparo"] - quadros[0][0], 2) if quadros else 0.0,
+                "depois_s": round(quadros[-1][0] - clipe["t_disparo"], 2) if quadros else 0.0,
+                "truncado": clipe["truncado"],
+                "disparo": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(clipe["disparo_relogio"]))}
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2, ensure_ascii=False, default=str)
+        return base
+
+    def parar(self, timeout=30.0):
+        """Espera os clipes já enfileirados serem gravados."""
+        self.fila.put(None)
+        self.thread.join(timeout)
+
+
+class BufferClipes:
+    """
+    Buffer circular de frames JPEG de uma câmera. `adicionar` e `disparar` são
+    chamados pelo laço de análise; nada aqui toca no disco. Cada frame é
+    contado uma vez só na memória, por mais clipes que o compartilhem.
+    """
+
+    def __init__(self, gravador, camera="camera", segundos_antes=10.0, segundos_depois=5.0,
+                 memoria_max=64 * 1024 * 1024, qualidade=80, largura_max=960):
+        self.gravador = gravador
+        self.camera = camera
+        self.segundos_antes = segundos_antes
+        self.segundos_depois = segundos_depois
+        self.memoria_max = memoria_max
+        self.parametros_jpeg = [cv2.IMWRITE_JPEG_QUALITY, qualidade]
+        self.largura_max = largura_max
+
+        self.quadros = deque()  # (t, jpeg)
+        self.pendentes = []  # clipes esperando os segundos de depois
+        self.truncados = 0
+        # Referências por frame (t -> [bytes, quantos guardam]); o gravador solta as dele de outra thread
+        self.lock = threading.Lock()
+        self.referencias = {}
+        self.bytes_total = 0
+
+    def bytes_usados(self):
+        with self.lock:
+            return self.bytes_total
+
+    def _prender(self, quadro):
+        with self.lock:
+            ref = self.referencias.get(quadro[0])
+            if ref is None:
+                self.referencias[quadro[0]] = [len(quadro[1]), 1]
+                self.bytes_total += len(quadro[1])
+            else:
+                ref[1] += 1
+
+    def _soltar(self, quadro):
+        with self.lock:
+            ref = self.referencias[quadro[0]]
+            ref[1] -= 1
+            if ref[1] == 0:
+                del self.referencias[quadro[0]]
+                self.bytes_total -= ref[0]
+
+    def adicionar(self, frame, t=None):
+        t = time.monotonic() if t is None else t
+        h, w = frame.shape[:2]
+        if w > self.largura_max:
+            frame = cv2.resize(frame, (self.largura_max, int(h * self.largura_max / w)),
+                               interpolation=cv2.INTER_AREA)
+        quadro = (t, cv2.imencode(".jpg", frame, self.parametros_jpeg)[1].tobytes())
+        self.quadros.append(quadro)
+        self._prender(quadro)
+
+        for clipe in self.pendentes:
+            if t <= clipe["t_disparo"] + self.segundos_depois:
+                clipe["quadros"].append(quadro)
+                self._prender(quadro)
+        self._entregar_prontos(t)
+        self._podar(t)
+        metricas.definir("clipes_memoria_bytes", self.bytes_usados(), camera=self.camera)
+
+    def _podar(self, t):
+        # Retenção normal: segundos_antes; um clipe pendente segura os frames dele pelas próprias referências
+        while self.quadros and t - self.quadros[0][0] > self.segundos_antes:
+            self._soltar(self.quadros.popleft())
+        # Limite rígido de memória: sai o frame mais antigo, do buffer e dos clipes pendentes
+        while self.bytes_usados() > self.memoria_max:
+            cabecas = [q[0][0] for q in [self.quadros] + [c["quadros"] for c in self.pendentes] if q]
+            if not cabecas:
+                break
+            mais_antigo = min(cabecas)
+            if self.quadros and self.quadros[0][0] <= mais_antigo:
+                self._soltar(self.quadros.popleft())
+            for clipe in self.pendentes:
+                if clipe["quadros"] and clipe["quadros"][0][0] <= mais_antigo:
+                    self._soltar(clipe["quadros"].popleft())
+                    clipe["truncado"] = True
+
+    def disparar(self, evento, t=None):
+        """Marca um evento agora; o clipe é gravado quando os segundos de depois chegarem."""
+        if t is None:
+            t = self.quadros[-1][0] if self.quadros else time.monotonic()
+        quadros = deque(q for q in self.quadros if q[0] >= t - self.segundos_antes)
+        for quadro in quadros:
+            self._prender(quadro)
+        self.pendentes.append({"camera": self.camera, "evento": evento, "t_disparo": t,
+                               "disparo_relogio": time.time(), "truncado": False, "quadros": quadros})
+        metricas.incrementar("clipes_disparados", camera=self.camera)
+
+    def _entregar_prontos(self, t, todos=False):
+        prontos = [c for c in self.pendentes if todos or t > c["t_disparo"] + self.segundos_depois]
+        for clipe in prontos:
+            self.pendentes.remove(clipe)
+            clipe["quadros"] = list(clipe["quadros"])
+            if clipe["truncado"]:
+                self.truncados += 1
+            if not clipe["quadros"] or not self.gravador.enviar(clipe, self._gravado):
+                self._gravado(clipe)
+
+    def _gravado(self, clipe):
+        # Chamado pelo gravador (ou direto, se o clipe não entrou na fila)
+        for quadro in clipe["quadros"]:
+            self._soltar(quadro)
+
+    def finalizar(self):
+        """Fim do vídeo: entrega os clipes pendentes com o que já foi coletado."""
+        self._entregar_prontos(None, todos=True)
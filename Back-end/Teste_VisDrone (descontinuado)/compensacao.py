@@ -0,0 +1,115 @@
+import cv2
+import numpy as np
+
+# Estimadores disponíveis para o movimento global da câmera
+METODOS = ("denso", "denso_reduzido", "lucas_kanade", "afim", "homografia")
+
+
+def compensar_movimento_camera(prev_gray, curr_gray):
+    """
+    Calcula o movimento médio global entre dois frames (optical flow).
+    Retorna vetor (dx, dy) a ser subtraído do movimento dos objetos.
+    """
+    flow = cv2.calcOpticalFlowFarneback(prev_gray, curr_gray, None,
+                                        pyr_scale=0.5, levels=3, winsize=15,
+                                        iterations=3, poly_n=5, poly_sigma=1.2, flags=0)
+    media_flow = np.mean(flow.reshape(-1, 2), axis=0)
+    return media_flow
+
+
+def matriz_translacao(dx, dy):
+    return np.array([[1.0, 0.0, dx], [0.0, 1.0, dy], [0.0, 0.0, 1.0]])
+
+
+def deslocar_ponto(movimento, x, y):
+    """
+    Posição no frame atual de um ponto (x, y) do frame anterior considerando só
+    o movimento da câmera. Aceita o vetor (dx, dy) antigo ou uma matriz 3x3.
+    """
+    movimento = np.asarray(movimento, dtype=np.float64)
+    if movimento.shape == (2,):
+        return x + movimento[0], y + movimento[1]
+    px, py, w = movimento @ np.array([x, y, 1.0])
+    return px / w, py / w
+
+
+def deslocar_pontos(movimento, pontos):
+    """Versão vetorizada de deslocar_ponto para um array Nx2."""
+    movimento = np.asarray(movimento, dtype=np.float64)
+    pontos = np.asarray(pontos, dtype=np.float64).reshape(-1, 2)
+    if movimento.shape == (2,):
+        return pontos + movimento
+    homogeneos = pontos @ movimento[:, :2].T + movimento[:, 2]
+    return homogeneos[:, :2] / homogeneos[:, 2:3]
+
+
+def fluxo_denso_reduzido(prev_gray, curr_gray, escala=0.25):
+    """Farneback numa versão reduzida do frame; o vetor médio volta para a escala original."""
+    prev_small = cv2.resize(prev_gray, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+    curr_small = cv2.resize(curr_gray, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+    flow = cv2.calcOpticalFlowFarneback(prev_small, curr_small, None,
+                                        pyr_scale=0.5, levels=2, winsize=9,
+                                        iterations=2, poly_n=5, poly_sigma=1.1, flags=0)
+    return np.mean(flow.reshape(-1, 2), axis=0) / escala
+
+
+def mascara_fundo(shape, caixas, margem=8):
+    """Máscara 255 no fundo e 0 sobre as caixas dos veículos (que se movem sozinhos)."""
+    mascara = np.full(shape[:2], 255, dtype=np.uint8)
+    for x1, y1, x2, y2 in caixas:
+        mascara[max(0, int(y1) - margem):int(y2) + margem, max(0, int(x1) - margem):int(x2) + margem] = 0
+    return mascara
+
+
+def pontos_correspondentes(prev_gray, curr_gray, caixas=None, max_pontos=300):
+    """Rastreia cantos do fundo com Lucas-Kanade. Retorna (p0, p1) como arrays Nx2."""
+    mascara = mascara_fundo(prev_gray.shape, caixas) if caixas else None
+    p0 = cv2.goodFeaturesToTrack(prev_gray, maxCorners=max_pontos, qualityLevel=0.01,
+                                 minDistance=8, mask=mascara, blockSize=7)
+    if p0 is None:
+        vazio = np.empty((0, 2), dtype=np.float32)
+        return vazio, vazio
+    p1, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, curr_gray, p0, None,
+                                             winSize=(21, 21), maxLevel=3)
+    ok = status.reshape(-1) == 1
+    return p0.reshape(-1, 2)[ok], p1.reshape(-1, 2)[ok]
+
+
+def estimar_movimento(prev_gray, curr_gray, metodo="denso", caixas=None):
+    """
+    Estima o movimento global da câmera entre dois frames em tons de cinza.
+    Retorna uma matriz 3x3 que leva coordenadas do frame anterior para o atual.
+    `caixas` (ltrb dos veículos rastreados) é usado pelos métodos por pontos
+    para ignorar pixels de veículos.
+    """
+    if metodo == "denso":
+        return matriz_translacao(*compensar_movimento_camera(prev_gray, curr_gray))
+    if metodo == "denso_reduzido":
+        return matriz_translacao(*fluxo_denso_reduzido(prev_gray, curr_gray))
+    if metodo not in METODOS:
+        raise ValueError(f"Método de compensação desconhecido: {metodo}")
+
+    p0, p1 = pontos_correspondentes(prev_gray, curr_gray, caixas)
+
+    if metodo == "lucas_kanade":
+        if len(p0) < 3:
+            return np.eye(3)
+        dx, dy = np.median(p1 - p0, axis=0)
+        return matriz_translacao(dx, dy)
+
+    if metodo == "afim":
+        # Similaridade (translação + rotação + zoom), robusta a outliers via RANSAC
+        if len(p0) < 3:
+            return np.eye(3)
+        M, _ = cv2.estimateAffinePartial2D(p0, p1, method=cv2.RANSAC, ransacReprojThreshold=3.0)
+        if M is None:
+            return np.eye(3)
+        return np.vstack([M, [0.0, 0.0, 1.0]])
+
+    # homografia
+    if len(p0) < 4:
+        return np.eye(3)
+    H, _ = cv2.findHomography(p0, p1, cv2.RANSAC, 3.0)
+    if H is None:
+        return np.eye(3)
+    return H
@@ -0,0 +1,209 @@
+"""
+Controlador que segura o FPS alvo em hardware fraco trocando qualidade por
+tempo quando o trânsito aumenta.
+
+A cada `janela` frames ele olha o tempo médio de processamento por frame
+(da leitura ao `fim_frame`; o tempo parado esperando a fonte não conta), a
+latência dos frames inferidos e quanto dela foi predict e quanto foi
+tracker, e mexe em um dos três botões:
+    max_deteccoes  quantas detecções (as de maior confiança) vão ao tracker;
+                   é o primeiro a cair quando o DeepSort domina o tempo
+    passo          o YOLO roda 1 a cada `passo` frames; nos outros os tracks
+                   seguem só pela predição do Kalman (tracker sem detecções)
+    imgsz          tamanho de entrada do predict
+Estourar o orçamento (1 / fps_alvo) aumenta o passo; estourar a latência (um frame inferido
+sozinho já passa do orçamento) só cede com imgsz ou max_deteccoes, já que
+pular frames não deixa o frame inferido mais rápido.
+
+Cada degradação vai para uma pilha com o quanto ela rendeu; ela só é
+desfeita quando a janela atual, somada a esse ganho, ainda cabe no
+orçamento com folga, o que evita ficar oscilando entre dois níveis.
+"""
+import time
+from carevision_comum import metricas
+
+TAMANHOS_ENTRADA = (640, 512, 416, 320)
+
+PASSO = "passo"
+IMGSZ = "imgsz"
+MAX_DETECCOES = "max_deteccoes"
+
+
+class _Medida:
+    __slots__ = ("controle", "estagio", "t0")
+
+    def __init__(self, controle, estagio):
+        self.controle = controle
+        self.estagio = estagio
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.controle.somas[self.estagio] += time.perf_counter() - self.t0
+        return False
+
+
+class ControladorFPS:
+    def __init__(self, fps_alvo, latencia_max=None, janela=15, passo_max=4, tamanhos=TAMANHOS_ENTRADA,
+                 deteccoes_min=10, folga=0.1, folga_recuperacao=0.2, nome="controle", fps_fonte=None):
+        self.orcamento = 1.0 / fps_alvo
+        # Opcional: devolve o FPS medido da fonte (FonteStream.fps); o orçamento o acompanha a cada janela
+        self.fps_fonte = fps_fonte
+        self.latencia_max = latencia_max
+        self.janela = janela
+        self.passo_max = passo_max
+        self.tamanhos = tamanhos
+        self.deteccoes_min = deteccoes_min
+        self.folga = folga
+        self.folga_recuperacao = folga_recuperacao
+        self.nome = nome
+
+        # Configuração atual
+        self.passo = 1
+        self.i_tamanho = 0
+        self.max_deteccoes = None  # None = sem limite
+
+        self.pilha = []  # degradações aplicadas, a mais recente no topo
+        self.decisoes = []  # histórico para o relatório do fim do vídeo
+        self.n_frame = 0
+        self._zerar_janela()
+        self._publicar()
+
+    @property
+    def imgsz(self):
+        return self.tamanhos[self.i_tamanho]
+
+    def _zerar_janela(self):
+        self.somas = {"processamento": 0.0, "latencia": 0.0, "predict": 0.0, "tracker": 0.0}
+        self.frames_janela = 0
+        self.inferidos_janela = 0
+        self.deteccoes_janela = 0
+
+    # === Chamados pelo laço de análise ===
+    def inferir_agora(self):
+        """True se este frame passa pelo YOLO; nos outros os tracks só seguem a predição."""
+        return self.n_frame % self.passo == 0
+
+    def medir(self, estagio):
+        """`with controle.medir("predict"):` soma a duração do bloco na janela atual."""
+        return _Medida(self, estagio)
+
+    def limitar(self, deteccoes):
+        """Mantém as `max_deteccoes` detecções de maior confiança."""
+        self.deteccoes_janela += len(deteccoes)
+        if self.max_deteccoes is None or len(deteccoes) <= self.max_deteccoes:
+            return deteccoes
+        metricas.incrementar("controle_deteccoes_cortadas", len(deteccoes) - self.max_deteccoes)
+        return sorted(deteccoes, key=lambda d: d[1], reverse=True)[:self.max_deteccoes]
+
+    def fim_frame(self, t_inicio):
+        """
+        Fecha o frame iniciado em `t_inicio` (perf_counter, logo depois do read).
+        Uma fonte ao vivo entrega os frames no ritmo dela: o tempo bloqueado no
+        read não é custo nosso e não entra no orçamento.
+        """
+        processamento = time.perf_counter() - t_inicio
+        if self.inferir_agora():
+            self.somas["latencia"] += processamento
+            self.inferidos_janela += 1
+        self.somas["processamento"] += processamento
+        self.frames_janela += 1
+        self.n_frame += 1
+        if self.frames_janela >= self.janela and self.inferidos_janela:
+            self._decidir()
+            self._zerar_janela()
+
+    # === Decisão ===
+    def _decidir(self):
+        fps = self.fps_fonte() if self.fps_fonte is not None else 0.0
+        if fps > 0:
+            self.orcamento = 1.0 / fps
+        processamento = self.somas["processamento"] / self.frames_janela
+        latencia = self.somas["latencia"] / self.inferidos_janela
+        predict = self.somas["predict"] / self.inferidos_janela
+        tracker = self.somas["tracker"] / self.inferidos_janela
+        deteccoes = self.deteccoes_janela / self.inferidos_janela
+        medidas = {"processamento": processamento, "latencia": latencia}
+
+        # A primeira janela depois de uma degradação mede quanto ela rendeu
+        if self.pilha and self.pilha[-1]["ganho"] is None:
+            topo = self.pilha[-1]
+            topo["ganho"] = {k: max(topo["antes"][k] / max(v, 1e-9), 1.0) for k, v in medidas.items()}
+
+        estourou_latencia = self.latencia_max is not None and latencia > self.latencia_max * (1 + self.folga)
+        estourou_orcamento = processamento > self.orcamento * (1 + self.folga)
+        if estourou_latencia or estourou_orcamento:
+            self._degradar(estourou_latencia, tracker > predict, deteccoes, medidas)
+        elif self.pilha and self.pilha[-1]["ganho"] is not None:
+            ganho = self.pilha[-1]["ganho"]
+            limite = 1 - self.folga_recuperacao
+            cabe = processamento * ganho["processamento"] < self.orcamento * limite and (
+                self.latencia_max is None or latencia * ganho["latencia"] < self.latencia_max * limite)
+            if cabe:
+                self._recuperar(medidas)
+
+    def _degradar(self, por_latencia, tracker_domina, deteccoes, medidas):
+        pode_cortar = deteccoes > self.deteccoes_min and (
+            self.max_deteccoes is None or self.max_deteccoes > self.deteccoes_min)
+        if tracker_domina and pode_cortar:
+            botao = MAX_DETECCOES
+        elif not por_latencia and self.passo < self.passo_max:
+            botao = PASSO
+        elif self.i_tamanho < len(self.tamanhos) - 1:
+            botao = IMGSZ
+        elif pode_cortar:
+            botao = MAX_DETECCOES
+        elif self.passo < self.passo_max:
+            botao = PASSO
+        else:
+            return  # tudo no mínimo: não há mais o que ceder
+
+        anterior = self._valor(botao)
+        if botao == MAX_DETECCOES:
+            atual = deteccoes if self.max_deteccoes is None else min(deteccoes, self.max_deteccoes)
+            self.max_deteccoes = max(self.deteccoes_min, int(atual * 0.75))
+        elif botao == PASSO:
+            self.passo += 1
+        else:
+            self.i_tamanho += 1
+        self.pilha.append({"botao": botao, "anterior": anterior, "antes": medidas, "ganho": None})
+        self._registrar("degradar", botao, medidas)
+
+    def _recuperar(self, medidas):
+        topo = self.pilha.pop()
+        if topo["botao"] == MAX_DETECCOES:
+            self.max_deteccoes = topo["anterior"]
+        elif topo["botao"] == PASSO:
+            self.passo = topo["anterior"]
+        else:
+            self.i_tamanho = self.tamanhos.index(topo["anterior"])
+        self._registrar("recuperar", topo["botao"], medidas)
+
+    def _valor(self, botao):
+        return {PASSO: self.passo, IMGSZ: self.imgsz, MAX_DETECCOES: self.max_deteccoes}[botao]
+
+    def _registrar(self, acao, botao, medidas):
+        decisao = {"frame": self.n_frame, "acao": acao, "botao": botao, "passo": self.passo,
+                   "imgsz": self.imgsz, "max_deteccoes": self.max_deteccoes,
+                   "processamento_ms": round(medidas["processamento"] * 1000, 1),
+                   "latencia_ms": round(medidas["latencia"] * 1000, 1)}
+        self.decisoes.append(decisao)
+        print(f"[{self.nome}] frame {self.n_frame}: {acao} {botao} -> passo {self.passo}, "
+              f"imgsz {self.imgsz}, max_deteccoes {self.max_deteccoes or 'sem limite'} "
+              f"(processamento {decisao['processamento_ms']:.0f} ms de {self.orcamento * 1000:.0f} ms, "
+              f"latência {decisao['latencia_ms']:.0f} ms)")
+        metricas.incrementar("controle_decisoes", acao=acao, botao=botao)
+        self._publicar()
+
+    def _publicar(self):
+        metricas.definir("controle_passo", self.passo)
+        metricas.definir("controle_imgsz", self.imgsz)
+        metricas.definir("controle_max_deteccoes", self.max_deteccoes or 0)
+
+    def estatisticas(self):
+        degradacoes = sum(1 for d in self.decisoes if d["acao"] == "degradar")
+        return {"frames": self.n_frame, "passo": self.passo, "imgsz": self.imgsz,
+                "max_deteccoes": self.max_deteccoes, "degradacoes": degradacoes,
+                "recuperacoes": len(self.decisoes) - degradacoes}
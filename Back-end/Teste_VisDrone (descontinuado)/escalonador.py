@@ -0,0 +1,145 @@
+import queue
+import threading
+import time
+from collections import deque
+import numpy as np
+
+
+def extrair_deteccoes(resultado, classes_veiculos):
+    """Converte um Results do YOLO na lista ([x, y, w, h], conf, cls) que o DeepSort espera."""
+    detections = []
+    for box in resultado.boxes:
+        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+        conf = float(box.conf[0])
+        cls = int(box.cls[0])
+        if cls in classes_veiculos:
+            detections.append(([x1, y1, x2 - x1, y2 - y1], conf, cls))
+    return detections
+
+
+class PedidoInferencia:
+    """Frame enviado por uma câmera; é concluído quando o tracker da câmera for atualizado."""
+
+    def __init__(self, cam_id, frame):
+        self.cam_id = cam_id
+        self.frame = frame
+        self.t_envio = time.perf_counter()
+        self.tracks = None
+        self.erro = None
+        self._pronto = threading.Event()
+
+    def esperar(self, timeout=None):
+        if not self._pronto.wait(timeout):
+            return None
+        if self.erro is not None:
+            raise self.erro
+        return self.tracks
+
+
+class EscalonadorInferencia:
+    """
+    Junta frames de N câmeras e roda um único `predict` em lote por ciclo.
+    Um lote é disparado quando tem `tamanho_lote` frames ou quando o primeiro
+    frame já esperou `espera_max` segundos. Cada câmera tem o próprio tracker,
+    atualizado na ordem em que seus frames foram enviados.
+    """
+
+    def __init__(self, model, classes_veiculos, tamanho_lote=8, espera_max=0.02,
+                 conf=0.5, janela_latencias=1000):
+        self.model = model
+        self.classes_veiculos = classes_veiculos
+        self.tamanho_lote = tamanho_lote
+        self.espera_max = espera_max
+        self.conf = conf
+        self.fila = queue.Queue()
+        self.trackers = {}
+        self.latencias = {}
+        self.janela_latencias = janela_latencias
+        self.frames_processados = 0
+        self.lotes_processados = 0
+        self.t_inicio = None
+        self.running = False
+        self.thread = None
+
+    def registrar_camera(self, cam_id, tracker):
+        self.trackers[cam_id] = tracker
+        self.latencias[cam_id] = deque(maxlen=self.janela_latencias)
+
+    def enviar(self, cam_id, frame):
+        if cam_id not in self.trackers:
+            raise KeyError(f"Câmera {cam_id} não registrada no escalonador")
+        pedido = PedidoInferencia(cam_id, frame)
+        self.fila.put(pedido)
+        return pedido
+
+    def iniciar(self):
+        self.running = True
+        self.t_inicio = time.perf_counter()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def parar(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+
+    def _montar_lote(self):
+        try:
+            primeiro = self.fila.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        lote = [primeiro]
+        prazo = primeiro.t_envio + self.espera_max
+        while len(lote) < self.tamanho_lote:
+            restante = prazo - time.perf_counter()
+            try:
+                if restante > 0:
+                    lote.append(self.fila.get(timeout=restante))
+                else:
+                    lote.append(self.fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _loop(self):
+        while self.running or not self.fila.empty():
+            lote = self._montar_lote()
+            if lote:
+                self.processar_lote(lote)
+
+    def processar_lote(self, lote):
+        try:
+            resultados = self.model.predict(source=[p.frame for p in lote], conf=self.conf,
+                                            classes=self.classes_veiculos, verbose=False)
+        except Exception as e:
+            for pedido in lote:
+                pedido.erro = e
+                pedido._pronto.set()
+            return
+
+        # `predict` devolve um Results por frame, na mesma ordem do lote
+        for pedido, r in zip(lote, resultados):
+            try:
+                detections = extrair_deteccoes(r, self.classes_veiculos)
+                pedido.tracks = self.trackers[pedido.cam_id].update_tracks(detections, frame=pedido.frame)
+            except Exception as e:
+                pedido.erro = e
+            self.latencias[pedido.cam_id].append(time.perf_counter() - pedido.t_envio)
+            pedido._pronto.set()
+
+        self.frames_processados += len(lote)
+        self.lotes_processados += 1
+
+    def estatisticas(self):
+        decorrido = time.perf_counter() - self.t_inicio if self.t_inicio else 0.0
+        stats = {
+            'fps': self.frames_processados / decorrido if decorrido > 0 else 0.0,
+            'frames': self.frames_processados,
+            'lote_medio': self.frames_processados / self.lotes_processados if self.lotes_processados else 0.0,
+            'cameras': {},
+        }
+        for cam_id, lat in self.latencias.items():
+            if lat:
+                p50, p99 = np.percentile(np.fromiter(lat, dtype=np.float64), [50, 99])
+                stats['cameras'][cam_id] = {'p50_ms': float(p50) * 1000, 'p99_ms': float(p99) * 1000}
+        return stats
@@ -0,0 +1,102 @@
+import numpy as np
+from compensacao import deslocar_pontos
+
+
+class EstadoTracks:
+    """
+    Estado dos tracks (posição, velocidade e contador de frames parado) em
+    colunas NumPy pré-alocadas. Um mapa track_id -> slot indexa as colunas e os
+    slots de tracks removidos são reaproveitados, então a memória depende só do
+    número de tracks vivos ao mesmo tempo, não de há quanto tempo o sistema roda.
+    """
+
+    def __init__(self, limiar_velocidade=1.0, max_age=30, capacidade=64):
+        self.limiar_velocidade = limiar_velocidade
+        self.max_age = max_age
+        self.frame_atual = 0
+        self.slots = {}        # track_id -> slot
+        self.ids = []          # slot -> track_id (None se livre)
+        self.livres = []
+        self.pos = np.zeros((0, 2), dtype=np.float64)
+        self.velocidade = np.zeros(0, dtype=np.float64)
+        self.parado = np.zeros(0, dtype=np.int32)
+        self.ultimo_frame = np.zeros(0, dtype=np.int64)
+        self.ocupado = np.zeros(0, dtype=bool)
+        self._crescer(capacidade)
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, track_id):
+        return track_id in self.slots
+
+    def _crescer(self, nova_capacidade):
+        antiga = len(self.ids)
+        extra = nova_capacidade - antiga
+        self.pos = np.concatenate([self.pos, np.zeros((extra, 2))])
+        self.velocidade = np.concatenate([self.velocidade, np.full(extra, -1.0)])
+        self.parado = np.concatenate([self.parado, np.zeros(extra, dtype=np.int32)])
+        self.ultimo_frame = np.concatenate([self.ultimo_frame, np.zeros(extra, dtype=np.int64)])
+        self.ocupado = np.concatenate([self.ocupado, np.zeros(extra, dtype=bool)])
+        self.ids.extend([None] * extra)
+        # pop() devolve os slots de menor índice primeiro
+        self.livres.extend(range(nova_capacidade - 1, antiga - 1, -1))
+
+    def _alocar(self, track_id):
+        if not self.livres:
+            self._crescer(2 * len(self.ids))
+        slot = self.livres.pop()
+        self.slots[track_id] = slot
+        self.ids[slot] = track_id
+        self.ocupado[slot] = True
+        return slot
+
+    def _liberar(self, slot):
+        del self.slots[self.ids[slot]]
+        self.ids[slot] = None
+        self.ocupado[slot] = False
+        self.livres.append(slot)
+
+    def atualizar(self, track_ids, centros, movimento_camera):
+        """
+        Avança um frame. `centros` é um array Nx2 com os centros atuais dos
+        tracks confirmados e `movimento_camera` o vetor (dx, dy) ou a matriz 3x3
+        da compensação. Retorna (velocidades, parados) alinhados com `track_ids`;
+        tracks novos têm velocidade -1.
+        """
+        self.frame_atual += 1
+        centros = np.asarray(centros, dtype=np.float64).reshape(-1, 2)
+
+        novos = np.array([track_id not in self.slots for track_id in track_ids], dtype=bool)
+        idx = np.array([self.slots[t] if t in self.slots else self._alocar(t) for t in track_ids],
+                       dtype=np.intp)
+
+        esperado = deslocar_pontos(movimento_camera, self.pos[idx])
+        velocidades = np.hypot(*(centros - esperado).T)
+        velocidades[novos] = -1.0
+
+        parado = np.where(velocidades < self.limiar_velocidade, self.parado[idx] + 1, 0)
+        parado[novos] = 0
+
+        self.pos[idx] = centros
+        self.velocidade[idx] = velocidades
+        self.parado[idx] = parado
+        self.ultimo_frame[idx] = self.frame_atual
+        return velocidades, parado
+
+    def expirar(self, ids_vivos=None):
+        """
+        Libera os tracks sem atualização há mais de `max_age` frames e, se
+        `ids_vivos` for passado, os que o tracker já removeu.
+        """
+        vencidos = np.flatnonzero(self.ocupado & (self.frame_atual - self.ultimo_frame > self.max_age))
+        for slot in vencidos:
+            self._liberar(slot)
+        if ids_vivos is not None:
+            vivos = set(ids_vivos)
+            for track_id in [t for t in self.slots if t not in vivos]:
+                self._liberar(self.slots[track_id])
+
+    def parado_de(self, track_id):
+        slot = self.slots.get(track_id)
+        return 0 if slot is None else int(self.parado[slot])
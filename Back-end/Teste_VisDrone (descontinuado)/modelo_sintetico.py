@@ -0,0 +1,87 @@
+import cv2
+import numpy as np
+
+
+class _Tensor:
+    """Imita o pouco de torch.Tensor que o código usa (.cpu().numpy() e indexação)."""
+
+    def __init__(self, dados):
+        self.dados = np.asarray(dados)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.dados
+
+    def __getitem__(self, i):
+        return _Tensor(self.dados[i])
+
+    def __float__(self):
+        return float(self.dados)
+
+    def __int__(self):
+        return int(self.dados)
+
+    def __len__(self):
+        return len(self.dados)
+
+
+class _Boxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = _Tensor(np.asarray(xyxy, dtype=np.float32).reshape(-1, 4))
+        self.conf = _Tensor(np.asarray(conf, dtype=np.float32))
+        self.cls = _Tensor(np.asarray(cls, dtype=np.float32))
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield _Boxes(self.xyxy.dados[i:i + 1], self.conf.dados[i:i + 1], self.cls.dados[i:i + 1])
+
+
+class _Resultado:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class ModeloSintetico:
+    """
+    Substituto minúsculo do YOLO para benchmarks offline em CPU. Detecta os
+    retângulos saturados do video_sintetico (saturação alta no HSV) e responde
+    com a mesma interface de `predict`/Results que o código usa.
+    Com `input_size`, reduz o frame como o YOLO faz antes de detectar, e
+    veículos pequenos num frame grande somem do mesmo jeito.
+    """
+
+    def __init__(self, classe=3, conf=0.9, area_minima=200, input_size=None):
+        self.classe = classe
+        self.conf_fixa = conf
+        self.area_minima = area_minima
+        self.input_size = input_size
+
+    def _detectar(self, frame, input_size=None):
+        escala = 1.0
+        if input_size and max(frame.shape[:2]) > input_size:
+            escala = input_size / max(frame.shape[:2])
+            frame = cv2.resize(frame, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        mascara = cv2.inRange(hsv, (0, 150, 100), (180, 255, 255))
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mascara, connectivity=8)
+        stats = stats[1:n]
+        stats = stats[stats[:, cv2.CC_STAT_AREA] >= self.area_minima]
+        x, y = stats[:, cv2.CC_STAT_LEFT], stats[:, cv2.CC_STAT_TOP]
+        w, h = stats[:, cv2.CC_STAT_WIDTH], stats[:, cv2.CC_STAT_HEIGHT]
+        xyxy = np.stack([x, y, x + w, y + h], axis=1) / escala if len(stats) else np.empty((0, 4))
+        return _Resultado(_Boxes(xyxy, np.full(len(stats), self.conf_fixa), np.full(len(stats), self.classe)))
+
+    def predict(self, source=None, conf=0.25, classes=None, stream=False, verbose=False, imgsz=None, **kwargs):
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        resultados = []
+        for frame in frames:
+            r = self._detectar(frame, imgsz or self.input_size)
+            if conf > self.conf_fixa or (classes is not None and self.classe not in classes):
+                r = _Resultado(_Boxes(np.empty((0, 4)), [], []))
+            resultados.append(r)
+        return iter(resultados) if stream else resultados
@@ -0,0 +1,91 @@
+"""
+Perfil de inicialização do Testes_camera: quanto tempo leva até o menu
+aparecer (imports) e quanto tempo o usuário espera pela primeira detecção
+depois de escolher uma opção. Cada medida roda num processo novo, para os
+imports não virem do cache do interpretador.
+
+Modos comparados:
+    imediato          modelo e tracker construídos no import (comportamento antigo)
+    sob_demanda       construídos na primeira detecção
+    aquecimento       construídos e aquecidos em segundo plano enquanto o menu espera
+
+Uso:
+    python perfil_inicializacao.py --modelo pesos.pt --espera 3 --meta 0.5
+Sai com código 1 se o tempo até o menu no modo sob_demanda não cair pelo
+menos `--meta` (fração) em relação ao imediato.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import numpy as np
+
+PASTA = os.path.dirname(os.path.abspath(__file__))
+MODOS = ("imediato", "sob_demanda", "aquecimento")
+
+# Roda dentro do processo filho; imprime uma linha JSON com os tempos
+_SCRIPT_FILHO = r"""
+import time
+t0 = time.perf_counter()
+import sys, json
+sys.path.insert(0, {pasta!r})
+import Testes_camera as tc
+menu = time.perf_counter() - t0
+if {aquecer!r}:
+    tc.aquecer_em_segundo_plano()
+time.sleep({espera!r})
+import numpy as np
+from video_sintetico import gerar_frames
+frame, _ = next(gerar_frames(n_frames=1))
+t1 = time.perf_counter()
+tc.analisar_frame(frame, None, np.array([0, 0]))
+print(json.dumps({{"menu_s": menu, "primeira_deteccao_s": time.perf_counter() - t1}}))
+"""
+
+
+def medir(modo, espera):
+    env = dict(os.environ)
+    env["CAREVISION_CARREGAMENTO"] = "imediato" if modo == "imediato" else "sob_demanda"
+    codigo = _SCRIPT_FILHO.format(pasta=PASTA, aquecer=modo == "aquecimento", espera=espera)
+    saida = subprocess.run([sys.executable, "-c", codigo], env=env, cwd=PASTA,
+                           capture_output=True, text=True, check=True).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de inicialização do Testes_camera")
+    parser.add_argument("--modelo", help="pesos YOLO (padrão: o caminho do Testes_camera)")
+    parser.add_argument("--espera", type=float, default=3.0,
+                        help="segundos que o usuário leva para escolher no menu")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--meta", type=float, default=0.5,
+                        help="redução mínima do tempo até o menu (0.5 = 50%%)")
+    parser.add_argument("--saida", help="arquivo JSON com o resultado")
+    args = parser.parse_args()
+
+    if args.modelo:
+        os.environ["CAREVISION_MODELO"] = os.path.abspath(args.modelo)
+
+    resultado = {}
+    for modo in MODOS:
+        medidas = [medir(modo, args.espera) for _ in range(args.repeticoes)]
+        resultado[modo] = {chave: float(np.median([m[chave] for m in medidas]))
+                           for chave in ("menu_s", "primeira_deteccao_s")}
+
+    print(f"{'modo':<14}{'até o menu s':>14}{'1ª detecção s':>15}")
+    for modo, r in resultado.items():
+        print(f"{modo:<14}{r['menu_s']:>14.2f}{r['primeira_deteccao_s']:>15.2f}")
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({"espera_s": args.espera, "modos": resultado}, f, indent=2)
+
+    reducao = 1 - resultado["sob_demanda"]["menu_s"] / resultado["imediato"]["menu_s"]
+    print(f"\nRedução do tempo até o menu: {reducao:.0%} (meta {args.meta:.0%})")
+    if reducao < args.meta:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
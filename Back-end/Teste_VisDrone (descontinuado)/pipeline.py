@@ -0,0 +1,67 @@
+import threading
+from collections import deque
+from carevision_comum import metricas
+from carevision_comum.fontes import eh_url
+
+BLOQUEAR = "bloquear"
+DESCARTAR_ANTIGO = "descartar_antigo"
+
+
+class FilaLimitada:
+    """
+    Fila com capacidade fixa entre dois estágios do pipeline.
+    Política BLOQUEAR: o produtor espera haver espaço (vídeos gravados, nada se perde).
+    Política DESCARTAR_ANTIGO: o item mais antigo é jogado fora (fontes ao vivo,
+    o consumidor sempre pega o frame mais recente).
+    """
+
+    def __init__(self, capacidade, politica=BLOQUEAR, nome="fila"):
+        if politica not in (BLOQUEAR, DESCARTAR_ANTIGO):
+            raise ValueError(f"Política de fila desconhecida: {politica}")
+        self.capacidade = capacidade
+        self.politica = politica
+        self.nome = nome
+        self.itens = deque()
+        self.cond = threading.Condition()
+        self.fechada = False
+        self.descartados = 0
+
+    def colocar(self, item):
+        """Retorna False se a fila foi fechada (o estágio seguinte terminou)."""
+        with self.cond:
+            if self.politica == BLOQUEAR:
+                self.cond.wait_for(lambda: len(self.itens) < self.capacidade or self.fechada)
+            elif len(self.itens) >= self.capacidade:
+                self.itens.popleft()
+                self.descartados += 1
+                metricas.incrementar("frames_descartados", fila=self.nome)
+            if self.fechada:
+                return False
+            self.itens.append(item)
+            metricas.definir("fila_profundidade", len(self.itens), fila=self.nome)
+            self.cond.notify_all()
+            return True
+
+    def retirar(self, timeout=None):
+        """Retorna o próximo item, ou None quando a fila está fechada e vazia (ou no timeout)."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.itens or self.fechada, timeout)
+            if not self.itens:
+                return None
+            item = self.itens.popleft()
+            metricas.definir("fila_profundidade", len(self.itens), fila=self.nome)
+            self.cond.notify_all()
+            return item
+
+    def fechar(self):
+        with self.cond:
+            self.fechada = True
+            self.cond.notify_all()
+
+    def __len__(self):
+        return len(self.itens)
+
+
+def fonte_ao_vivo(fonte):
+    """Índices de câmera e URLs de stream são ao vivo; caminhos de arquivo não."""
+    return isinstance(fonte, int) or eh_url(fonte)
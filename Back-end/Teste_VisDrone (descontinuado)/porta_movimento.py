@@ -0,0 +1,82 @@
+import cv2
+
+PULAR = "pular"
+RECORTE = "recorte"
+COMPLETO = "completo"
+
+
+class PortaMovimento:
+    """
+    Decide, antes do YOLO, se um frame precisa de inferência. Usa diferença de
+    frames (como o detectar_movimento da interface) numa versão reduzida do
+    frame, comparando com o último frame que passou pela inferência:
+      - PULAR: nada mudou, as últimas detecções vão de novo ao tracker;
+      - RECORTE: roda o YOLO só na região que mudou (com margem);
+      - COMPLETO: frame inteiro, forçado a cada `intervalo_completo` frames
+        ou quando a região alterada é grande demais.
+    """
+
+    def __init__(self, limiar=25, area_minima=0.0005, intervalo_completo=15, margem=32,
+                 fracao_max_recorte=0.5, escala=0.25):
+        self.limiar = limiar
+        self.area_minima = area_minima
+        self.intervalo_completo = intervalo_completo
+        self.margem = margem
+        self.fracao_max_recorte = fracao_max_recorte
+        self.escala = escala
+        self.referencia = None
+        self.frames_desde_completo = 0
+        self.ultimas_deteccoes = []
+        self.contadores = {PULAR: 0, RECORTE: 0, COMPLETO: 0}
+
+    def _reduzir(self, frame):
+        small = cv2.resize(frame, None, fx=self.escala, fy=self.escala, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def decidir(self, frame):
+        """Retorna (modo, roi) com roi = (x1, y1, x2, y2) em coordenadas do frame, ou None."""
+        small = self._reduzir(frame)
+        altura, largura = frame.shape[:2]
+
+        if self.referencia is None or self.frames_desde_completo >= self.intervalo_completo:
+            return self._registrar(COMPLETO, None, small)
+
+        diff = cv2.absdiff(self.referencia, small)
+        _, mascara = cv2.threshold(diff, self.limiar, 255, cv2.THRESH_BINARY)
+        if cv2.countNonZero(mascara) < self.area_minima * mascara.size:
+            return self._registrar(PULAR, None, None)
+
+        x, y, w, h = cv2.boundingRect(mascara)
+        x1 = max(0, int(x / self.escala) - self.margem)
+        y1 = max(0, int(y / self.escala) - self.margem)
+        x2 = min(largura, int((x + w) / self.escala) + self.margem)
+        y2 = min(altura, int((y + h) / self.escala) + self.margem)
+        if (x2 - x1) * (y2 - y1) > self.fracao_max_recorte * largura * altura:
+            return self._registrar(COMPLETO, None, small)
+        return self._registrar(RECORTE, (x1, y1, x2, y2), small)
+
+    def _registrar(self, modo, roi, small):
+        self.contadores[modo] += 1
+        if modo == COMPLETO:
+            self.frames_desde_completo = 0
+        else:
+            self.frames_desde_completo += 1
+        # A referência só avança quando houve inferência, assim mudanças lentas se acumulam
+        if small is not None:
+            self.referencia = small
+        return modo, roi
+
+    def estatisticas(self):
+        total = sum(self.contadores.values())
+        stats = dict(self.contadores, total=total)
+        stats["fracao_pulada"] = self.contadores[PULAR] / total if total else 0.0
+        stats["fracao_recortada"] = self.contadores[RECORTE] / total if total else 0.0
+        return stats
+
+
+def sobrepoe(deteccao, roi):
+    (x, y, w, h), _, _ = deteccao
+    x1, y1, x2, y2 = roi
+    return x < x2 and x + w > x1 and y < y2 and y + h > y1
@@ -0,0 +1,311 @@
+"""
+Processamento em lote, sem interface, de vídeos gravados: detecção, tracking e
+lógica de veículo parado, com os vídeos distribuídos num pool de processos.
+
+Uso:
+    python processar_lote.py gravacoes/ "arquivo/2024-*/*.mp4" extra.avi \\
+        --saida resultados --formato jsonl --workers 4 --threads 2
+
+Cada vídeo gera um arquivo em --saida (<nome>.jsonl ou <nome>.parquet) com uma
+linha por track confirmado por frame (tipo "track") e uma linha por evento de
+veículo parado (tipo "veiculo_parado"). Com --formato sqlite tudo vai para
+<saida>/carevision.db (ver armazenamento.py), junto com as detecções brutas de
+cada frame, com o nome do vídeo como câmera e o horário estimado pela data de
+modificação do arquivo.
+
+O <nome> é o caminho do vídeo relativo à pasta comum a todas as entradas, com
+"__" no lugar das barras (camA/0001.mp4 -> camA__0001); se ainda assim dois
+vídeos derem o mesmo nome, cada um ganha um hash curto do caminho absoluto.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+
+EXTENSOES_VIDEO = (".mp4", ".avi", ".mov", ".mkv", ".mpg", ".mpeg", ".wmv", ".m4v")
+COLUNAS = ("tipo", "video", "frame", "tempo_s", "track_id", "x1", "y1", "x2", "y2",
+           "velocidade", "frames_parado")
+
+# Estado de cada processo do pool (preenchido em iniciar_worker)
+_worker = {}
+
+
+def expandir_entradas(entradas):
+    """Aceita arquivos, diretórios (busca recursiva por vídeos) e globs."""
+    videos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            for raiz, _, arquivos in os.walk(entrada):
+                videos.extend(os.path.join(raiz, a) for a in sorted(arquivos)
+                              if a.lower().endswith(EXTENSOES_VIDEO))
+        elif os.path.isfile(entrada):
+            videos.append(entrada)
+        else:
+            videos.extend(sorted(glob.glob(entrada, recursive=True)))
+    # Remove repetidos mantendo a ordem
+    return list(dict.fromkeys(os.path.abspath(v) for v in videos))
+
+
+def nomes_de_saida(videos):
+    """Nome único (arquivo de saída e câmera no banco) de cada vídeo, na mesma ordem."""
+    if not videos:
+        return []
+    raiz = os.path.commonpath([os.path.dirname(v) for v in videos])
+    nomes = [os.path.splitext(os.path.relpath(v, raiz))[0].replace(os.sep, "__") for v in videos]
+    contagem = {}
+    for nome in nomes:
+        contagem[nome] = contagem.get(nome, 0) + 1
+    return [f"{nome}_{hashlib.sha1(v.encode('utf-8')).hexdigest()[:8]}" if contagem[nome] > 1 else nome
+            for v, nome in zip(videos, nomes)]
+
+
+class EscritorJsonl:
+    def __init__(self, caminho):
+        self.arquivo = open(caminho, "w", encoding="utf-8")
+
+    def escrever(self, linhas):
+        for linha in linhas:
+            self.arquivo.write(json.dumps(linha, ensure_ascii=False) + "\n")
+
+    def fechar(self):
+        self.arquivo.close()
+
+
+class EscritorParquet:
+    """Grava em blocos (row groups) para não acumular o vídeo inteiro na memória."""
+
+    def __init__(self, caminho, tamanho_bloco=20000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("O formato parquet precisa do pacote pyarrow (pip install pyarrow)")
+        self.pa = pa
+        self.schema = pa.schema([
+            ("tipo", pa.string()), ("video", pa.string()), ("frame", pa.int64()),
+            ("tempo_s", pa.float64()), ("track_id", pa.string()),
+            ("x1", pa.int32()), ("y1", pa.int32()), ("x2", pa.int32()), ("y2", pa.int32()),
+            ("velocidade", pa.float64()), ("frames_parado", pa.int32()),
+        ])
+        self.writer = pq.ParquetWriter(caminho, self.schema)
+        self.tamanho_bloco = tamanho_bloco
+        self.buffer = []
+
+    def escrever(self, linhas):
+        self.buffer.extend(linhas)
+        if len(self.buffer) >= self.tamanho_bloco:
+            self._descarregar()
+
+    def _descarregar(self):
+        if self.buffer:
+            colunas = {c: [linha[c] for linha in self.buffer] for c in COLUNAS}
+            self.writer.write_table(self.pa.table(colunas, schema=self.schema))
+            self.buffer = []
+
+    def fechar(self):
+        self._descarregar()
+        self.writer.close()
+
+
+class EscritorSqlite:
+    """
+    Grava no banco indexado do armazenamento.py. A gravação só marca a data de
+    modificação no fim, então o início do vídeo é estimado como mtime - duração.
+    """
+
+    def __init__(self, caminho, video, camera, duracao_s):
+        from carevision_comum.armazenamento import ArmazemEventos
+        self.armazem = ArmazemEventos(caminho)
+        self.camera = camera
+        self.inicio = os.path.getmtime(video) - duracao_s
+
+    def escrever(self, linhas):
+        # As linhas chegam um frame por vez
+        tracks = [l for l in linhas if l["tipo"] == "track"]
+        if tracks:
+            self.armazem.registrar_tracks(
+                self.camera, self.inicio + tracks[0]["tempo_s"], [l["track_id"] for l in tracks],
+                [(l["x1"], l["y1"], l["x2"], l["y2"]) for l in tracks],
+                [l["velocidade"] for l in tracks], [l["frames_parado"] for l in tracks])
+        for l in linhas:
+            if l["tipo"] == "veiculo_parado":
+                self.armazem.registrar_evento(self.camera, "veiculo_parado", self.inicio + l["tempo_s"],
+                                              l["track_id"], (l["x1"], l["y1"], l["x2"], l["y2"]),
+                                              video=l["video"], frame=l["frame"])
+
+    def escrever_deteccoes(self, tempo_s, deteccoes):
+        self.armazem.registrar_deteccoes(self.camera, self.inicio + tempo_s, deteccoes)
+
+    def fechar(self):
+        self.armazem.fechar()
+
+
+def iniciar_worker(caminho_modelo, backend, threads, metodo_compensacao, ladrilhos="nenhum",
+                   tipo_tracker="deepsort_cache"):
+    # Limita as threads antes de importar torch/ultralytics neste processo
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    import cv2
+    import torch
+    from carevision_comum.backends import carregar_modelo
+    cv2.setNumThreads(threads)
+    torch.set_num_threads(threads)
+    _worker["modelo"] = carregar_modelo(caminho_modelo, backend)
+    _worker["metodo_compensacao"] = metodo_compensacao
+    _worker["ladrilhos"] = ladrilhos
+    _worker["tracker"] = tipo_tracker
+
+
+def processar_video(tarefa):
+    try:
+        return _processar_video(*tarefa)
+    except Exception as e:
+        # Um vídeo corrompido não pode derrubar o lote inteiro
+        return {"video": tarefa[0], "nome": tarefa[1], "saida": None, "frames": 0, "eventos": 0, "segundos": 0.0,
+                "erro": f"{type(e).__name__}: {e}"}
+
+
+def _processar_video(caminho, nome, pasta_saida, formato):
+    import cv2
+    import numpy as np
+    from analise import (detectar_e_trackear_veiculos, detectar_e_trackear_em_ladrilhos, atualizar_tracks,
+                         criar_tracker, FRAMES_PARADO, LIMIAR_VELOCIDADE, CLASSES_VEICULOS, MAX_AGE)
+    from carevision_comum.backends import ler_input_size
+    from carevision_comum.ladrilhos import DetectorLadrilhado
+    from compensacao import estimar_movimento
+    from estado_tracks import EstadoTracks
+
+    cap = cv2.VideoCapture(caminho)
+    if not cap.isOpened():
+        raise IOError("não foi possível abrir o vídeo")
+
+    fps_video = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    if formato == "sqlite":
+        # Um banco só para o lote; o WAL e o timeout do sqlite serializam os workers
+        destino = os.path.join(pasta_saida, "carevision.db")
+        escritor = EscritorSqlite(destino, caminho, nome, cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps_video)
+    else:
+        destino = os.path.join(pasta_saida, f"{nome}.{formato}")
+        escritor = EscritorParquet(destino) if formato == "parquet" else EscritorJsonl(destino)
+
+    tracker = criar_tracker(_worker["tracker"], MAX_AGE)
+    estado = EstadoTracks(LIMIAR_VELOCIDADE, max_age=MAX_AGE)
+    detector = None
+    if _worker["ladrilhos"] != "nenhum":
+        detector = DetectorLadrilhado(_worker["modelo"], CLASSES_VEICULOS, ler_input_size(),
+                                      adaptativo=_worker["ladrilhos"] == "adaptativo")
+    prev_gray = None
+    media_flow = np.array([0, 0])
+    caixas_anteriores = None
+    n_frame = 0
+    ao_detectar = None
+    if formato == "sqlite":
+        # Só o banco tem tabela de detecções; os arquivos por vídeo guardam tracks e eventos
+        ao_detectar = lambda deteccoes: escritor.escrever_deteccoes(n_frame / fps_video, deteccoes)
+    eventos = 0
+    t0 = time.perf_counter()
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if prev_gray is not None:
+                media_flow = estimar_movimento(prev_gray, gray, _worker["metodo_compensacao"],
+                                               caixas_anteriores)
+            prev_gray = gray
+
+            if detector is not None:
+                tracks = detectar_e_trackear_em_ladrilhos(frame, detector, tracker, ao_detectar)
+            else:
+                tracks = detectar_e_trackear_veiculos(frame, _worker["modelo"], tracker, CLASSES_VEICULOS,
+                                                      ao_detectar)
+            track_ids, caixas, velocidades, parados = atualizar_tracks(tracks, media_flow, estado)
+            caixas_anteriores = [tuple(c) for c in caixas.tolist()]
+
+            tempo = n_frame / fps_video
+            linhas = []
+            for track_id, (x1, y1, x2, y2), velocidade, parado in zip(
+                    track_ids, caixas.tolist(), velocidades.tolist(), parados.tolist()):
+                linha = {"tipo": "track", "video": caminho, "frame": n_frame, "tempo_s": tempo,
+                         "track_id": str(track_id), "x1": x1, "y1": y1, "x2": x2, "y2": y2,
+                         "velocidade": velocidade, "frames_parado": parado}
+                linhas.append(linha)
+                # O evento é emitido uma vez, no frame em que o veículo passa a ser considerado parado
+                if parado == FRAMES_PARADO:
+                    linhas.append(dict(linha, tipo="veiculo_parado"))
+                    eventos += 1
+            escritor.escrever(linhas)
+            n_frame += 1
+    finally:
+        cap.release()
+        escritor.fechar()
+
+    return {"video": caminho, "nome": nome, "saida": destino, "frames": n_frame, "eventos": eventos,
+            "segundos": time.perf_counter() - t0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Processamento em lote (sem interface) de vídeos do CareVision")
+    parser.add_argument("entradas", nargs="+", help="arquivos, diretórios ou globs de vídeos")
+    parser.add_argument("--saida", default="resultados", help="pasta de saída")
+    parser.add_argument("--formato", choices=("jsonl", "parquet", "sqlite"), default="jsonl")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--threads", type=int, default=2, help="threads por worker (torch/OpenCV)")
+    parser.add_argument("--modelo", default="Modelo-PréTreinado/best.pt")
+    parser.add_argument("--backend", choices=("pytorch", "onnx", "openvino"), default="pytorch")
+    parser.add_argument("--compensacao", default="denso",
+                        help="denso, denso_reduzido, lucas_kanade, afim ou homografia")
+    parser.add_argument("--ladrilhos", choices=("nenhum", "todos", "adaptativo"), default="nenhum",
+                        help="YOLO em ladrilhos do tamanho de entrada do modelo (vídeo de drone 4K)")
+    parser.add_argument("--tracker", choices=("deepsort", "deepsort_cache", "leve"), default="deepsort_cache",
+                        help="deepsort_cache: reaproveita embeddings de tracks que quase não andaram; "
+                             "leve: só movimento (Kalman + IoU), sem a CNN de aparência do DeepSort")
+    args = parser.parse_args()
+
+    videos = expandir_entradas(args.entradas)
+    if not videos:
+        print("Nenhum vídeo encontrado.")
+        return
+    os.makedirs(args.saida, exist_ok=True)
+    if args.backend != "pytorch":
+        # Exporta/valida uma vez aqui; os workers só carregam o artefato do cache
+        from carevision_comum.backends import carregar_modelo
+        carregar_modelo(args.modelo, args.backend)
+    print(f"{len(videos)} vídeo(s), {args.workers} worker(s) x {args.threads} thread(s)")
+
+    nomes = nomes_de_saida(videos)
+    if len(set(nomes)) != len(nomes):
+        # Dois workers escreveriam no mesmo arquivo (ou na mesma câmera do banco)
+        raise SystemExit("Nomes de saída repetidos: " + ", ".join(sorted({n for n in nomes if nomes.count(n) > 1})))
+    tarefas = [(v, nome, args.saida, args.formato) for v, nome in zip(videos, nomes)]
+    total_frames = 0
+    total_eventos = 0
+    falhas = 0
+    t0 = time.perf_counter()
+    with multiprocessing.Pool(args.workers, initializer=iniciar_worker,
+                              initargs=(args.modelo, args.backend, args.threads, args.compensacao,
+                                        args.ladrilhos, args.tracker)) as pool:
+        for i, r in enumerate(pool.imap_unordered(processar_video, tarefas), start=1):
+            if "erro" in r:
+                falhas += 1
+                print(f"[{i}/{len(videos)}] {r['nome']}: ERRO {r['erro']}")
+                continue
+            total_frames += r["frames"]
+            total_eventos += r["eventos"]
+            fps = r["frames"] / r["segundos"] if r["segundos"] > 0 else 0.0
+            print(f"[{i}/{len(videos)}] {r['nome']}: {r['frames']} frames "
+                  f"em {r['segundos']:.1f} s ({fps:.1f} FPS), {r['eventos']} veículo(s) parado(s)")
+
+    decorrido = time.perf_counter() - t0
+    print(f"Total: {total_frames} frames em {decorrido:.1f} s "
+          f"({total_frames / decorrido if decorrido > 0 else 0.0:.1f} FPS agregado), "
+          f"{total_eventos} evento(s) de veículo parado, {falhas} falha(s)")
+
+
+if __name__ == "__main__":
+    main()
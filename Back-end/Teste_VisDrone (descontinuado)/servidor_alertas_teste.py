@@ -0,0 +1,87 @@
+"""
+Servidor local que faz as vezes de um webhook de alertas: aceita os POSTs
+{"eventos": [...]} do DespachanteAlertas, guarda os eventos e conta as
+cópias (mesmo "id" recebido de novo). Com --falha uma fração das requisições
+responde 503, para exercitar o backoff e o spool; `servidor.fora_do_ar = True`
+faz todas falharem, como um destino caído.
+
+Uso:
+    python servidor_alertas_teste.py --porta 8091 [--falha 0.3]
+    -> http://127.0.0.1:8091/alertas
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def criar_servidor(porta=8091, falha=0.0, host="127.0.0.1", verbose=False):
+    """Sobe o servidor numa thread daemon e devolve (servidor, url)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        # HTTP/1.1 mantém a conexão aberta entre POSTs, como um webhook de verdade
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            servidor.requisicoes += 1
+            if servidor.fora_do_ar or random.random() < falha:
+                self._responder(503, b"indisponivel")
+                return
+            try:
+                eventos = json.loads(corpo)["eventos"]
+            except (ValueError, KeyError):
+                self._responder(400, b"corpo invalido")
+                return
+            with servidor.lock:
+                for evento in eventos:
+                    if evento.get("id") in servidor.ids:
+                        servidor.copias += 1
+                        continue
+                    servidor.ids.add(evento.get("id"))
+                    servidor.recebidos.append(evento)
+            if verbose:
+                print(f"{time.strftime('%H:%M:%S')} {len(eventos)} evento(s) de {self.client_address[0]}")
+            self._responder(200, b"ok")
+
+        def _responder(self, status, corpo):
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((host, porta), Handler)
+    servidor.daemon_threads = True
+    servidor.lock = threading.Lock()
+    servidor.recebidos = []
+    servidor.ids = set()
+    servidor.copias = 0
+    servidor.requisicoes = 0
+    servidor.fora_do_ar = False
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://{host}:{servidor.server_address[1]}/alertas"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook de mentira para testar o envio de alertas")
+    parser.add_argument("--porta", type=int, default=8091)
+    parser.add_argument("--falha", type=float, default=0.0, help="fração das requisições que responde 503")
+    args = parser.parse_args()
+    servidor, url = criar_servidor(args.porta, args.falha, verbose=True)
+    print(f"Recebendo alertas em {url} (Ctrl+C para sair)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.shutdown()
+        print(f"{len(servidor.recebidos)} evento(s), {servidor.copias} cópia(s), "
+              f"{servidor.requisicoes} requisição(ões)")
+
+
+if __name__ == "__main__":
+    main()
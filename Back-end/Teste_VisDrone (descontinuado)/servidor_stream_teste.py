@@ -0,0 +1,86 @@
+"""
+Servidor local que faz as vezes de uma câmera IP: reproduz um arquivo de
+vídeo em loop como MJPEG sobre HTTP (multipart/x-mixed-replace), no FPS do
+arquivo. Serve para testar FonteStream sem câmera de verdade; com --queda a
+conexão é derrubada periodicamente para exercitar a reconexão.
+
+Uso:
+    python servidor_stream_teste.py video.mp4 --porta 8090 [--queda 5]
+    -> http://127.0.0.1:8090/video.mjpg
+"""
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+
+FRONTEIRA = "quadro"
+
+
+def ler_quadros(caminho, qualidade=80):
+    """Decodifica o vídeo uma vez e guarda os JPEGs, para o servidor não pesar no teste."""
+    cap = cv2.VideoCapture(caminho)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    quadros = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        quadros.append(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, qualidade])[1].tobytes())
+    cap.release()
+    if not quadros:
+        raise ValueError(f"Nenhum frame lido de {caminho}")
+    return quadros, fps
+
+
+def criar_servidor(caminho, porta=8090, queda=None, host="127.0.0.1"):
+    """Sobe o servidor numa thread daemon e devolve (servidor, url)."""
+    quadros, fps = ler_quadros(caminho)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/video.mjpg":
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={FRONTEIRA}")
+            self.end_headers()
+            inicio = time.monotonic()
+            i = 0
+            try:
+                while queda is None or time.monotonic() - inicio < queda:
+                    jpeg = quadros[i % len(quadros)]
+                    self.wfile.write(f"--{FRONTEIRA}\r\nContent-Type: image/jpeg\r\n"
+                                     f"Content-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n")
+                    i += 1
+                    # Respeita o relógio do vídeo, como uma câmera ao vivo
+                    time.sleep(max(0.0, inicio + i / fps - time.monotonic()))
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((host, porta), Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://{host}:{servidor.server_address[1]}/video.mjpg"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Câmera IP de mentira: reproduz um vídeo como MJPEG/HTTP")
+    parser.add_argument("video")
+    parser.add_argument("--porta", type=int, default=8090)
+    parser.add_argument("--queda", type=float, help="derruba cada conexão depois de N segundos")
+    args = parser.parse_args()
+    servidor, url = criar_servidor(args.video, args.porta, args.queda)
+    print(f"Servindo {args.video} em {url} (Ctrl+C para sair)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
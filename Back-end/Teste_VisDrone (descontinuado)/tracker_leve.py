@@ -0,0 +1,228 @@
+"""
+Tracker só de movimento, alternativa ao DeepSort quando a CNN de aparência
+domina o tempo do frame (cenas com dezenas de veículos em CPU).
+
+Cada track é um filtro de Kalman de velocidade constante sobre (cx, cy, w, h);
+média e covariância de todos os tracks ficam em arrays Nx8 e Nx8x8 e a
+predição/correção rodam para todos de uma vez. A associação segue o
+ByteTrack: primeiro as detecções de confiança alta contra todos os tracks
+por IoU, depois as de confiança baixa contra os tracks confirmados que
+sobraram, o que segura o track de um veículo parcialmente encoberto sem
+criar tracks novos com detecções ruins.
+
+`update_tracks(detections, frame=None)` recebe a mesma lista
+([x, y, w, h], conf, cls) do DeepSort e devolve objetos com `track_id`,
+`is_confirmed()` e `to_ltrb()`, então o resto do código não muda.
+"""
+import numpy as np
+
+# Desvios do ruído do Kalman, proporcionais ao tamanho da caixa (mesmos pesos do ByteTrack)
+PESO_POSICAO = 1.0 / 20
+PESO_VELOCIDADE = 1.0 / 160
+
+_F = np.eye(8)
+_F[:4, 4:] = np.eye(4)
+
+
+def iou_matriz(a, b):
+    """IoU entre as caixas (x1, y1, x2, y2) de `a` (Nx4) e `b` (Mx4), NxM."""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def associar(caixas_tracks, caixas_deteccoes, iou_minimo):
+    """
+    Associação gulosa pelo maior IoU. Retorna (pares Kx2 de índices
+    track/detecção, tracks sem par, detecções sem par).
+    """
+    n, m = len(caixas_tracks), len(caixas_deteccoes)
+    if n == 0 or m == 0:
+        return np.empty((0, 2), dtype=np.intp), np.arange(n), np.arange(m)
+    iou = iou_matriz(caixas_tracks, caixas_deteccoes)
+    candidatos = np.argwhere(iou >= iou_minimo)
+    candidatos = candidatos[np.argsort(-iou[candidatos[:, 0], candidatos[:, 1]], kind="stable")]
+    track_livre = np.ones(n, dtype=bool)
+    deteccao_livre = np.ones(m, dtype=bool)
+    pares = []
+    for i, j in candidatos.tolist():
+        if track_livre[i] and deteccao_livre[j]:
+            track_livre[i] = deteccao_livre[j] = False
+            pares.append((i, j))
+    pares = np.array(pares, dtype=np.intp).reshape(-1, 2)
+    return pares, np.flatnonzero(track_livre), np.flatnonzero(deteccao_livre)
+
+
+def _xywh_para_ltrb(xywh):
+    return np.concatenate([xywh[:, :2] - xywh[:, 2:4] / 2, xywh[:, :2] + xywh[:, 2:4] / 2], axis=1)
+
+
+class TrackLeve:
+    """O pedaço da interface de um Track do DeepSort que o CareVision usa."""
+    __slots__ = ("track_id", "ltrb", "confirmado", "time_since_update", "hits", "det_conf", "det_class")
+
+    def __init__(self, track_id):
+        self.track_id = track_id
+
+    def is_confirmed(self):
+        return self.confirmado
+
+    def is_tentative(self):
+        return not self.confirmado
+
+    def to_ltrb(self, orig=False):
+        return self.ltrb.copy()
+
+    def to_ltwh(self, orig=False):
+        x1, y1, x2, y2 = self.ltrb
+        return np.array([x1, y1, x2 - x1, y2 - y1])
+
+
+class TrackerLeve:
+    def __init__(self, max_age=30, n_init=3, limiar_alto=0.5, limiar_baixo=0.1, iou_minimo=0.2,
+                 iou_minimo_baixo=0.5):
+        # Com o conf=0.5 do predict todas as detecções são "altas"; a segunda associação
+        # só entra em jogo quando o predict roda com conf menor que `limiar_alto`
+        self.max_age = max_age
+        self.n_init = n_init
+        self.limiar_alto = limiar_alto
+        self.limiar_baixo = limiar_baixo
+        self.iou_minimo = iou_minimo
+        self.iou_minimo_baixo = iou_minimo_baixo
+
+        self.media = np.zeros((0, 8))
+        self.covariancia = np.zeros((0, 8, 8))
+        self.ids = []
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.sem_update = np.zeros(0, dtype=np.int64)
+        self.confirmado = np.zeros(0, dtype=bool)
+        self.conf = np.zeros(0)
+        self.classe = np.zeros(0, dtype=np.int64)
+        self.proximo_id = 1
+        self.objetos = {}  # track_id -> TrackLeve, reaproveitado entre frames
+
+    def __len__(self):
+        return len(self.ids)
+
+    # === Kalman vetorizado ===
+    def _prever(self):
+        if not len(self.ids):
+            return
+        wh = np.tile(self.media[:, 2:4], 2)
+        desvios = np.concatenate([PESO_POSICAO * wh, PESO_VELOCIDADE * wh], axis=1)
+        self.media = self.media @ _F.T
+        self.media[:, 2:4] = np.maximum(self.media[:, 2:4], 1.0)
+        self.covariancia = _F @ self.covariancia @ _F.T
+        self.covariancia[:, np.arange(8), np.arange(8)] += desvios ** 2
+        self.sem_update += 1
+
+    def _corrigir(self, idx, medidas):
+        wh = np.tile(self.media[idx, 2:4], 2)
+        p = self.covariancia[idx]
+        s = p[:, :4, :4].copy()
+        s[:, np.arange(4), np.arange(4)] += (PESO_POSICAO * wh) ** 2
+        # K = P Hᵀ S⁻¹, com H = [I 0]: P Hᵀ são as 4 primeiras colunas de P
+        ganho = np.linalg.solve(s, p[:, :, :4].transpose(0, 2, 1)).transpose(0, 2, 1)
+        inovacao = medidas - self.media[idx, :4]
+        self.media[idx] += (ganho @ inovacao[:, :, None])[:, :, 0]
+        self.covariancia[idx] = p - ganho @ s @ ganho.transpose(0, 2, 1)
+
+    def _criar(self, medidas, confs, classes):
+        n = len(medidas)
+        wh = np.tile(medidas[:, 2:4], 2)
+        desvios = np.concatenate([2 * PESO_POSICAO * wh, 10 * PESO_VELOCIDADE * wh], axis=1)
+        covariancia = np.zeros((n, 8, 8))
+        covariancia[:, np.arange(8), np.arange(8)] = desvios ** 2
+        self.media = np.concatenate([self.media, np.concatenate([medidas, np.zeros((n, 4))], axis=1)])
+        self.covariancia = np.concatenate([self.covariancia, covariancia])
+        self.ids.extend(str(self.proximo_id + i) for i in range(n))
+        self.proximo_id += n
+        self.hits = np.concatenate([self.hits, np.ones(n, dtype=np.int64)])
+        self.sem_update = np.concatenate([self.sem_update, np.zeros(n, dtype=np.int64)])
+        self.confirmado = np.concatenate([self.confirmado, np.full(n, self.n_init <= 1)])
+        self.conf = np.concatenate([self.conf, confs])
+        self.classe = np.concatenate([self.classe, classes])
+
+    def _manter(self, mascara):
+        for track_id in [t for t, manter in zip(self.ids, mascara.tolist()) if not manter]:
+            self.objetos.pop(track_id, None)
+        self.ids = [t for t, manter in zip(self.ids, mascara.tolist()) if manter]
+        self.media = self.media[mascara]
+        self.covariancia = self.covariancia[mascara]
+        self.hits = self.hits[mascara]
+        self.sem_update = self.sem_update[mascara]
+        self.confirmado = self.confirmado[mascara]
+        self.conf = self.conf[mascara]
+        self.classe = self.classe[mascara]
+
+    # === Interface do DeepSort ===
+    def update_tracks(self, raw_detections, embeds=None, frame=None, **kwargs):
+        self._prever()
+
+        deteccoes = [d for d in raw_detections if d[1] is None or d[1] >= self.limiar_baixo]
+        ltwh = np.array([d[0] for d in deteccoes], dtype=np.float64).reshape(-1, 4)
+        confs = np.array([1.0 if d[1] is None else d[1] for d in deteccoes], dtype=np.float64)
+        classes = np.array([d[2] for d in deteccoes], dtype=np.int64)
+        medidas = np.concatenate([ltwh[:, :2] + ltwh[:, 2:] / 2, ltwh[:, 2:]], axis=1)
+        caixas = np.concatenate([ltwh[:, :2], ltwh[:, :2] + ltwh[:, 2:]], axis=1)
+        caixas_tracks = _xywh_para_ltrb(self.media)
+
+        # 1ª associação: detecções de confiança alta contra todos os tracks
+        altas = np.flatnonzero(confs >= self.limiar_alto)
+        baixas = np.flatnonzero(confs < self.limiar_alto)
+        pares, tracks_livres, altas_livres = associar(caixas_tracks, caixas[altas], self.iou_minimo)
+        idx_tracks = [pares[:, 0]]
+        idx_deteccoes = [altas[pares[:, 1]]]
+
+        # 2ª associação: detecções baixas só recuperam tracks confirmados, e com IoU maior
+        candidatos = tracks_livres[self.confirmado[tracks_livres]]
+        pares, _, _ = associar(caixas_tracks[candidatos], caixas[baixas], self.iou_minimo_baixo)
+        idx_tracks.append(candidatos[pares[:, 0]])
+        idx_deteccoes.append(baixas[pares[:, 1]])
+
+        idx_tracks = np.concatenate(idx_tracks)
+        idx_deteccoes = np.concatenate(idx_deteccoes)
+        if len(idx_tracks):
+            self._corrigir(idx_tracks, medidas[idx_deteccoes])
+            self.sem_update[idx_tracks] = 0
+            self.hits[idx_tracks] += 1
+            self.conf[idx_tracks] = confs[idx_deteccoes]
+            self.classe[idx_tracks] = classes[idx_deteccoes]
+            self.confirmado |= self.hits >= self.n_init
+
+        # Como no DeepSort: track tentativo que perde um frame some, confirmado some depois de max_age
+        atualizado = self.sem_update == 0
+        self._manter((self.confirmado | atualizado) & (self.sem_update <= self.max_age))
+        novas = altas[altas_livres]
+        if len(novas):
+            self._criar(medidas[novas], confs[novas], classes[novas])
+        return self._tracks()
+
+    def prever_tracks(self):
+        """Frame sem inferência: só a predição, sem contar como frame perdido (nada é removido)."""
+        self._prever()
+        return self._tracks()
+
+    def _tracks(self):
+        caixas = _xywh_para_ltrb(self.media)
+        tracks = []
+        for i, track_id in enumerate(self.ids):
+            track = self.objetos.get(track_id)
+            if track is None:
+                track = self.objetos[track_id] = TrackLeve(track_id)
+            track.ltrb = caixas[i]
+            track.confirmado = bool(self.confirmado[i])
+            track.time_since_update = int(self.sem_update[i])
+            track.hits = int(self.hits[i])
+            track.det_conf = float(self.conf[i]) if self.sem_update[i] == 0 else None
+            track.det_class = int(self.classe[i])
+            tracks.append(track)
+        return tracks
+
+    def delete_all_tracks(self):
+        self._manter(np.zeros(len(self.ids), dtype=bool))
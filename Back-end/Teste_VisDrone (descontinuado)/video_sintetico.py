@@ -0,0 +1,92 @@
+"""
+Gerador determinístico de vídeo sintético para benchmarks: fundo texturizado
+visto por uma câmera que faz pan, "veículos" retangulares coloridos andando em
+velocidade constante e alguns parados. A mesma semente gera sempre o mesmo vídeo.
+
+Uso:
+    python video_sintetico.py saida.avi --frames 300 --largura 1280 --altura 720
+"""
+import argparse
+import cv2
+import numpy as np
+
+CORES_VEICULOS = [(0, 0, 255), (0, 200, 255), (255, 0, 0), (0, 255, 0), (255, 0, 255), (255, 255, 0)]
+
+
+def gerar_frames(n_frames=300, largura=1280, altura=720, n_veiculos=12, n_parados=3,
+                 pan=(2.0, 0.5), seed=0, com_ids=False):
+    """
+    Gera (frame, caixas) para cada frame. `caixas` é a lista (x1, y1, x2, y2)
+    dos veículos visíveis, em coordenadas do frame. Com `com_ids=True` gera
+    (frame, caixas, ids), o índice de cada veículo, para medir trocas de ID.
+    """
+    rng = np.random.default_rng(seed)
+    margem_x = int(abs(pan[0]) * n_frames) + 1
+    margem_y = int(abs(pan[1]) * n_frames) + 1
+    cena = rng.integers(60, 160, size=(altura + margem_y, largura + margem_x), dtype=np.uint8)
+    cena = cv2.cvtColor(cv2.GaussianBlur(cena, (0, 0), 2), cv2.COLOR_GRAY2BGR)
+
+    veiculos = []
+    for i in range(n_veiculos):
+        w, h = int(rng.integers(40, 90)), int(rng.integers(25, 50))
+        x, y = rng.uniform(0, largura + margem_x - w), rng.uniform(0, altura + margem_y - h)
+        if i < n_parados:
+            vx, vy = 0.0, 0.0
+        else:
+            vx, vy = rng.uniform(-6, 6), rng.uniform(-3, 3)
+        veiculos.append([x, y, w, h, vx, vy, CORES_VEICULOS[i % len(CORES_VEICULOS)]])
+
+    for k in range(n_frames):
+        ox = int(round(pan[0] * k)) if pan[0] >= 0 else margem_x - 1 + int(round(pan[0] * k))
+        oy = int(round(pan[1] * k)) if pan[1] >= 0 else margem_y - 1 + int(round(pan[1] * k))
+        frame = cena[oy:oy + altura, ox:ox + largura].copy()
+
+        caixas = []
+        ids = []
+        for i, v in enumerate(veiculos):
+            x, y, w, h, vx, vy, cor = v
+            # Os veículos "dão a volta" na cena para o número visível ficar estável
+            cx = (x + vx * k) % (largura + margem_x - w)
+            cy = (y + vy * k) % (altura + margem_y - h)
+            x1, y1 = int(cx) - ox, int(cy) - oy
+            x2, y2 = x1 + w, y1 + h
+            if x2 <= 0 or y2 <= 0 or x1 >= largura or y1 >= altura:
+                continue
+            cv2.rectangle(frame, (x1, y1), (x2, y2), cor, -1)
+            caixas.append((max(0, x1), max(0, y1), min(largura, x2), min(altura, y2)))
+            ids.append(i)
+        yield (frame, caixas, ids) if com_ids else (frame, caixas)
+
+
+def gravar_video(caminho, fps=30, **kwargs):
+    """Grava o vídeo sintético em MJPG (.avi), disponível em qualquer build do OpenCV."""
+    writer = None
+    n = 0
+    for frame, _ in gerar_frames(**kwargs):
+        if writer is None:
+            altura, largura = frame.shape[:2]
+            writer = cv2.VideoWriter(caminho, cv2.VideoWriter_fourcc(*"MJPG"), fps, (largura, altura))
+        writer.write(frame)
+        n += 1
+    if writer is not None:
+        writer.release()
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera um vídeo sintético determinístico")
+    parser.add_argument("saida")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--largura", type=int, default=1280)
+    parser.add_argument("--altura", type=int, default=720)
+    parser.add_argument("--veiculos", type=int, default=12)
+    parser.add_argument("--parados", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    n = gravar_video(args.saida, n_frames=args.frames, largura=args.largura, altura=args.altura,
+                     n_veiculos=args.veiculos, n_parados=args.parados, seed=args.seed)
+    print(f"{n} frames gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
-from ultralytics import YOLO
 import cv2
-from matplotlib import pyplot as plt
+from carevision_comum.backends import carregar_modelo, ler_input_size
+from carevision_comum.sob_demanda import SobDemanda, aquecer_modelo
 
-model = YOLO("Modelos/best.pt")
+# ultralytics (e o torch junto) só é importado quando o modelo é usado pela primeira vez (ou pelo aquecimento)
+model_yolo = SobDemanda(lambda: carregar_modelo("Modelos/best.pt"), "modelo")
+
+def aquecer_em_segundo_plano():
+    model_yolo.aquecer_em_segundo_plano(lambda modelo: aquecer_modelo(modelo, ler_input_size()))
 
 def rodar_video(video_path):
     cap = cv2.VideoCapture(video_path)
@@ -12,7 +16,7 @@ def rodar_video(video_path):
         if not ret:
             break
 
-        results = model.predict(source=frame, conf=0.5, stream=True)
+        results = model_yolo.predict(source=frame, conf=0.5, stream=True)
 
         for r in results:
             annotated_frame = r.plot()
@@ -32,7 +36,7 @@ def rodar_webcam():
         if not ret:
             break
 
-        results = model.predict(source=frame, conf=0.5, stream=True)
+        results = model_yolo.predict(source=frame, conf=0.5, stream=True)
 
         for r in results:
             annotated_frame = r.plot()
@@ -45,8 +49,9 @@ def rodar_webcam():
     cv2.destroyAllWindows()
 
 def testar_imagem(caminho_imagem):
+    from matplotlib import pyplot as plt
     # Faz a predição
-    results = model.predict(caminho_imagem, conf=0.5, show=False)  # show=False para não abrir janela do cv2
+    results = model_yolo.predict(caminho_imagem, conf=0.5, show=False)  # show=False para não abrir janela do cv2
 
     # Pega a imagem anotada do primeiro resultado
     annotated_img = results[0].plot()
@@ -75,4 +80,7 @@ def iniciar_sess():
     else:
         print("Opção inválida.")
 
-iniciar_sess()
\ No newline at end of file
+if __name__ == "__main__":
+    # Carrega e aquece o modelo em segundo plano enquanto o menu espera a escolha
+    aquecer_em_segundo_plano()
+    iniciar_sess()
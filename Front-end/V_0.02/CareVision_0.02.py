@@ -1,26 +1,76 @@
+import functools
 import sys
-import cv2
 import time
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QWidget, QScrollArea,
     QCheckBox, QLabel, QHBoxLayout, QMenuBar, QMenu, QAction, QFrame,
-    QPushButton, QInputDialog
+    QPushButton, QInputDialog, QSizePolicy
 )
-from PyQt5.QtCore import Qt, QSettings, pyqtSignal
+from PyQt5.QtCore import Qt, QSettings, QTimer, pyqtSignal
 from PyQt5.QtGui import QImage, QPixmap
 
+# Módulos compartilhados com o back-end: pacote carevision_comum (pip install -e . na raiz)
+from carevision_comum import metricas
+from carevision_comum.metricas import cronometro
+from camera_hub import CameraHub
+from hub_processos import CameraHubProcessos
+from detector_movimento import DetectorMovimento
+from renderizacao import QuadroCompartilhado, Mosaico
+from descoberta_cameras import (descobrir_cameras, ler_cache, salvar_cache, ler_cameras_rede,
+                                adicionar_camera_rede)
+from carevision_comum.armazenamento import ArmazemEventos
+from carevision_comum.envio_alerta import DespachanteAlertas, ler_destinos
+from alertas import BarramentoAlertas
+from painel_alertas import ModeloAlertas, PainelAlertas
+
+# Período fixo de uma volta do monitor por todas as câmeras (segundos)
+PERIODO_MONITOR = 0.1
+# Intervalo entre redescobertas de câmeras em segundo plano (segundos)
+PERIODO_REDESCOBERTA = 30.0
+# Alertas: ocorrências da mesma câmera dentro da janela (s) viram um alerta só; no máximo TAXA
+# alertas novos por segundo (RAJADA seguidos) e HISTORICO alertas na lista
+JANELA_ALERTAS = 30.0
+TAXA_ALERTAS = 2.0
+RAJADA_ALERTAS = 20
+HISTORICO_ALERTAS = 1000
+
+
+def quadro_para_pixmap(rgb):
+    # O array já vem no tamanho de exibição e em RGB: só falta o upload
+    h, w = rgb.shape[:2]
+    qt_image = QImage(rgb.data, w, h, 3 * w, QImage.Format_RGB888)
+    return QPixmap.fromImage(qt_image)
+
+
+def intervalo_exibicao():
+    # Período (ms) da taxa de atualização da tela principal; 60 Hz se não der para saber
+    tela = QApplication.primaryScreen()
+    taxa = tela.refreshRate() if tela is not None else 0
+    return max(1, int(1000 / (taxa if taxa > 0 else 60)))
+
+
+def registrar_leitura(assinatura, fila):
+    # Frames que o consumidor pulou e quantos ainda estavam esperando no buffer
+    if assinatura.descartados:
+        metricas.incrementar("frames_descartados", assinatura.descartados, fila=fila)
+        assinatura.descartados = 0
+    metricas.definir("fila_profundidade", assinatura.atraso, fila=fila)
+
 
 class VideoWindow(QWidget):
     janela_fechada = pyqtSignal(int)
 
-    def __init__(self, cap, nome_camera, cam_index):
+    def __init__(self, assinatura, nome_camera, cam_index):
         super().__init__()
-        self.cap = cap
+        self.assinatura = assinatura
         self.cam_index = cam_index
         self.setWindowTitle(f"Visualização - {nome_camera}")
 
         self.label_video = QLabel()
         self.label_video.setAlignment(Qt.AlignCenter)
+        # O pixmap tem exatamente o tamanho do label; sem isso o layout cresceria junto com ele
+        self.label_video.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        self.quadro = QuadroCompartilhado()
 
         layout = QVBoxLayout(self)
         layout.addWidget(self.label_video)
@@ -32,6 +82,12 @@ class VideoWindow(QWidget):
         self.running = True
         self.start_video_thread()
 
+        # A repintura acontece na thread da interface, no ritmo da tela
+        self.timer_exibicao = QTimer(self)
+        self.timer_exibicao.setTimerType(Qt.PreciseTimer)
+        self.timer_exibicao.timeout.connect(self.exibir_frame)
+        self.timer_exibicao.start(intervalo_exibicao())
+
         self.show()
 
     def start_video_thread(self):
@@ -41,84 +97,116 @@ class VideoWindow(QWidget):
 
     def update_frame(self):
         while self.running:
-            ret, frame = self.cap.read()
-            if ret:
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = frame_rgb.shape
-                bytes_per_line = ch * w
-                qt_image = QImage(frame_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
-
-                pixmap = QPixmap.fromImage(qt_image).scaled(
-                    self.label_video.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                self.label_video.setPixmap(pixmap)
-            else:
+            frame = self.assinatura.ler(mais_recente=True)
+            if frame is not None:
+                registrar_leitura(self.assinatura, f"preview_{self.cam_index}")
+                if metricas.OVERLAY:
+                    # O frame do buffer é compartilhado: o overlay vai numa cópia
+                    frame = frame.copy()
+                    metricas.desenhar_overlay(frame)
+                # Só redimensiona e converte; quem mexe no QLabel é exibir_frame, na thread da interface
+                with cronometro("estagio", estagio="redimensionamento", janela="preview"):
+                    self.quadro.publicar(frame, self.assinatura.tempo_captura)
+            elif not self.assinatura.ativa():
                 break
-            cv2.waitKey(30)
+
+    def exibir_frame(self):
+        self.quadro.tamanho = (self.label_video.width(), self.label_video.height())
+        pronto = self.quadro.pegar()
+        if pronto is None:
+            return
+        rgb, tempo_captura, descartados = pronto
+        with cronometro("estagio", estagio="qt", janela="preview"):
+            self.label_video.setPixmap(quadro_para_pixmap(rgb))
+        if descartados:
+            metricas.incrementar("frames_descartados", descartados, fila=f"exibicao_{self.cam_index}")
+        metricas.observar("latencia_captura_exibicao", time.perf_counter() - tempo_captura,
+                          camera=self.cam_index)
 
     def closeEvent(self, event):
-        # Apenas para parar o thread e emitir o sinal, mas NÃO liberar o cap aqui
+        # Apenas para parar o thread e emitir o sinal, mas NÃO cancelar a assinatura aqui
+        self.timer_exibicao.stop()
         if self.running:
             self.running = False
             self.janela_fechada.emit(self.cam_index)
         event.accept()
 
 class AllCamerasWindow(QWidget):
-    def __init__(self, cameras_indices, settings):
+    def __init__(self, cameras_indices, settings, hub):
         super().__init__()
         self.setWindowTitle("Visualização de Todas as Câmeras")
         self.settings = settings
         self.cameras_indices = cameras_indices
-        self.capturas = {}
-        self.labels = {}
-
-        layout = QHBoxLayout(self)
-        self.setLayout(layout)
+        self.assinaturas = {}
 
-        # Para cada câmera, abre e adiciona QLabel para exibir o vídeo
+        # Assina o feed compartilhado de cada câmera; cada uma ganha um tile no mosaico
         for idx in cameras_indices:
-            cap = cv2.VideoCapture(idx, cv2.CAP_DSHOW)
-            if cap.isOpened():
-                self.capturas[idx] = cap
-                label = QLabel()
-                label.setFixedSize(320, 240)
-                label.setAlignment(Qt.AlignCenter)
-                layout.addWidget(label)
-                self.labels[idx] = label
+            assinatura = hub.assinar(idx)
+            if assinatura is not None:
+                self.assinaturas[idx] = assinatura
+
+        self.mosaico = Mosaico(max(1, len(self.assinaturas)),
+                               fps_tile=float(self.settings.value("mosaico_fps", 10)))
+        self.rotulos = [f"#{idx + 1}" for idx in self.assinaturas]
+
+        self.label_mosaico = QLabel()
+        self.label_mosaico.setAlignment(Qt.AlignCenter)
+        self.label_mosaico.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.label_mosaico)
+        self.setLayout(layout)
 
         self.running = True
         self.start_video_thread()
 
-        self.resize(1000, 400)
+        # Um único upload por repintura, na thread da interface
+        self.timer_exibicao = QTimer(self)
+        self.timer_exibicao.setTimerType(Qt.PreciseTimer)
+        self.timer_exibicao.timeout.connect(self.exibir_mosaico)
+        self.timer_exibicao.start(intervalo_exibicao())
+
+        self.resize(1000, 700)
         self.show()
 
     def start_video_thread(self):
         import threading
-        thread = threading.Thread(target=self.update_frames, daemon=True)
-        thread.start()
+        # Uma thread por câmera: um dispositivo lento não segura os outros tiles
+        for i, (idx, assinatura) in enumerate(self.assinaturas.items()):
+            thread = threading.Thread(target=self.update_frames, args=(i, idx, assinatura), daemon=True)
+            thread.start()
 
-    def update_frames(self):
+    def update_frames(self, i, idx, assinatura):
+        periodo = 1.0 / self.mosaico.fps_tile
         while self.running:
-            for idx, cap in self.capturas.items():
-                ret, frame = cap.read()
-                if ret:
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    h, w, ch = frame_rgb.shape
-                    bytes_per_line = ch * w
-                    qt_image = QImage(frame_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                    pixmap = QPixmap.fromImage(qt_image).scaled(
-                        self.labels[idx].size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                    self.labels[idx].setPixmap(pixmap)
-            cv2.waitKey(30)
+            inicio = time.monotonic()
+            frame = assinatura.ler(timeout=0.5, mais_recente=True)
+            if frame is not None:
+                registrar_leitura(assinatura, f"mosaico_{idx}")
+                with cronometro("estagio", estagio="redimensionamento", janela="mosaico", camera=idx):
+                    self.mosaico.publicar(i, frame)
+            elif not assinatura.ativa():
+                break
+            # Limita o FPS do tile; os frames do intervalo ficam no buffer da câmera e são pulados
+            time.sleep(max(0.0, periodo - (time.monotonic() - inicio)))
+
+    def exibir_mosaico(self):
+        self.mosaico.redimensionar(self.label_mosaico.width(), self.label_mosaico.height())
+        self.mosaico.marcar_sem_sinal(self.rotulos)
+        with cronometro("estagio", estagio="qt", janela="mosaico"):
+            pixmap = self.mosaico.converter_se_mudou(quadro_para_pixmap)
+            if pixmap is not None:
+                self.label_mosaico.setPixmap(pixmap)
 
     def closeEvent(self, event):
+        self.timer_exibicao.stop()
         self.running = False
-        for cap in self.capturas.values():
-            cap.release()
+        for assinatura in self.assinaturas.values():
+            assinatura.cancelar()
         event.accept()
 
 
 class MainWindow(QMainWindow):
-    alerta_movimento_signal = pyqtSignal(int)  # sinal para emitir alerta
+    cameras_detectadas_signal = pyqtSignal(list)  # resultado de cada redescoberta de câmeras
 
     def __init__(self):
         super().__init__()
@@ -140,6 +228,27 @@ class MainWindow(QMainWindow):
         menu_temas.addAction(self.action_tema_claro)
         menu_temas.addAction(self.action_tema_escuro)
         menubar.addMenu(menu_temas)
+
+        # Menu de câmeras IP (RTSP/HTTP)
+        menu_cameras = QMenu("Câmeras", self)
+        self.action_adicionar_ip = QAction("Adicionar câmera IP...", self)
+        self.action_adicionar_ip.triggered.connect(self.adicionar_camera_ip)
+        menu_cameras.addAction(self.action_adicionar_ip)
+        # Captura e análise de cada câmera num processo próprio, fora do GIL da interface
+        self.action_processos = QAction("Analisar câmeras em processos separados (ao reiniciar)", self)
+        self.action_processos.setCheckable(True)
+        self.action_processos.setChecked(self.settings.value("modo_execucao", "threads") == "processos")
+        self.action_processos.toggled.connect(
+            lambda ligado: self.settings.setValue("modo_execucao", "processos" if ligado else "threads"))
+        menu_cameras.addAction(self.action_processos)
+        menubar.addMenu(menu_cameras)
+
+        # Envio dos alertas para webhooks/HTTP
+        menu_alertas = QMenu("Alertas", self)
+        self.action_webhooks = QAction("Webhooks de envio (ao reiniciar)...", self)
+        self.action_webhooks.triggered.connect(self.configurar_webhooks)
+        menu_alertas.addAction(self.action_webhooks)
+        menubar.addMenu(menu_alertas)
         self.setMenuBar(menubar)
 
         # Área das câmeras com scroll
@@ -163,60 +272,42 @@ class MainWindow(QMainWindow):
         self.btn_visualizar_todas.clicked.connect(self.abrir_todas_cameras)
         self.main_layout.addWidget(self.btn_visualizar_todas)
 
-        # Área de alertas (nova)
-        self.alertas_container = QFrame()
-        self.alertas_container.setFrameShape(QFrame.StyledPanel)
+        # Área de alertas: o monitor publica no barramento e a lista (model/view) busca as mudanças
+        self.alertas = BarramentoAlertas(JANELA_ALERTAS, TAXA_ALERTAS, RAJADA_ALERTAS, HISTORICO_ALERTAS)
+        self.modelo_alertas = ModeloAlertas(self.alertas, self.nome_camera, HISTORICO_ALERTAS, parent=self)
+        self.alertas_container = PainelAlertas(self.modelo_alertas)
         self.alertas_container.setMaximumHeight(400)  # Aumentado de 200 para 400 px
-        self.alertas_layout = QVBoxLayout(self.alertas_container)
-        self.alertas_layout.setContentsMargins(10, 10, 10, 10)
-        self.alertas_layout.setSpacing(5)
 
         label_alertas = QLabel("Alertas de Movimento")
         label_alertas.setStyleSheet("font-weight: bold; font-size: 14pt;")
         self.main_layout.addWidget(label_alertas)
         self.main_layout.addWidget(self.alertas_container)
 
-        self.alertas_widget_layout = QVBoxLayout()
-        self.alertas_layout.addLayout(self.alertas_widget_layout)
-        self.alertas_ativos = {}
-
         self.checkboxes = {}
         self.btn_editar_nomes = {}
-        cameras = self.detectar_cameras_disponiveis()
-
-        if not cameras:
-            label = QLabel("Nenhuma câmera detectada.")
-            self.scroll_layout_inner.addWidget(label)
-        else:
-            for cam_index in cameras:
-                num_cam = cam_index + 1
-                nome_salvo = self.settings.value(f"camera_nome_{num_cam}", f"Câmera {num_cam}")
-
-                checkbox = QCheckBox(nome_salvo)
-                checkbox.stateChanged.connect(self.atualizar_visualizacao_cameras)
-
-                btn_editar = QPushButton("Editar Nome")
-                btn_editar.setFixedWidth(90)
-                btn_editar.clicked.connect(lambda checked, idx=cam_index: self.editar_nome_camera(idx))
-
-                self.checkboxes[cam_index] = checkbox
-                self.btn_editar_nomes[cam_index] = btn_editar
-
-                hbox = QHBoxLayout()
-                hbox.addWidget(checkbox)
-                hbox.addSpacing(10)
-                hbox.addWidget(btn_editar)
-                hbox.addStretch()
-
-                container = QWidget()
-                container.setLayout(hbox)
-
-                self.scroll_layout_inner.addWidget(container)
+        self.linhas_camera = {}
+        self.cameras_atuais = ()
+
+        # A janela aparece já com a lista da última descoberta; a sondagem de verdade roda em segundo plano
+        cameras = ler_cache(self.settings)
+        self.label_sem_cameras = QLabel("Nenhuma câmera detectada." if cameras is not None
+                                        else "Procurando câmeras...")
+        self.scroll_layout_inner.addWidget(self.label_sem_cameras)
+        for cam_index in cameras or []:
+            self.adicionar_camera_lista(cam_index)
+        self.atualizar_lista_cameras()
 
         self.scroll_widget.setLayout(self.scroll_layout_inner)
 
-        self.capturas = {}
+        # Uma captura por dispositivo, compartilhada por previews, mosaico e monitor
+        self.hub = self.criar_hub()
+        self.assinaturas = {}
         self.janelas_camera = {}
+        # Histórico de alertas (e de quando o operador deu OK) no banco local
+        self.armazem = ArmazemEventos()
+        # Alertas também vão para os webhooks cadastrados, numa thread própria, com spool em disco
+        destinos = ler_destinos(self.settings.value("webhooks_alerta", ""))
+        self.despachante = DespachanteAlertas(destinos) if destinos else None
 
         tema_salvo = self.settings.value("tema", "claro")
         if tema_salvo == "escuro":
@@ -224,8 +315,10 @@ class MainWindow(QMainWindow):
         else:
             self.aplicar_tema_claro()
 
-        # Conecta sinal do alerta para mostrar na interface
-        self.alerta_movimento_signal.connect(self.adicionar_alerta)
+        # Alertas novos e os OKs do operador vão para o banco
+        self.modelo_alertas.alertas_novos.connect(self.gravar_alertas)
+        self.modelo_alertas.alerta_reconhecido.connect(self.reconhecer_alerta)
+        self.cameras_detectadas_signal.connect(self.reconciliar_cameras)
 
         # Flag para controlar o monitoramento do movimento
         self.monitorar_movimento = True
@@ -235,6 +328,106 @@ class MainWindow(QMainWindow):
         self.thread_monitoramento = threading.Thread(target=self.monitorar_movimentos_cameras, daemon=True)
         self.thread_monitoramento.start()
 
+        self.parar_redescoberta = threading.Event()
+        self.thread_redescoberta = threading.Thread(target=self.redescobrir_cameras, daemon=True)
+        self.thread_redescoberta.start()
+
+    def adicionar_camera_lista(self, cam_index):
+        num_cam = cam_index + 1
+        nome_salvo = self.settings.value(f"camera_nome_{num_cam}", f"Câmera {num_cam}")
+
+        checkbox = QCheckBox(nome_salvo)
+        checkbox.stateChanged.connect(self.atualizar_visualizacao_cameras)
+
+        btn_editar = QPushButton("Editar Nome")
+        btn_editar.setFixedWidth(90)
+        btn_editar.clicked.connect(lambda checked, idx=cam_index: self.editar_nome_camera(idx))
+
+        self.checkboxes[cam_index] = checkbox
+        self.btn_editar_nomes[cam_index] = btn_editar
+
+        hbox = QHBoxLayout()
+        hbox.addWidget(checkbox)
+        hbox.addSpacing(10)
+        hbox.addWidget(btn_editar)
+        hbox.addStretch()
+
+        container = QWidget()
+        container.setLayout(hbox)
+
+        # Mantém a lista ordenada pelo índice da câmera (a posição 0 é o aviso de lista vazia)
+        posicao = 1 + sum(1 for idx in self.linhas_camera if idx < cam_index)
+        self.scroll_layout_inner.insertWidget(posicao, container)
+        self.linhas_camera[cam_index] = container
+
+    def remover_camera_lista(self, cam_index):
+        if cam_index in self.assinaturas or cam_index in self.janelas_camera:
+            self.fechar_camera(cam_index)
+        self.checkboxes.pop(cam_index)
+        self.btn_editar_nomes.pop(cam_index)
+        container = self.linhas_camera.pop(cam_index)
+        self.scroll_layout_inner.removeWidget(container)
+        container.deleteLater()
+
+    def atualizar_lista_cameras(self):
+        # Tupla trocada de uma vez: o monitor lê sem lock
+        self.cameras_atuais = tuple(sorted(self.checkboxes))
+        self.label_sem_cameras.setText("Nenhuma câmera detectada.")
+        self.label_sem_cameras.setVisible(not self.checkboxes)
+
+    def reconciliar_cameras(self, cameras):
+        # Chamado na thread da interface com o resultado de cada redescoberta
+        for cam_index in [idx for idx in self.checkboxes if idx not in cameras]:
+            print(f"Câmera {cam_index + 1} removida.")
+            self.remover_camera_lista(cam_index)
+        for cam_index in cameras:
+            if cam_index not in self.checkboxes:
+                print(f"Câmera {cam_index + 1} encontrada.")
+                self.adicionar_camera_lista(cam_index)
+        self.atualizar_lista_cameras()
+        salvar_cache(self.settings, cameras)
+
+    def criar_hub(self):
+        fontes = ler_cameras_rede(self.settings)
+        if self.settings.value("modo_execucao", "threads") != "processos":
+            return CameraHub(fontes=fontes)
+        # Com um modelo configurado, cada processo também roda o YOLO nas suas câmeras; as detecções
+        # chegam ao monitor pelo ler_analise (registrar_veiculos)
+        caminho_modelo = self.settings.value("modelo_yolo", "")
+        fabrica_modelo = None
+        if caminho_modelo:
+            from carevision_comum.backends import carregar_modelo
+            fabrica_modelo = functools.partial(carregar_modelo, caminho_modelo)
+        return CameraHubProcessos(
+            fontes=fontes, cameras_por_processo=int(self.settings.value("cameras_por_processo", 1)),
+            config_movimento=self.config_movimento, fabrica_modelo=fabrica_modelo, classes=[3, 4, 5, 8, 9])
+
+    def adicionar_camera_ip(self):
+        url, ok = QInputDialog.getText(self, "Adicionar câmera IP", "URL do stream (rtsp://, http://...):")
+        url = url.strip()
+        if not ok or not url:
+            return
+        cam_index = adicionar_camera_rede(self.settings, url)
+        self.hub.fontes[cam_index] = url
+        self.reconciliar_cameras(sorted(set(self.checkboxes) | {cam_index}))
+
+    def configurar_webhooks(self):
+        atuais = " ".join(ler_destinos(self.settings.value("webhooks_alerta", "")))
+        texto, ok = QInputDialog.getText(self, "Webhooks de alerta",
+                                         "URLs que recebem os alertas (separadas por espaço):", text=atuais)
+        if ok:
+            self.settings.setValue("webhooks_alerta", " ".join(ler_destinos(texto)))
+
+    def redescobrir_cameras(self):
+        # Primeira descoberta logo na abertura, depois periodicamente
+        while not self.parar_redescoberta.is_set():
+            # Câmeras já abertas pelo hub não são sondadas de novo; as IP sempre ficam na lista
+            cameras = descobrir_cameras(presentes=self.hub.abertas() | set(self.hub.fontes))
+            if self.parar_redescoberta.is_set():
+                break
+            self.cameras_detectadas_signal.emit(cameras)
+            self.parar_redescoberta.wait(PERIODO_REDESCOBERTA)
+
     def editar_nome_camera(self, cam_index):
         num_cam = cam_index + 1
         nome_atual = self.settings.value(f"camera_nome_{num_cam}", f"Câmera {num_cam}")
@@ -252,15 +445,6 @@ class MainWindow(QMainWindow):
         else:
             self.aplicar_tema_claro()
 
-    def detectar_cameras_disponiveis(self):
-        cameras = []
-        for index in range(10):
-            cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)
-            if cap.read()[0]:
-                cameras.append(index)
-            cap.release()
-        return cameras
-
     def aplicar_tema_claro(self):
         estilo_claro = """
             QWidget {
@@ -351,17 +535,17 @@ class MainWindow(QMainWindow):
 
     def atualizar_visualizacao_cameras(self):
         for index, checkbox in self.checkboxes.items():
-            if checkbox.isChecked() and index not in self.capturas:
+            if checkbox.isChecked() and index not in self.assinaturas:
                 self.abrir_camera(index)
-            elif not checkbox.isChecked() and index in self.capturas:
+            elif not checkbox.isChecked() and index in self.assinaturas:
                 self.fechar_camera(index)
 
     def abrir_camera(self, index):
-        cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)
-        if cap.isOpened():
-            self.capturas[index] = cap
+        assinatura = self.hub.assinar(index)
+        if assinatura is not None:
+            self.assinaturas[index] = assinatura
             nome_camera = self.settings.value(f"camera_nome_{index+1}", f"Câmera {index+1}")
-            janela = VideoWindow(cap, nome_camera, index)
+            janela = VideoWindow(assinatura, nome_camera, index)
             janela.janela_fechada.connect(self.on_janela_camera_fechada)
             self.janelas_camera[index] = janela
         else:
@@ -372,13 +556,13 @@ class MainWindow(QMainWindow):
         if hasattr(self, 'janela_todas_cameras') and self.janela_todas_cameras.isVisible():
             self.janela_todas_cameras.activateWindow()
             return
-        self.janela_todas_cameras = AllCamerasWindow(cameras, self.settings)
+        self.janela_todas_cameras = AllCamerasWindow(cameras, self.settings, self.hub)
         self.janela_todas_cameras.show()
 
     def fechar_camera(self, index):
-        cap = self.capturas.pop(index, None)
-        if cap:
-            cap.release()
+        assinatura = self.assinaturas.pop(index, None)
+        if assinatura:
+            assinatura.cancelar()
             print(f"Câmera {index + 1} fechada.")
         if index in self.janelas_camera:
             # Desconecta para evitar emitir sinal duplo
@@ -389,72 +573,116 @@ class MainWindow(QMainWindow):
     def on_janela_camera_fechada(self, cam_index):
         if cam_index in self.checkboxes:
             self.checkboxes[cam_index].setChecked(False)
-            if cam_index in self.capturas:
-                cap = self.capturas.pop(cam_index)
-                cap.release()
+            if cam_index in self.assinaturas:
+                assinatura = self.assinaturas.pop(cam_index)
+                assinatura.cancelar()
             if cam_index in self.janelas_camera:
                 del self.janelas_camera[cam_index]
 
-    def detectar_movimento(self, cap):
-        # Método simples de detecção de movimento por diferença de frames
-        ret, frame1 = cap.read()
-        ret2, frame2 = cap.read()
-        if not ret or not ret2:
-            return False
-        gray1 = cv2.cvtColor(frame1, cv2.COLOR_BGR2GRAY)
-        gray2 = cv2.cvtColor(frame2, cv2.COLOR_BGR2GRAY)
-        diff = cv2.absdiff(gray1, gray2)
-        _, thresh = cv2.threshold(diff, 65, 255, cv2.THRESH_BINARY)
-        contornos, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        for contorno in contornos:
-            if cv2.contourArea(contorno) > 1500:  # área mínima para considerar movimento
-                return True
-        return False
+    def config_movimento(self, cam_index):
+        # Limiares por câmera salvos nas configurações (mesmo esquema dos nomes)
+        num_cam = cam_index + 1
+        return {
+            "metodo": self.settings.value("movimento_metodo", "media"),
+            "limiar": int(self.settings.value(f"camera_limiar_{num_cam}", 25)),
+            "area_minima": int(self.settings.value(f"camera_area_minima_{num_cam}", 1500)),
+        }
+
+    def criar_detector_movimento(self, cam_index):
+        return DetectorMovimento(**self.config_movimento(cam_index))
+
+    def sincronizar_monitor(self, assinaturas, detectores, tentativas, agora):
+        # Acompanha a lista de câmeras, que muda a cada redescoberta
+        atuais = self.cameras_atuais
+        for cam_index in [idx for idx in assinaturas if idx not in atuais]:
+            assinaturas.pop(cam_index).cancelar()
+            detectores.pop(cam_index)
+        for cam_index in atuais:
+            assinatura = assinaturas.get(cam_index)
+            if assinatura is not None and assinatura.ativa():
+                continue
+            # Abrir um dispositivo é caro: quem falhou só é tentado de novo depois de um período
+            if agora - tentativas.get(cam_index, -PERIODO_REDESCOBERTA) < PERIODO_REDESCOBERTA:
+                continue
+            tentativas[cam_index] = agora
+            if assinatura is not None:
+                assinatura.cancelar()
+                del assinaturas[cam_index], detectores[cam_index]
+            assinatura = self.hub.assinar(cam_index)
+            if assinatura is not None:
+                assinaturas[cam_index] = assinatura
+                detectores[cam_index] = self.criar_detector_movimento(cam_index)
 
     def monitorar_movimentos_cameras(self):
-        caps = {}
-        for cam_index in self.checkboxes.keys():
-            cap = cv2.VideoCapture(cam_index, cv2.CAP_DSHOW)
-            if cap.isOpened():
-                caps[cam_index] = cap
+        assinaturas = {}
+        detectores = {}
+        tentativas = {}
 
         while self.monitorar_movimento:
-            for cam_index, cap in caps.items():
-                if not cap.isOpened():
+            inicio = time.monotonic()
+            self.sincronizar_monitor(assinaturas, detectores, tentativas, inicio)
+            for cam_index, assinatura in assinaturas.items():
+                if not assinatura.ativa():
                     continue
-                movimento = self.detectar_movimento(cap)
-                if movimento and cam_index not in self.alertas_ativos:
-                    self.alerta_movimento_signal.emit(cam_index)
-                time.sleep(0.1)
-            time.sleep(0.5)
-
-        for cap in caps.values():
-            cap.release()
-
-    def adicionar_alerta(self, cam_index):
-        nome_camera = self.settings.value(f"camera_nome_{cam_index+1}", f"Câmera {cam_index+1}")
-        alerta_widget = QWidget()
-        layout = QHBoxLayout(alerta_widget)
-        label = QLabel(f"Movimento detectado na {nome_camera}")
-        btn_ok = QPushButton("OK")
-        btn_ok.setFixedWidth(50)
-        layout.addWidget(label)
-        layout.addStretch()
-        layout.addWidget(btn_ok)
-
-        def remover_alerta():
-            self.alertas_widget_layout.removeWidget(alerta_widget)
-            alerta_widget.deleteLater()
-            if cam_index in self.alertas_ativos:
-                del self.alertas_ativos[cam_index]
-
-        btn_ok.clicked.connect(remover_alerta)
-
-        self.alertas_widget_layout.addWidget(alerta_widget)
-        self.alertas_ativos[cam_index] = alerta_widget
+                if getattr(self.hub, "analise_nos_processos", False):
+                    # O detector roda no processo da câmera; aqui só chega o resultado
+                    analise = assinatura.ler_analise()
+                    movimento = analise is not None and analise["movimento"]
+                    if analise is not None and len(analise["deteccoes"]):
+                        self.registrar_veiculos(cam_index, analise["deteccoes"])
+                else:
+                    # Só o frame mais recente que a câmera já leu; o modelo de fundo acumula o resto
+                    frame = assinatura.ler(timeout=0, mais_recente=True)
+                    if frame is None:
+                        continue
+                    with cronometro("estagio", estagio="detector_movimento", camera=cam_index):
+                        movimento = detectores[cam_index].atualizar(frame)
+                if movimento:
+                    # Enquanto houver movimento a ocorrência só soma no alerta aberto da câmera
+                    self.alertas.publicar(cam_index, "movimento", "Movimento detectado")
+            metricas.observar("volta", time.monotonic() - inicio, laco="monitor")
+            time.sleep(max(0.0, PERIODO_MONITOR - (time.monotonic() - inicio)))
+
+        for assinatura in assinaturas.values():
+            assinatura.cancelar()
+
+    def registrar_veiculos(self, cam_index, deteccoes):
+        """Detecções do YOLO de um processo (Nx6: x1, y1, x2, y2, conf, cls): vão para o banco e viram alerta."""
+        self.armazem.registrar_deteccoes(cam_index, time.time(),
+                                         [([x1, y1, x2 - x1, y2 - y1], conf, cls)
+                                          for x1, y1, x2, y2, conf, cls in deteccoes.tolist()])
+        # Como o movimento: com veículos em cena a ocorrência só soma no alerta aberto da câmera
+        self.alertas.publicar(cam_index, "veiculo", "Veículo detectado")
+
+    def closeEvent(self, event):
+        self.monitorar_movimento = False
+        self.parar_redescoberta.set()
+        self.hub.encerrar()
+        self.armazem.fechar()
+        if self.despachante is not None:
+            self.despachante.fechar()
+        event.accept()
+
+    def nome_camera(self, cam_index):
+        return self.settings.value(f"camera_nome_{cam_index+1}", f"Câmera {cam_index+1}")
+
+    def gravar_alertas(self, alertas):
+        for alerta in alertas:
+            alerta.id_evento = self.armazem.registrar_evento(alerta.camera, alerta.tipo, t=alerta.primeiro,
+                                                             nome=self.nome_camera(alerta.camera))
+            if self.despachante is not None:
+                # O mesmo id do banco: o destino descarta as cópias de um reenvio
+                self.despachante.enviar({"id": alerta.id_evento, "tipo": alerta.tipo, "camera": alerta.camera,
+                                         "nome": self.nome_camera(alerta.camera), "t": alerta.primeiro,
+                                         "mensagem": alerta.mensagem})
+
+    def reconhecer_alerta(self, alerta):
+        if alerta.id_evento is not None:
+            self.armazem.reconhecer_evento(alerta.id_evento)
 
 
 if __name__ == "__main__":
+    metricas.configurar_pelo_ambiente()
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import deque
+from carevision_comum import metricas
+
+NOVO = "novo"
+AGRUPADO = "agrupado"
+SUPRIMIDO = "suprimido"
+
+
+class Alerta:
+    __slots__ = ("seq", "camera", "tipo", "mensagem", "primeiro", "ultimo", "contagem", "reconhecido",
+                 "id_evento")
+
+    def __init__(self, seq, camera, tipo, mensagem, t):
+        self.seq = seq  # ordem de criação: 0, 1, 2, ... sem buracos
+        self.camera = camera
+        self.tipo = tipo
+        self.mensagem = mensagem
+        self.primeiro = t
+        self.ultimo = t
+        self.contagem = 1
+        self.reconhecido = False
+        self.id_evento = None  # id no ArmazemEventos, preenchido por quem grava
+
+
+class BarramentoAlertas:
+    """
+    Recebe ocorrências de qualquer thread (o monitor publica a cada volta em
+    que vê movimento) e decide o que vira alerta:
+        - uma ocorrência da mesma câmera e tipo de um alerta não reconhecido
+          cuja última ocorrência foi há menos de `janela` segundos só soma
+          na contagem desse alerta; depois do OK a próxima ocorrência abre
+          um alerta novo;
+        - alertas novos passam por um balde de fichas (`taxa` por segundo,
+          até `rajada` seguidos); o que passar disso é contado e descartado;
+        - o histórico guarda no máximo `historico_max` alertas; um alerta que
+          sai dele não agrupa mais nada.
+    A interface não é avisada a cada ocorrência: ela busca as mudanças
+    acumuladas com `retirar_mudancas()` no próprio ritmo.
+    """
+
+    def __init__(self, janela=30.0, taxa=2.0, rajada=20, historico_max=1000):
+        self.janela = janela
+        self.taxa = taxa
+        self.rajada = rajada
+        self.historico = deque(maxlen=historico_max)
+        self.lock = threading.Lock()
+        self.ultimos = {}  # (camera, tipo) -> último alerta dessa chave
+        self.proximo_seq = 0
+        self.fichas = float(rajada)
+        self.t_fichas = time.monotonic()
+        self.novos = []
+        self.alterados = set()
+        self.suprimidos = 0
+        self.agrupados = 0
+
+    def _pegar_ficha(self):
+        agora = time.monotonic()
+        self.fichas = min(float(self.rajada), self.fichas + (agora - self.t_fichas) * self.taxa)
+        self.t_fichas = agora
+        if self.fichas < 1.0:
+            return False
+        self.fichas -= 1.0
+        return True
+
+    def publicar(self, camera, tipo, mensagem, t=None):
+        """Registra uma ocorrência; retorna NOVO, AGRUPADO ou SUPRIMIDO."""
+        t = time.time() if t is None else t
+        with self.lock:
+            alerta = self.ultimos.get((camera, tipo))
+            if alerta is not None and t - alerta.ultimo < self.janela:
+                alerta.contagem += 1
+                alerta.ultimo = t
+                self.alterados.add(alerta)
+                self.agrupados += 1
+                resultado = AGRUPADO
+            elif not self._pegar_ficha():
+                self.suprimidos += 1
+                resultado = SUPRIMIDO
+            else:
+                alerta = Alerta(self.proximo_seq, camera, tipo, mensagem, t)
+                self.proximo_seq += 1
+                self._liberar_espaco()
+                self.ultimos[(camera, tipo)] = alerta
+                self.historico.append(alerta)
+                self.novos.append(alerta)
+                resultado = NOVO
+        metricas.incrementar("alertas", resultado=resultado, tipo=tipo)
+        return resultado
+
+    def _liberar_espaco(self):
+        # O mais antigo vai sair do histórico: se ainda for o último da chave, sai do `ultimos` também
+        if len(self.historico) == self.historico.maxlen:
+            antigo = self.historico[0]
+            if self.ultimos.get((antigo.camera, antigo.tipo)) is antigo:
+                del self.ultimos[(antigo.camera, antigo.tipo)]
+
+    def _soltar(self, alerta):
+        # Um alerta reconhecido não agrupa mais nada
+        if self.ultimos.get((alerta.camera, alerta.tipo)) is alerta:
+            del self.ultimos[(alerta.camera, alerta.tipo)]
+
+    def reconhecer(self, alerta):
+        with self.lock:
+            alerta.reconhecido = True
+            self._soltar(alerta)
+            self.alterados.add(alerta)
+
+    def reconhecer_todos(self):
+        with self.lock:
+            pendentes = [a for a in self.historico if not a.reconhecido]
+            for alerta in pendentes:
+                alerta.reconhecido = True
+                self._soltar(alerta)
+            self.alterados.update(pendentes)
+        return pendentes
+
+    def retirar_mudancas(self):
+        """(alertas novos em ordem de criação, alertas já existentes que mudaram) desde a última chamada."""
+        with self.lock:
+            novos, self.novos = self.novos, []
+            alterados, self.alterados = self.alterados, set()
+        # Um alerta criado e alterado no mesmo intervalo já vai inteiro como novo
+        return novos, [a for a in alterados if not novos or a.seq < novos[0].seq]
+
+    def ativos(self):
+        with self.lock:
+            return [a for a in self.historico if not a.reconhecido]
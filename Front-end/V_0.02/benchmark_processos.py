@@ -0,0 +1,112 @@
+"""
+Mede como o modo de execução em processos escala: as mesmas câmeras
+(arquivos de vídeo) abertas num CameraHubProcessos com 1, 2, 4... processos,
+cada processo rodando captura, detector de movimento e modelo nas suas
+câmeras. Conta as análises que chegam à interface (eventos "analise") e as
+detecções entregues pelo ler_analise, como o monitor da interface lê.
+
+Arquivos são lidos na velocidade do decodificador, então a captura disputa
+a CPU com a análise como uma câmera de fps alto. A janela de medida termina
+em --duracao segundos ou quando o primeiro vídeo acaba, o que vier antes.
+
+Sem --video usa o video_sintetico e, sem --modelo, o ModeloSintetico (os
+dois ficam no back-end do VisDrone).
+
+Uso:
+    python benchmark_processos.py --cameras 4 --processos 1,2,4
+    python benchmark_processos.py --video rodovia.mp4 --modelo best.pt --duracao 20
+"""
+import argparse
+import functools
+import os
+import sys
+import tempfile
+import time
+from hub_processos import CameraHubProcessos
+
+PASTA_BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "Back-end",
+                             "Teste_VisDrone (descontinuado)")
+sys.path.insert(0, PASTA_BACKEND)
+CLASSES = [3, 4, 5, 8, 9]
+
+
+def medir(video, n_cameras, n_processos, fabrica_modelo, duracao, periodo_analise):
+    cameras_por_processo = -(-n_cameras // n_processos)
+    hub = CameraHubProcessos(fontes={i: video for i in range(n_cameras)}, cameras_por_processo=cameras_por_processo,
+                             max_processos=n_processos, fabrica_modelo=fabrica_modelo, classes=CLASSES,
+                             periodo_analise=periodo_analise, timeout_abertura=60.0)
+    analises = {i: 0 for i in range(n_cameras)}
+    tratar_evento = hub._tratar_evento
+
+    def contar(evento):
+        if evento[0] == "analise":
+            analises[evento[3]] += 1
+        tratar_evento(evento)
+
+    hub._tratar_evento = contar
+    try:
+        assinaturas = [hub.assinar(i) for i in range(n_cameras)]
+        if any(a is None for a in assinaturas):
+            raise RuntimeError(f"não foi possível abrir {video}")
+        # Espera o modelo carregar em todos os processos: a primeira análise de cada câmera
+        limite = time.monotonic() + 120
+        while min(analises.values()) == 0 and time.monotonic() < limite:
+            time.sleep(0.05)
+        inicio = time.monotonic()
+        antes = sum(analises.values())
+        deteccoes = 0
+        while time.monotonic() - inicio < duracao and all(a.ativa() for a in assinaturas):
+            for assinatura in assinaturas:
+                analise = assinatura.ler_analise()
+                if analise is not None:
+                    deteccoes += len(analise["deteccoes"])
+            time.sleep(0.1)
+        janela = time.monotonic() - inicio
+        total = sum(analises.values()) - antes
+        for assinatura in assinaturas:
+            assinatura.cancelar()
+    finally:
+        hub.encerrar()
+    return {"processos": len(hub.processos), "janela_s": janela, "analises_s": total / janela,
+            "deteccoes": deteccoes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escala do modo de execução em processos")
+    parser.add_argument("--video", help="vídeo usado por todas as câmeras (padrão: video_sintetico)")
+    parser.add_argument("--modelo", help="pesos YOLO (padrão: ModeloSintetico)")
+    parser.add_argument("--cameras", type=int, default=4)
+    parser.add_argument("--processos", default="1,2,4", help="quantidades de processos a medir")
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos medidos por configuração")
+    parser.add_argument("--periodo", type=float, default=0.0,
+                        help="periodo_analise do hub; 0 = cada processo analisa o mais rápido que puder")
+    parser.add_argument("--frames", type=int, default=1500, help="tamanho do vídeo sintético")
+    args = parser.parse_args()
+
+    if args.modelo:
+        from carevision_comum.backends import carregar_modelo
+        fabrica_modelo = functools.partial(carregar_modelo, args.modelo)
+    else:
+        from modelo_sintetico import ModeloSintetico
+        fabrica_modelo = ModeloSintetico
+
+    with tempfile.TemporaryDirectory() as pasta:
+        video = args.video
+        if video is None:
+            from video_sintetico import gravar_video
+            video = os.path.join(pasta, "sintetico.avi")
+            gravar_video(video, n_frames=args.frames, pan=(0.2, 0.05))
+
+        print(f"{args.cameras} câmera(s) com {video}, {os.cpu_count()} CPU(s)")
+        print(f"{'processos':>9}{'janela_s':>10}{'análises/s':>12}{'escala':>8}{'eficiência':>12}{'detecções':>11}")
+        base = None  # a primeira configuração é a referência da escala
+        for n_processos in [int(n) for n in args.processos.split(",")]:
+            r = medir(video, args.cameras, n_processos, fabrica_modelo, args.duracao, args.periodo)
+            base = base or (r["analises_s"], r["processos"])
+            escala = r["analises_s"] / base[0] if base[0] else 0.0
+            print(f"{r['processos']:>9}{r['janela_s']:>10.1f}{r['analises_s']:>12.1f}{escala:>7.2f}x"
+                  f"{escala * base[1] / r['processos']:>12.0%}{r['deteccoes']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import threading
+import time
+import cv2
+from carevision_comum.fontes import abrir_fonte
+
+
+class CameraFeed:
+    """
+    Uma única captura e uma única thread de leitura por dispositivo.
+    Cada frame decodificado é publicado uma vez num buffer circular de slots;
+    o frame de sequência `s` fica em slots[s % n]. `fonte` é o índice do
+    dispositivo ou a URL de uma câmera IP (lida por uma FonteStream, que
+    reconecta sozinha).
+    """
+
+    def __init__(self, index, tamanho_buffer=8, backend=cv2.CAP_DSHOW, fonte=None):
+        if tamanho_buffer < 2:
+            raise ValueError("tamanho_buffer precisa ser pelo menos 2")
+        self.index = index
+        self.cap = abrir_fonte(index if fonte is None else fonte, backend)
+        # Fontes de rede não terminam numa leitura falha: esperam a reconexão
+        self.reconecta = getattr(self.cap, "reconecta", False)
+        self.slots = [None] * tamanho_buffer
+        self.tempos = [0.0] * tamanho_buffer  # instante (perf_counter) em que cada slot foi capturado
+        self.seq = 0  # sequência do último frame publicado (0 = nenhum ainda)
+        self.cond = threading.Condition()
+        self.assinantes = 0
+        self.running = False
+        self.thread = None
+
+    def iniciar(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._ler_frames, daemon=True)
+        self.thread.start()
+
+    def _ler_frames(self):
+        n = len(self.slots)
+        while self.running:
+            pos = (self.seq + 1) % n
+            # Reaproveita o array do slot: o decodificador escreve direto nele
+            ret, frame = self.cap.read(self.slots[pos])
+            if not ret and self.reconecta and self.running:
+                continue
+            with self.cond:
+                if not ret:
+                    self.running = False
+                    self.cond.notify_all()
+                    break
+                self.slots[pos] = frame
+                self.tempos[pos] = time.perf_counter()
+                self.seq += 1
+                self.cond.notify_all()
+        self.cap.release()
+
+    def parar(self, timeout=1.0, esperar=True):
+        """
+        Encerra a leitura. Com `esperar=False` só sinaliza e volta na hora (para
+        a thread da interface): a thread de leitura solta a captura sozinha.
+        """
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self.reconecta:
+            # Destrava a leitura que pode estar esperando uma reconexão, sem esperar o stream fechar
+            self.cap.release(esperar=False)
+        if esperar:
+            self.esperar(timeout)
+
+    def esperar(self, timeout=1.0):
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+
+class Assinatura:
+    """
+    Cursor de um consumidor sobre o buffer de um CameraFeed.
+    Os frames devolvidos não são copiados: são somente leitura e continuam
+    válidos até o leitor dar a volta no buffer.
+    """
+
+    def __init__(self, hub, feed):
+        self.hub = hub
+        self.feed = feed
+        self.cam_index = feed.index
+        self.ultimo_seq = feed.seq
+        self.cancelada = False
+        self.tempo_captura = 0.0  # instante da captura do último frame devolvido
+        self.descartados = 0  # frames publicados que esta assinatura nunca leu
+        self.atraso = 0  # frames publicados e ainda não lidos após a última leitura
+
+    def ativa(self):
+        return not self.cancelada and self.feed.running
+
+    def ler(self, timeout=1.0, mais_recente=False):
+        """
+        Devolve o próximo frame ainda não lido por esta assinatura, ou o mais
+        recente se `mais_recente=True`. Retorna None se nada chegou no timeout
+        ou se a câmera foi encerrada.
+        """
+        feed = self.feed
+        with feed.cond:
+            chegou = feed.cond.wait_for(
+                lambda: feed.seq > self.ultimo_seq or not feed.running, timeout)
+            if not chegou or feed.seq <= self.ultimo_seq:
+                return None
+            n = len(feed.slots)
+            # O slot seguinte ao último publicado pode estar sendo escrito pelo leitor
+            mais_antigo = max(1, feed.seq - n + 2)
+            if mais_recente:
+                seq = feed.seq
+            else:
+                seq = max(self.ultimo_seq + 1, mais_antigo)
+            self.descartados += seq - self.ultimo_seq - 1
+            self.atraso = feed.seq - seq
+            self.ultimo_seq = seq
+            self.tempo_captura = feed.tempos[seq % n]
+            return feed.slots[seq % n]
+
+    def cancelar(self):
+        self.hub.cancelar(self)
+
+
+class CameraHub:
+    """Abre cada câmera uma só vez e distribui os frames para todos os assinantes."""
+
+    def __init__(self, tamanho_buffer=8, fontes=None):
+        self.tamanho_buffer = tamanho_buffer
+        self.fontes = dict(fontes or {})  # índice -> URL, para as câmeras IP
+        self.feeds = {}
+        self.parando = {}  # índice -> feed cancelado cuja thread de leitura pode ainda não ter soltado a captura
+        self.lock = threading.Lock()
+
+    def assinar(self, index):
+        with self.lock:
+            feed = self.feeds.get(index)
+            if feed is None or not feed.running:
+                anterior = self.parando.pop(index, None)
+                if anterior is not None:
+                    # Um dispositivo local só abre de novo depois de solto; a leitura sai em um frame
+                    anterior.esperar()
+                feed = CameraFeed(index, self.tamanho_buffer, fonte=self.fontes.get(index))
+                if not feed.cap.isOpened():
+                    feed.cap.release()
+                    return None
+                feed.iniciar()
+                self.feeds[index] = feed
+            feed.assinantes += 1
+            return Assinatura(self, feed)
+
+    def abertas(self):
+        """Índices das câmeras com captura ativa no momento."""
+        with self.lock:
+            return {index for index, feed in self.feeds.items() if feed.running}
+
+    def cancelar(self, assinatura):
+        # Chamado da thread da interface: o feed sai do hub sob o lock e é parado fora dele, sem join
+        with self.lock:
+            if assinatura.cancelada:
+                return
+            assinatura.cancelada = True
+            feed = assinatura.feed
+            feed.assinantes -= 1
+            if feed.assinantes > 0:
+                return
+            if self.feeds.get(feed.index) is feed:
+                del self.feeds[feed.index]
+            self.parando[feed.index] = feed
+        feed.parar(esperar=False)
+
+    def encerrar(self):
+        with self.lock:
+            feeds = list(self.feeds.values())
+            self.feeds.clear()
+            self.parando.clear()
+        # Sinaliza todos antes de esperar: o encerramento leva um timeout, não um por câmera
+        for feed in feeds:
+            feed.parar(esperar=False)
+        for feed in feeds:
+            feed.esperar()
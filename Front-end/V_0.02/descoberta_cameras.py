@@ -0,0 +1,86 @@
+import threading
+import time
+import cv2
+
+# Índices de dispositivo sondados e tempo máximo de cada sondagem (segundos)
+INDICES_CAMERAS = range(10)
+TIMEOUT_SONDAGEM = 3.0
+# Câmeras IP ganham índices a partir daqui, na ordem em que foram cadastradas
+INDICE_BASE_REDE = 100
+
+
+def testar_camera(index, backend=cv2.CAP_DSHOW):
+    """Abre o dispositivo, tenta ler um frame e libera."""
+    cap = cv2.VideoCapture(index, backend)
+    try:
+        return cap.isOpened() and cap.read()[0]
+    finally:
+        cap.release()
+
+
+def descobrir_cameras(indices=INDICES_CAMERAS, timeout=TIMEOUT_SONDAGEM, presentes=(),
+                      backend=cv2.CAP_DSHOW):
+    """
+    Sonda todos os índices em paralelo, cada um na sua thread, e devolve a
+    lista ordenada dos que responderam dentro do timeout. Os índices em
+    `presentes` (já abertos pelo CameraHub) não são sondados de novo, porque
+    abrir o mesmo dispositivo duas vezes falha em alguns drivers; contam como
+    encontrados. Uma sondagem travada não segura as outras: a thread dela é
+    daemon e o resultado é simplesmente ignorado.
+    """
+    encontradas = set(presentes)
+    lock = threading.Lock()
+
+    def sondar(index):
+        try:
+            ok = testar_camera(index, backend)
+        except cv2.error:
+            ok = False
+        if ok:
+            with lock:
+                encontradas.add(index)
+
+    threads = []
+    for index in indices:
+        if index in encontradas:
+            continue
+        thread = threading.Thread(target=sondar, args=(index,), daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    # Todas correm ao mesmo tempo, então o prazo é um só para o conjunto
+    prazo = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0.0, prazo - time.monotonic()))
+
+    with lock:
+        return sorted(encontradas)
+
+
+def ler_cache(settings):
+    """Lista de câmeras da última descoberta, salva em QSettings; None se nunca houve uma."""
+    valor = settings.value("cameras_conhecidas", None)
+    if valor is None:
+        return None
+    return [int(i) for i in str(valor).split(",") if i.strip()]
+
+
+def salvar_cache(settings, cameras):
+    settings.setValue("cameras_conhecidas", ",".join(str(i) for i in cameras))
+
+
+def ler_cameras_rede(settings):
+    """{índice: URL} das câmeras IP cadastradas (QSettings "cameras_rede", uma URL por linha)."""
+    urls = str(settings.value("cameras_rede", "")).split()
+    return {INDICE_BASE_REDE + i: url for i, url in enumerate(urls)}
+
+
+def adicionar_camera_rede(settings, url):
+    """Cadastra a URL e devolve o índice atribuído a ela."""
+    rede = ler_cameras_rede(settings)
+    for index, existente in rede.items():
+        if existente == url:
+            return index
+    urls = list(rede.values()) + [url]
+    settings.setValue("cameras_rede", "\n".join(urls))
+    return INDICE_BASE_REDE + len(urls) - 1
@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+
+
+class DetectorMovimento:
+    """
+    Detector de movimento incremental de uma câmera. Mantém um modelo de fundo
+    (média móvel ou MOG2) numa versão reduzida do frame e é atualizado com os
+    frames que a câmera já lê, sem capturar nada a mais. As regiões em
+    movimento são medidas com connectedComponentsWithStats; `area_minima` é
+    dada em pixels do frame original.
+    """
+
+    def __init__(self, metodo="media", largura=160, limiar=25, area_minima=1500,
+                 alfa=0.05, aquecimento=10):
+        if metodo not in ("media", "mog2"):
+            raise ValueError(f"Método de movimento desconhecido: {metodo}")
+        self.metodo = metodo
+        self.largura = largura
+        self.limiar = limiar
+        self.area_minima = area_minima
+        self.alfa = alfa
+        self.aquecimento = aquecimento
+        self.frames = 0
+        self.fundo = None
+        self.mog2 = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=limiar * 2,
+                                                       detectShadows=True) if metodo == "mog2" else None
+        self.kernel = np.ones((3, 3), np.uint8)
+
+    def _reduzir(self, frame):
+        h, w = frame.shape[:2]
+        altura = max(1, int(round(h * self.largura / w)))
+        small = cv2.resize(frame, (self.largura, altura), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0), (w * h) / (self.largura * altura)
+
+    def atualizar(self, frame):
+        """Incorpora o frame ao modelo de fundo e diz se há movimento relevante nele."""
+        small, escala_area = self._reduzir(frame)
+        self.frames += 1
+
+        if self.metodo == "media":
+            if self.fundo is None:
+                self.fundo = small.astype(np.float32)
+                return False
+            diff = cv2.absdiff(small, cv2.convertScaleAbs(self.fundo))
+            _, mascara = cv2.threshold(diff, self.limiar, 255, cv2.THRESH_BINARY)
+            # O que está em movimento entra no fundo 10x mais devagar, para não deixar "fantasmas";
+            # um objeto que parou de vez acaba sendo absorvido
+            cv2.accumulateWeighted(small, self.fundo, self.alfa, mask=cv2.bitwise_not(mascara))
+            cv2.accumulateWeighted(small, self.fundo, self.alfa * 0.1, mask=mascara)
+        else:
+            mascara = self.mog2.apply(small)
+            # Sombras vêm marcadas com 127; só o primeiro plano (255) conta
+            _, mascara = cv2.threshold(mascara, 200, 255, cv2.THRESH_BINARY)
+
+        if self.frames <= self.aquecimento:
+            return False
+
+        mascara = cv2.morphologyEx(mascara, cv2.MORPH_OPEN, self.kernel)
+        n, _, stats, _ = cv2.connectedComponentsWithStats(mascara, connectivity=8)
+        if n <= 1:
+            return False
+        # O componente 0 é o fundo
+        areas = stats[1:, cv2.CC_STAT_AREA] * escala_area
+        return bool((areas > self.area_minima).any())
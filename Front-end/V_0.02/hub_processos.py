@@ -0,0 +1,554 @@
+"""
+Modo de execução em processos: captura e análise (movimento e, se houver
+modelo, YOLO) de cada câmera, ou grupo de câmeras, rodam num processo
+próprio, fora do GIL da interface.
+
+Os frames não passam por pickle. Cada câmera tem um AnelCompartilhado, um
+bloco de multiprocessing.shared_memory com N slots de frame e, para cada
+slot, o instante da captura, o resultado do detector de movimento e as
+detecções (x1, y1, x2, y2, conf, cls). O processo escreve no slot e só manda
+pela fila de eventos uma tupla curta ("frame", câmera, seq); a interface
+acorda os assinantes e eles leem direto do bloco.
+
+CameraHubProcessos tem a mesma interface do CameraHub (assinar/abertas/
+cancelar/encerrar e Assinatura.ler), então previews, mosaico e monitor não
+mudam. Uma thread supervisora recebe os eventos e reinicia, com backoff, o
+processo que morrer ou parar de mandar sinal de vida, reabrindo as câmeras
+dele.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from carevision_comum import metricas
+from camera_hub import Assinatura
+
+# Estados de uma câmera do lado da interface
+ABRINDO = "abrindo"
+ATIVA = "ativa"
+REINICIANDO = "reiniciando"
+ENCERRADA = "encerrada"
+
+MAX_DETECCOES = 100
+CAMPOS_DETECCAO = 6  # x1, y1, x2, y2, conf, cls
+INTERVALO_SINAL = 1.0  # o processo manda "vivo" pelo menos nesse intervalo (s)
+LIMITE_SILENCIO = 10.0  # sem sinal por mais que isso o processo é tido como travado
+
+
+def _alinhar(n, alinhamento=64):
+    return (n + alinhamento - 1) // alinhamento * alinhamento
+
+
+class AnelCompartilhado:
+    """Buffer circular de frames e resultados de uma câmera num bloco de memória compartilhada."""
+
+    def __init__(self, shm, n_slots, forma, max_deteccoes=MAX_DETECCOES):
+        self.shm = shm
+        self.nome = shm.name
+        self.n_slots = n_slots
+        self.forma = tuple(forma)
+        self.max_deteccoes = max_deteccoes
+        buf = shm.buf
+        offset = 0
+
+        def campo(dtype, forma_campo):
+            nonlocal offset
+            arr = np.ndarray(forma_campo, dtype=dtype, buffer=buf, offset=offset)
+            offset = _alinhar(offset + arr.nbytes)
+            return arr
+
+        self.tempos = campo(np.float64, (n_slots,))  # perf_counter da captura
+        self.seq_analise = campo(np.int64, (n_slots,))  # frame a que o resultado do slot se refere
+        self.movimento = campo(np.uint8, (n_slots,))
+        self.n_deteccoes = campo(np.int32, (n_slots,))
+        self.deteccoes = campo(np.float32, (n_slots, max_deteccoes, CAMPOS_DETECCAO))
+        self.frames = campo(np.uint8, (n_slots,) + self.forma)
+
+    @staticmethod
+    def tamanho(n_slots, forma, max_deteccoes=MAX_DETECCOES):
+        campos = [8 * n_slots, 8 * n_slots, n_slots, 4 * n_slots,
+                  4 * n_slots * max_deteccoes * CAMPOS_DETECCAO, n_slots * int(np.prod(forma))]
+        return sum(_alinhar(c) for c in campos)
+
+    @classmethod
+    def criar(cls, n_slots, forma, max_deteccoes=MAX_DETECCOES):
+        shm = shared_memory.SharedMemory(create=True, size=cls.tamanho(n_slots, forma, max_deteccoes))
+        anel = cls(shm, n_slots, forma, max_deteccoes)
+        anel.seq_analise[:] = -1
+        return anel
+
+    @classmethod
+    def anexar(cls, nome, n_slots, forma, max_deteccoes=MAX_DETECCOES):
+        return cls(shared_memory.SharedMemory(name=nome), n_slots, forma, max_deteccoes)
+
+    def fechar(self):
+        """Solta o mapeamento. Falha com BufferError se alguém ainda segura um frame do anel."""
+        self.tempos = self.seq_analise = self.movimento = self.n_deteccoes = None
+        self.deteccoes = self.frames = None
+        self.shm.close()
+
+
+# === Lado do processo de câmeras ===
+class _CameraNoProcesso:
+    def __init__(self, index, fonte, config_movimento, n_slots, eventos, origem):
+        self.index = index
+        self.fonte = fonte
+        self.n_slots = n_slots
+        self.eventos = eventos
+        self.origem = origem  # (id do processo, geração), para a interface descartar eventos antigos
+        from detector_movimento import DetectorMovimento
+        self.detector = DetectorMovimento(**config_movimento)
+        self.anel = None
+        self.lock_anel = threading.Lock()  # a análise e o fechamento não se cruzam
+        self.seq = 0
+        self.seq_analisado = 0
+        self.rodando = True
+        self.cap = None
+        self.thread = threading.Thread(target=self._capturar, daemon=True)
+        self.thread.start()
+
+    def _evento(self, tipo, *dados):
+        self.eventos.put((tipo,) + self.origem + (self.index,) + dados)
+
+    def _capturar(self):
+        import cv2
+        from carevision_comum.fontes import abrir_fonte
+        fonte = self.index if self.fonte is None else self.fonte
+        self.cap = abrir_fonte(fonte, cv2.CAP_DSHOW if isinstance(fonte, int) else None)
+        reconecta = getattr(self.cap, "reconecta", False)
+        ret, frame = self.cap.read() if self.cap.isOpened() else (False, None)
+        if not ret:
+            self.cap.release()
+            self._evento("falhou", "não foi possível abrir a câmera")
+            return
+        self.anel = AnelCompartilhado.criar(self.n_slots, frame.shape)
+        self.anel.frames[1][...] = frame
+        self.anel.tempos[1] = time.perf_counter()
+        self.seq = 1
+        self._evento("aberta", self.anel.nome, self.n_slots, frame.shape)
+        self._evento("frame", self.seq)
+
+        altura, largura = frame.shape[:2]
+        while self.rodando:
+            pos = (self.seq + 1) % self.n_slots
+            destino = self.anel.frames[pos]
+            ret, frame = self.cap.read(destino)
+            if not ret:
+                if reconecta and self.rodando:
+                    continue
+                break
+            if frame is not destino:
+                if frame.shape == destino.shape:
+                    np.copyto(destino, frame)
+                else:
+                    # Câmera IP que voltou com outra resolução: o anel tem tamanho fixo
+                    cv2.resize(frame, (largura, altura), dst=destino)
+            self.anel.tempos[pos] = time.perf_counter()
+            self.seq += 1
+            self._evento("frame", self.seq)
+        self.cap.release()
+        if self.rodando:
+            # Fim do arquivo ou câmera desconectada
+            self._evento("encerrada")
+
+    def analisar(self, modelo, classes):
+        with self.lock_anel:
+            return self._analisar(modelo, classes)
+
+    def _analisar(self, modelo, classes):
+        anel = self.anel
+        seq = self.seq
+        if anel is None or seq <= self.seq_analisado:
+            return False
+        slot = seq % self.n_slots
+        # Cópia: uma inferência lenta não pode ver o slot sendo sobrescrito pela captura
+        frame = anel.frames[slot].copy()
+        movimento = self.detector.atualizar(frame)
+        n = 0
+        if modelo is not None:
+            from carevision_comum.ladrilhos import caixas_do_resultado
+            resultado = modelo.predict(source=frame, conf=0.5, classes=classes, verbose=False)[0]
+            caixas, confs, cls = caixas_do_resultado(resultado)
+            n = min(len(confs), anel.max_deteccoes)
+            anel.deteccoes[slot, :n, :4] = caixas[:n]
+            anel.deteccoes[slot, :n, 4] = confs[:n]
+            anel.deteccoes[slot, :n, 5] = cls[:n]
+        anel.n_deteccoes[slot] = n
+        anel.movimento[slot] = movimento
+        anel.seq_analise[slot] = seq
+        self.seq_analisado = seq
+        self._evento("analise", seq)
+        return True
+
+    def parar(self):
+        self.rodando = False
+        if self.cap is not None and getattr(self.cap, "reconecta", False):
+            self.cap.release()
+        self.thread.join(2.0)
+        with self.lock_anel:
+            if self.anel is not None:
+                try:
+                    self.anel.fechar()
+                except BufferError:
+                    pass
+                self.anel = None
+        self._evento("fechada")
+
+
+def _rodar_processo(id_processo, geracao, comandos, eventos, fabrica_modelo, classes, n_slots,
+                    periodo_analise):
+    """Laço principal de um processo de câmeras: comandos da interface, análise e sinal de vida."""
+    origem = (id_processo, geracao)
+    cameras = {}
+    lock = threading.Lock()
+    rodando = True
+    modelo = None
+
+    def analisar():
+        nonlocal modelo
+        if fabrica_modelo is not None:
+            modelo = fabrica_modelo()
+        while rodando:
+            inicio = time.monotonic()
+            with lock:
+                atuais = list(cameras.values())
+            for camera in atuais:
+                try:
+                    camera.analisar(modelo, classes)
+                except Exception as e:
+                    print(f"[processo {id_processo}] Falha na análise da câmera {camera.index}: {e}")
+            time.sleep(max(0.0, periodo_analise - (time.monotonic() - inicio)))
+
+    thread_analise = threading.Thread(target=analisar, daemon=True)
+    thread_analise.start()
+    eventos.put(("vivo",) + origem)
+    ultimo_sinal = time.monotonic()
+    while rodando:
+        try:
+            comando = comandos.get(timeout=INTERVALO_SINAL)
+        except queue.Empty:
+            comando = None
+        if comando is not None:
+            if comando[0] == "abrir":
+                _, index, fonte, config_movimento = comando
+                with lock:
+                    cameras[index] = _CameraNoProcesso(index, fonte, config_movimento, n_slots, eventos, origem)
+            elif comando[0] == "fechar":
+                with lock:
+                    camera = cameras.pop(comando[1], None)
+                if camera is not None:
+                    camera.parar()
+            elif comando[0] == "parar":
+                rodando = False
+        if time.monotonic() - ultimo_sinal >= INTERVALO_SINAL:
+            eventos.put(("vivo",) + origem)
+            ultimo_sinal = time.monotonic()
+    for camera in list(cameras.values()):
+        camera.parar()
+    # Sair com a análise no meio de uma chamada do OpenCV derruba o processo sem limpar nada
+    thread_analise.join(5.0)
+
+
+# === Lado da interface ===
+class FeedProcesso:
+    """
+    Espelho, na interface, de uma câmera que roda num processo. Tem os campos
+    que a Assinatura do camera_hub usa (cond, seq, running, slots, tempos),
+    com `slots`/`tempos` apontando para o anel compartilhado.
+    """
+
+    def __init__(self, index, fonte):
+        self.index = index
+        self.fonte = fonte
+        self.cond = threading.Condition()
+        self.estado = ABRINDO
+        self.running = True
+        self.assinantes = 0
+        self.processo = None
+        self.anel = None
+        self.slots = []
+        self.tempos = []
+        self.seq = 0
+        self.seq_analise = 0
+        # O processo recomeça a sequência do zero depois de um reinício; a interface soma uma base
+        # múltipla do tamanho do anel para a sequência só crescer e o slot continuar sendo seq % n
+        self.base = 0
+
+
+class AssinaturaProcesso(Assinatura):
+    def __init__(self, hub, feed):
+        super().__init__(hub, feed)
+        self.ultimo_seq_analise = feed.seq_analise
+
+    def ler_analise(self):
+        """
+        Resultado da última análise feita no processo e ainda não lido por esta
+        assinatura: {"seq", "movimento", "deteccoes" (Nx6)}; None se não houver.
+        """
+        feed = self.feed
+        with feed.cond:
+            seq = feed.seq_analise
+            anel = feed.anel
+            if seq <= self.ultimo_seq_analise or anel is None:
+                return None
+            self.ultimo_seq_analise = seq
+            slot = seq % anel.n_slots
+            if anel.seq_analise[slot] != seq - feed.base:
+                return None  # o slot já foi reescrito por uma análise mais nova
+            n = int(anel.n_deteccoes[slot])
+            return {"seq": seq, "movimento": bool(anel.movimento[slot]),
+                    "deteccoes": anel.deteccoes[slot, :n].copy()}
+
+
+class _Processo:
+    def __init__(self, id_processo):
+        self.id = id_processo
+        self.geracao = 0
+        self.processo = None
+        self.comandos = None
+        self.cameras = set()
+        self.ultimo_sinal = 0.0
+        self.reinicios = []  # instantes dos últimos reinícios, para o backoff
+        self.reiniciar_em = None
+
+
+class CameraHubProcessos:
+    """Mesma interface do CameraHub, com as câmeras distribuídas em processos."""
+
+    analise_nos_processos = True
+
+    def __init__(self, tamanho_buffer=8, fontes=None, cameras_por_processo=1, max_processos=None,
+                 config_movimento=None, fabrica_modelo=None, classes=None, periodo_analise=0.1,
+                 timeout_abertura=10.0):
+        self.tamanho_buffer = tamanho_buffer
+        self.fontes = dict(fontes or {})
+        self.cameras_por_processo = max(1, cameras_por_processo)
+        self.max_processos = max_processos or os.cpu_count() or 1
+        self.config_movimento = config_movimento or (lambda index: {})
+        self.fabrica_modelo = fabrica_modelo
+        self.classes = classes
+        self.periodo_analise = periodo_analise
+        self.timeout_abertura = timeout_abertura
+
+        # spawn em todos os sistemas: fork com as threads do Qt já rodando não é seguro
+        self.contexto = multiprocessing.get_context("spawn")
+        self.eventos = self.contexto.Queue()
+        self.lock = threading.Lock()
+        self.feeds = {}
+        self.processos = []
+        self.aneis_a_liberar = []
+        self.rodando = True
+        self.thread = threading.Thread(target=self._supervisionar, daemon=True)
+        self.thread.start()
+
+    # === Processos ===
+    def _iniciar_processo(self, proc):
+        proc.geracao += 1
+        if proc.comandos is not None:
+            # A fila da geração anterior não tem mais quem leia
+            proc.comandos.cancel_join_thread()
+            proc.comandos.close()
+        proc.comandos = self.contexto.Queue()
+        proc.processo = self.contexto.Process(
+            target=_rodar_processo, name=f"carevision-cameras-{proc.id}", daemon=True,
+            args=(proc.id, proc.geracao, proc.comandos, self.eventos, self.fabrica_modelo, self.classes,
+                  self.tamanho_buffer, self.periodo_analise))
+        proc.processo.start()
+        proc.ultimo_sinal = time.monotonic()
+        proc.reiniciar_em = None
+        metricas.definir("processos_cameras", sum(1 for p in self.processos if p.processo is not None))
+
+    def _escolher_processo(self):
+        livres = [p for p in self.processos if len(p.cameras) < self.cameras_por_processo]
+        if livres:
+            return min(livres, key=lambda p: len(p.cameras))
+        if len(self.processos) < self.max_processos:
+            proc = _Processo(len(self.processos))
+            self.processos.append(proc)
+            self._iniciar_processo(proc)
+            return proc
+        return min(self.processos, key=lambda p: len(p.cameras))
+
+    def _abrir_no_processo(self, feed, proc):
+        feed.processo = proc
+        proc.cameras.add(feed.index)
+        proc.comandos.put(("abrir", feed.index, feed.fonte, self.config_movimento(feed.index)))
+
+    # === Interface do CameraHub ===
+    def assinar(self, index):
+        with self.lock:
+            feed = self.feeds.get(index)
+            if feed is None or not feed.running:
+                feed = FeedProcesso(index, self.fontes.get(index))
+                self.feeds[index] = feed
+                self._abrir_no_processo(feed, self._escolher_processo())
+            feed.assinantes += 1
+        with feed.cond:
+            feed.cond.wait_for(lambda: feed.estado != ABRINDO, self.timeout_abertura)
+            aberta = feed.estado in (ATIVA, REINICIANDO)
+        if not aberta:
+            with self.lock:
+                feed.assinantes -= 1
+                if feed.assinantes <= 0:
+                    self._fechar_feed(feed)
+            return None
+        return AssinaturaProcesso(self, feed)
+
+    def abertas(self):
+        with self.lock:
+            return {index for index, feed in self.feeds.items() if feed.running}
+
+    def cancelar(self, assinatura):
+        with self.lock:
+            if assinatura.cancelada:
+                return
+            assinatura.cancelada = True
+            feed = assinatura.feed
+            feed.assinantes -= 1
+            if feed.assinantes <= 0:
+                self._fechar_feed(feed)
+
+    def _fechar_feed(self, feed):
+        # Chamado com self.lock
+        with feed.cond:
+            feed.running = False
+            feed.estado = ENCERRADA
+            feed.cond.notify_all()
+        if self.feeds.get(feed.index) is feed:
+            del self.feeds[feed.index]
+        proc = feed.processo
+        if proc is not None and feed.index in proc.cameras:
+            proc.cameras.discard(feed.index)
+            proc.comandos.put(("fechar", feed.index))
+        self._soltar_anel(feed)
+
+    def _soltar_anel(self, feed):
+        if feed.anel is not None:
+            # unlink já libera o nome; o mapeamento sai quando ninguém mais segurar frames dele
+            try:
+                feed.anel.shm.unlink()
+            except FileNotFoundError:
+                pass
+            self.aneis_a_liberar.append(feed.anel)
+            feed.anel = None
+
+    def _liberar_aneis(self):
+        pendentes = []
+        for anel in self.aneis_a_liberar:
+            try:
+                anel.fechar()
+            except BufferError:
+                pendentes.append(anel)
+        self.aneis_a_liberar = pendentes
+
+    def encerrar(self):
+        with self.lock:
+            self.rodando = False
+            for feed in list(self.feeds.values()):
+                self._fechar_feed(feed)
+            for proc in self.processos:
+                if proc.processo is not None and proc.processo.is_alive():
+                    proc.comandos.put(("parar",))
+        for proc in self.processos:
+            if proc.processo is not None:
+                proc.processo.join(3.0)
+                if proc.processo.is_alive():
+                    proc.processo.terminate()
+                proc.comandos.close()
+                proc.comandos.join_thread()
+        self.thread.join(2.0)
+        self.eventos.close()
+        self._liberar_aneis()
+
+    # === Supervisão ===
+    def _supervisionar(self):
+        while self.rodando:
+            try:
+                evento = self.eventos.get(timeout=0.5)
+            except queue.Empty:
+                evento = None
+            except (EOFError, OSError):
+                break
+            with self.lock:
+                if evento is not None:
+                    self._tratar_evento(evento)
+                self._verificar_processos()
+                self._liberar_aneis()
+
+    def _tratar_evento(self, evento):
+        tipo, id_processo, geracao = evento[:3]
+        if id_processo >= len(self.processos) or self.processos[id_processo].geracao != geracao:
+            return  # evento de uma geração que já morreu
+        proc = self.processos[id_processo]
+        proc.ultimo_sinal = time.monotonic()
+        if tipo == "vivo":
+            return
+        index = evento[3]
+        feed = self.feeds.get(index)
+        if feed is None or feed.processo is not proc:
+            if tipo == "aberta":
+                # A câmera foi cancelada enquanto abria: o bloco ficaria órfão
+                AnelCompartilhado.anexar(evento[4], evento[5], evento[6]).shm.unlink()
+            return
+        with feed.cond:
+            if tipo == "aberta":
+                feed.anel = AnelCompartilhado.anexar(evento[4], evento[5], evento[6])
+                feed.slots = feed.anel.frames
+                feed.tempos = feed.anel.tempos
+                feed.estado = ATIVA
+            elif tipo == "frame":
+                feed.seq = feed.base + evento[4]
+            elif tipo == "analise":
+                feed.seq_analise = feed.base + evento[4]
+            elif tipo in ("falhou", "encerrada"):
+                if tipo == "falhou":
+                    print(f"[processos] Câmera {index + 1}: {evento[4]}")
+                feed.running = False
+                feed.estado = ENCERRADA
+                proc.cameras.discard(index)
+            feed.cond.notify_all()
+
+    def _verificar_processos(self):
+        if not self.rodando:
+            return
+        agora = time.monotonic()
+        for proc in self.processos:
+            if proc.processo is None:
+                continue
+            if proc.reiniciar_em is not None:
+                if agora >= proc.reiniciar_em:
+                    self._reiniciar(proc)
+                continue
+            vivo = proc.processo.is_alive()
+            if vivo and agora - proc.ultimo_sinal < LIMITE_SILENCIO:
+                continue
+            motivo = "parou de responder" if vivo else f"terminou com código {proc.processo.exitcode}"
+            if vivo:
+                proc.processo.terminate()
+            # Backoff: reinícios seguidos esperam cada vez mais, até 30 s
+            proc.reinicios = [t for t in proc.reinicios if agora - t < 60.0] + [agora]
+            espera = min(30.0, 0.5 * 2 ** (len(proc.reinicios) - 1))
+            print(f"[processos] Processo {proc.id} {motivo}; reiniciando em {espera:.1f} s")
+            metricas.incrementar("processos_reinicios", processo=proc.id)
+            proc.reiniciar_em = agora + espera
+            for index in proc.cameras:
+                feed = self.feeds.get(index)
+                if feed is not None:
+                    with feed.cond:
+                        feed.estado = REINICIANDO
+                        self._soltar_anel(feed)
+
+    def _reiniciar(self, proc):
+        self._iniciar_processo(proc)
+        for index in list(proc.cameras):
+            feed = self.feeds.get(index)
+            if feed is None:
+                proc.cameras.discard(index)
+                continue
+            with feed.cond:
+                n = self.tamanho_buffer
+                feed.base = -(-max(feed.seq, feed.seq_analise) // n) * n + n
+            self._abrir_no_processo(feed, proc)
@@ -0,0 +1,163 @@
+import time
+from PyQt5.QtWidgets import (
+    QApplication, QFrame, QHBoxLayout, QLabel, QListView, QPushButton, QStyle, QStyledItemDelegate,
+    QStyleOptionButton, QStyleOptionViewItem, QVBoxLayout
+)
+from PyQt5.QtCore import Qt, QAbstractListModel, QEvent, QModelIndex, QRect, QTimer, pyqtSignal
+from PyQt5.QtGui import QBrush
+
+RECONHECIDO_ROLE = Qt.UserRole + 1
+LARGURA_BOTAO = 50
+
+
+def hora(t):
+    return time.strftime("%H:%M:%S", time.localtime(t))
+
+
+class ModeloAlertas(QAbstractListModel):
+    """
+    Os alertas do BarramentoAlertas como lista, o mais novo em cima. A cada
+    `periodo_ms` o modelo busca as mudanças acumuladas no barramento e avisa a
+    view uma vez por lote (uma inserção, um dataChanged), não por ocorrência.
+    Guarda no máximo `maximo` linhas; as mais antigas saem por baixo.
+    """
+    alertas_novos = pyqtSignal(list)  # para gravar no armazém
+    alerta_reconhecido = pyqtSignal(object)
+
+    def __init__(self, barramento, nome_camera, maximo=1000, periodo_ms=250, parent=None):
+        super().__init__(parent)
+        self.barramento = barramento
+        self.nome_camera = nome_camera
+        self.maximo = maximo
+        self.alertas = []  # mais novo primeiro; os `seq` são consecutivos
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.sincronizar)
+        self.timer.start(periodo_ms)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.alertas)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        alerta = self.alertas[index.row()]
+        if role == Qt.DisplayRole:
+            texto = f"{hora(alerta.primeiro)}  {alerta.mensagem} na {self.nome_camera(alerta.camera)}"
+            if alerta.contagem > 1:
+                texto += f" ({alerta.contagem}x, última às {hora(alerta.ultimo)})"
+            return texto
+        if role == Qt.ForegroundRole and alerta.reconhecido:
+            return QBrush(Qt.gray)
+        if role == RECONHECIDO_ROLE:
+            return alerta.reconhecido
+        return None
+
+    def _linha(self, alerta):
+        # Com os seq consecutivos a linha sai de uma subtração, sem procurar na lista
+        linha = self.alertas[0].seq - alerta.seq if self.alertas else -1
+        return linha if 0 <= linha < len(self.alertas) else None
+
+    def _avisar_alterados(self, alertas):
+        linhas = [l for l in map(self._linha, alertas) if l is not None]
+        if linhas:
+            self.dataChanged.emit(self.index(min(linhas)), self.index(max(linhas)))
+
+    def sincronizar(self):
+        novos, alterados = self.barramento.retirar_mudancas()
+        if novos:
+            self.beginInsertRows(QModelIndex(), 0, len(novos) - 1)
+            self.alertas[0:0] = novos[::-1]
+            self.endInsertRows()
+            if len(self.alertas) > self.maximo:
+                self.beginRemoveRows(QModelIndex(), self.maximo, len(self.alertas) - 1)
+                del self.alertas[self.maximo:]
+                self.endRemoveRows()
+        self._avisar_alterados(alterados)
+        if novos:
+            self.alertas_novos.emit(novos)
+
+    def reconhecer(self, linha):
+        alerta = self.alertas[linha]
+        if alerta.reconhecido:
+            return
+        self.barramento.reconhecer(alerta)
+        self._avisar_alterados([alerta])
+        self.alerta_reconhecido.emit(alerta)
+
+    def reconhecer_todos(self):
+        alertas = self.barramento.reconhecer_todos()
+        self._avisar_alterados(alertas)
+        for alerta in alertas:
+            self.alerta_reconhecido.emit(alerta)
+
+
+class DelegadoAlerta(QStyledItemDelegate):
+    """Desenha o botão OK dos alertas não reconhecidos; não existe um QPushButton por linha."""
+
+    def _rect_botao(self, rect):
+        return QRect(rect.right() - LARGURA_BOTAO - 4, rect.top() + 2, LARGURA_BOTAO, rect.height() - 4)
+
+    def paint(self, painter, option, index):
+        opcao = QStyleOptionViewItem(option)
+        opcao.rect = option.rect.adjusted(0, 0, -LARGURA_BOTAO - 8, 0)
+        super().paint(painter, opcao, index)
+        if index.data(RECONHECIDO_ROLE):
+            return
+        botao = QStyleOptionButton()
+        botao.rect = self._rect_botao(option.rect)
+        botao.text = "OK"
+        botao.state = QStyle.State_Enabled
+        estilo = option.widget.style() if option.widget is not None else QApplication.style()
+        estilo.drawControl(QStyle.CE_PushButton, botao, painter)
+
+    def sizeHint(self, option, index):
+        tamanho = super().sizeHint(option, index)
+        tamanho.setHeight(max(tamanho.height(), 28))
+        return tamanho
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton
+                and not index.data(RECONHECIDO_ROLE) and self._rect_botao(option.rect).contains(event.pos())):
+            model.reconhecer(index.row())
+            return True
+        return super().editorEvent(event, model, option, index)
+
+
+class PainelAlertas(QFrame):
+    """Lista virtualizada de alertas: o custo de desenhar não depende de quantos existem."""
+
+    def __init__(self, modelo, parent=None):
+        super().__init__(parent)
+        self.modelo = modelo
+        self.setFrameShape(QFrame.StyledPanel)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(10, 10, 10, 10)
+        layout.setSpacing(5)
+
+        self.lista = QListView()
+        self.lista.setModel(modelo)
+        self.lista.setItemDelegate(DelegadoAlerta(self.lista))
+        # Todas as linhas têm a mesma altura: a view não mede linha por linha
+        self.lista.setUniformItemSizes(True)
+        self.lista.setSelectionMode(QListView.NoSelection)
+        layout.addWidget(self.lista)
+
+        rodape = QHBoxLayout()
+        self.label_resumo = QLabel()
+        btn_todos = QPushButton("OK em todos")
+        btn_todos.clicked.connect(modelo.reconhecer_todos)
+        rodape.addWidget(self.label_resumo)
+        rodape.addStretch()
+        rodape.addWidget(btn_todos)
+        layout.addLayout(rodape)
+
+        modelo.modelReset.connect(self.atualizar_resumo)
+        modelo.rowsInserted.connect(self.atualizar_resumo)
+        modelo.dataChanged.connect(self.atualizar_resumo)
+
+    def atualizar_resumo(self, *args):
+        barramento = self.modelo.barramento
+        resumo = f"{len(barramento.ativos())} ativo(s)"
+        if barramento.suprimidos:
+            resumo += f", {barramento.suprimidos} suprimido(s) pelo limite de taxa"
+        self.label_resumo.setText(resumo)
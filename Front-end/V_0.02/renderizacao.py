@@ -0,0 +1,199 @@
+import math
+import threading
+import time
+import cv2
+import numpy as np
+
+# Sem frame novo há mais que isso (segundos), o tile é marcado como sem sinal
+LIMITE_SEM_SINAL = 2.0
+
+
+def tamanho_ajustado(largura_frame, altura_frame, largura, altura):
+    """Maior (largura, altura) que cabe em largura x altura mantendo a proporção do frame."""
+    escala = min(largura / largura_frame, altura / altura_frame)
+    return max(1, int(largura_frame * escala)), max(1, int(altura_frame * escala))
+
+
+def redimensionar(frame, largura, altura, destino, auxiliar=None):
+    """
+    cv2.resize do frame para `destino` (largura x altura). Reduções maiores que
+    2x passam por um LINEAR até o dobro do destino e um AREA de fator exato 2:
+    o AREA com fator fracionário custa ~6x mais para o mesmo resultado visual.
+    Retorna o buffer auxiliar, para ser reaproveitado na próxima chamada.
+    """
+    h, w = frame.shape[:2]
+    if largura >= w or altura >= h:
+        cv2.resize(frame, (largura, altura), dst=destino, interpolation=cv2.INTER_LINEAR)
+    elif largura * 2 < w and altura * 2 < h:
+        if auxiliar is None or auxiliar.shape[:2] != (altura * 2, largura * 2):
+            auxiliar = np.empty((altura * 2, largura * 2, 3), np.uint8)
+        cv2.resize(frame, (largura * 2, altura * 2), dst=auxiliar, interpolation=cv2.INTER_LINEAR)
+        cv2.resize(auxiliar, (largura, altura), dst=destino, interpolation=cv2.INTER_AREA)
+    else:
+        cv2.resize(frame, (largura, altura), dst=destino, interpolation=cv2.INTER_AREA)
+    return auxiliar
+
+
+class QuadroCompartilhado:
+    """
+    Último frame pronto para exibição, trocado entre a thread de leitura e a
+    thread da interface por buffer triplo: a thread de leitura redimensiona
+    (cv2.resize) e converte para RGB direto num buffer pré-alocado do tamanho
+    do QLabel; a interface pega só o mais recente quando vai repintar. Frames
+    publicados e nunca pegos são descartados (e contados).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buffers = [None, None, None]
+        self.escrita, self.pendente, self.leitura = 0, 1, 2
+        self.reduzido = None
+        self.auxiliar = None
+        self.novo = False
+        self.descartados = 0
+        self.tamanho = None  # (largura, altura) do destino; definido pela thread da interface
+        self.tempo_captura = 0.0
+
+    def _buffer(self, i, largura, altura):
+        buf = self.buffers[i]
+        if buf is None or buf.shape[0] != altura or buf.shape[1] != largura:
+            buf = self.buffers[i] = np.empty((altura, largura, 3), np.uint8)
+        return buf
+
+    def publicar(self, frame, tempo_captura=0.0):
+        """Chamado pela thread de leitura. Retorna False enquanto o tamanho do destino não é conhecido."""
+        tamanho = self.tamanho
+        if tamanho is None:
+            return False
+        h, w = frame.shape[:2]
+        largura, altura = tamanho_ajustado(w, h, *tamanho)
+        if self.reduzido is None or self.reduzido.shape[:2] != (altura, largura):
+            self.reduzido = np.empty((altura, largura, 3), np.uint8)
+        self.auxiliar = redimensionar(frame, largura, altura, self.reduzido, self.auxiliar)
+        cv2.cvtColor(self.reduzido, cv2.COLOR_BGR2RGB, dst=self._buffer(self.escrita, largura, altura))
+
+        with self.lock:
+            self.escrita, self.pendente = self.pendente, self.escrita
+            if self.novo:
+                self.descartados += 1
+            self.novo = True
+            self.tempo_captura = tempo_captura
+        return True
+
+    def pegar(self):
+        """
+        Chamado pela thread da interface. Devolve (rgb, tempo_captura, descartados)
+        do frame mais recente ainda não pego, ou None; `descartados` conta os
+        frames sobrescritos desde a chamada anterior. O array continua válido
+        até a próxima chamada.
+        """
+        with self.lock:
+            if not self.novo:
+                return None
+            self.leitura, self.pendente = self.pendente, self.leitura
+            self.novo = False
+            descartados, self.descartados = self.descartados, 0
+            return self.buffers[self.leitura], self.tempo_captura, descartados
+
+
+class Mosaico:
+    """
+    Grade de tiles num único buffer RGB pré-alocado. Cada câmera escreve o seu
+    frame, já redimensionado, direto na sua região do buffer (de qualquer
+    thread); a interface sobe um único QImage por repintura, e só se algum
+    tile mudou. Tiles sem frame novo há mais de `limite_sem_sinal` segundos
+    são escurecidos e marcados.
+    """
+
+    def __init__(self, n_tiles, fps_tile=10, limite_sem_sinal=LIMITE_SEM_SINAL):
+        self.n_tiles = n_tiles
+        self.colunas = max(1, math.ceil(math.sqrt(n_tiles)))
+        self.linhas = max(1, math.ceil(n_tiles / self.colunas))
+        self.fps_tile = fps_tile
+        self.limite_sem_sinal = limite_sem_sinal
+        self.lock = threading.Lock()
+        self.buffer = None
+        self.tile = (0, 0)
+        self.versao = 0  # muda a cada realocação do buffer
+        self.sujo = False
+        agora = time.monotonic()
+        self.ultimo = [agora] * n_tiles  # instante do último frame de cada tile
+        self.sem_sinal = [False] * n_tiles
+        self.reduzidos = [None] * n_tiles
+        self.auxiliares = [None] * n_tiles
+
+    def redimensionar(self, largura, altura):
+        """Chamado pela thread da interface com o tamanho do QLabel; realoca só se a grade mudou."""
+        tile_w = max(1, largura // self.colunas)
+        tile_h = max(1, altura // self.linhas)
+        with self.lock:
+            if self.tile == (tile_w, tile_h):
+                return
+            self.buffer = np.zeros((tile_h * self.linhas, tile_w * self.colunas, 3), np.uint8)
+            self.tile = (tile_w, tile_h)
+            self.versao += 1
+            self.sem_sinal = [False] * self.n_tiles
+            self.sujo = True
+
+    def _regiao(self, i):
+        tile_w, tile_h = self.tile
+        x = (i % self.colunas) * tile_w
+        y = (i // self.colunas) * tile_h
+        return self.buffer[y:y + tile_h, x:x + tile_w]
+
+    def publicar(self, i, frame):
+        """Redimensiona o frame BGR da câmera `i` para o seu tile. Chamado pela thread da câmera."""
+        with self.lock:
+            if self.buffer is None:
+                return False
+            versao = self.versao
+            tile_w, tile_h = self.tile
+        h, w = frame.shape[:2]
+        largura, altura = tamanho_ajustado(w, h, tile_w, tile_h)
+        reduzido = self.reduzidos[i]
+        if reduzido is None or reduzido.shape[:2] != (altura, largura):
+            reduzido = self.reduzidos[i] = np.empty((altura, largura, 3), np.uint8)
+        self.auxiliares[i] = redimensionar(frame, largura, altura, reduzido, self.auxiliares[i])
+
+        with self.lock:
+            if self.versao != versao:
+                return False  # o buffer foi realocado no meio do caminho
+            regiao = self._regiao(i)
+            if self.sem_sinal[i]:
+                regiao[:] = 0
+                self.sem_sinal[i] = False
+            ox, oy = (tile_w - largura) // 2, (tile_h - altura) // 2
+            cv2.cvtColor(reduzido, cv2.COLOR_BGR2RGB, dst=regiao[oy:oy + altura, ox:ox + largura])
+            self.ultimo[i] = time.monotonic()
+            self.sujo = True
+        return True
+
+    def marcar_sem_sinal(self, rotulos=None):
+        """Escurece e marca os tiles atrasados. Chamado pela thread da interface."""
+        agora = time.monotonic()
+        with self.lock:
+            if self.buffer is None:
+                return
+            for i in range(self.n_tiles):
+                if self.sem_sinal[i] or agora - self.ultimo[i] <= self.limite_sem_sinal:
+                    continue
+                regiao = self._regiao(i)
+                np.right_shift(regiao, 2, out=regiao)
+                tile_w, tile_h = self.tile
+                cv2.rectangle(regiao, (0, 0), (tile_w - 1, tile_h - 1), (255, 0, 0), 2)
+                texto = "SEM SINAL" if rotulos is None else f"{rotulos[i]} - SEM SINAL"
+                cv2.putText(regiao, texto, (8, 20), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                self.sem_sinal[i] = True
+                self.sujo = True
+
+    def converter_se_mudou(self, converter):
+        """
+        Aplica `converter` (ex.: upload para QPixmap) ao buffer inteiro se algum
+        tile mudou desde a última chamada; senão retorna None. Segura o lock
+        durante a conversão para não subir um tile pela metade.
+        """
+        with self.lock:
+            if not self.sujo or self.buffer is None:
+                return None
+            self.sujo = False
+            return converter(self.buffer)
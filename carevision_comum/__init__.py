@@ -0,0 +1,13 @@
+"""
+Módulos usados tanto pela interface (Front-end) quanto pelos scripts do
+back-end: métricas, fontes de vídeo, armazenamento, envio de alertas,
+backends de inferência, ladrilhos e carregamento sob demanda.
+
+Instalado com `pip install -e .` na raiz do repositório, é importado
+normalmente de qualquer pasta (from carevision_comum import metricas).
+"""
+import os
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Banco de eventos e spool de alertas, os mesmos para a interface e para os scripts
+PASTA_DADOS = os.environ.get("CAREVISION_DADOS") or os.path.join(PASTA_PROJETO, "dados")
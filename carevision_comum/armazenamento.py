@@ -0,0 +1,225 @@
+"""
+Armazenamento local de detecções, trajetórias de tracks e eventos (veículo
+parado, movimento) em SQLite no modo WAL.
+
+Quem produz dados (laço de análise, interface) só enfileira tuplas; uma
+thread escritora junta tudo em lotes e grava numa transação por lote, então
+o laço nunca espera o disco. As consultas abrem conexões próprias e, com o
+WAL, não bloqueiam nem são bloqueadas pela escrita.
+
+Os tempos são segundos Unix (time.time()). Os índices (camera, t) e
+(tipo, camera, t) fazem consultas como "todos os veículos parados da câmera
+3 na terça passada" lerem só o trecho do índice daquele intervalo:
+    inicio, fim = dia_inteiro(ultimo_dia_da_semana(1))
+    armazem.consultar_eventos(camera=3, tipo="veiculo_parado", inicio=inicio, fim=fim)
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import date, datetime, timedelta
+import numpy as np
+from carevision_comum import metricas, PASTA_DADOS
+
+CAMINHO_PADRAO = os.path.join(PASTA_DADOS, "carevision.db")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS deteccoes (
+    camera TEXT NOT NULL, t REAL NOT NULL, classe INTEGER, conf REAL,
+    x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_deteccoes_camera_t ON deteccoes (camera, t);
+
+CREATE TABLE IF NOT EXISTS tracks (
+    camera TEXT NOT NULL, t REAL NOT NULL, track_id TEXT NOT NULL,
+    x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER, velocidade REAL, frames_parado INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_tracks_camera_t ON tracks (camera, t);
+CREATE INDEX IF NOT EXISTS idx_tracks_camera_track ON tracks (camera, track_id, t);
+
+CREATE TABLE IF NOT EXISTS eventos (
+    id TEXT PRIMARY KEY, camera TEXT NOT NULL, t REAL NOT NULL, tipo TEXT NOT NULL,
+    track_id TEXT, x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER,
+    dados TEXT, reconhecido REAL
+);
+CREATE INDEX IF NOT EXISTS idx_eventos_camera_t ON eventos (camera, t);
+CREATE INDEX IF NOT EXISTS idx_eventos_tipo_camera_t ON eventos (tipo, camera, t);
+"""
+
+_INSERTS = {
+    "deteccoes": "INSERT INTO deteccoes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    "tracks": "INSERT INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "eventos": "INSERT INTO eventos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "reconhecer": "UPDATE eventos SET reconhecido = ? WHERE id = ?",
+}
+
+
+def conectar(caminho):
+    conexao = sqlite3.connect(caminho, timeout=30.0)
+    conexao.execute("PRAGMA journal_mode=WAL")
+    # Com WAL, NORMAL só arrisca as últimas transações numa queda de energia, nunca corrompe o banco
+    conexao.execute("PRAGMA synchronous=NORMAL")
+    return conexao
+
+
+def _segundos(valor):
+    """Aceita segundos Unix ou datetime."""
+    if valor is None or isinstance(valor, (int, float)):
+        return valor
+    return valor.timestamp()
+
+
+class ArmazemEventos:
+    def __init__(self, caminho=CAMINHO_PADRAO, tamanho_lote=1000, intervalo=0.5, max_fila=200000):
+        self.caminho = caminho
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.fila = queue.Queue(maxsize=max_fila)
+        self.descartados = 0
+        self.erro = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        with conectar(caminho) as conexao:
+            conexao.executescript(ESQUEMA)
+        conexao.close()
+
+        self.thread = threading.Thread(target=self._escrever, daemon=True)
+        self.thread.start()
+
+    # === Escrita (qualquer thread; nunca bloqueia) ===
+    def _enfileirar(self, tabela, linhas):
+        if not linhas:
+            return
+        try:
+            self.fila.put_nowait((tabela, linhas))
+        except queue.Full:
+            # Disco lento demais: perder linhas é melhor que travar o laço de análise
+            self.descartados += len(linhas)
+            metricas.incrementar("armazem_linhas_descartadas", len(linhas))
+
+    def registrar_deteccoes(self, camera, t, deteccoes):
+        """`deteccoes`: lista ([x, y, w, h], conf, classe), o formato que o DeepSort recebe."""
+        self._enfileirar("deteccoes", [(str(camera), t, int(cls), float(conf), int(x), int(y), int(x + w), int(y + h))
+                                       for (x, y, w, h), conf, cls in deteccoes])
+
+    def registrar_tracks(self, camera, t, track_ids, caixas, velocidades, parados):
+        """Os arrays devolvidos por atualizar_tracks (listas também servem)."""
+        self._enfileirar("tracks", [(str(camera), t, str(track_id), int(x1), int(y1), int(x2), int(y2),
+                                     float(v), int(p))
+                                    for track_id, (x1, y1, x2, y2), v, p in
+                                    zip(track_ids, np.asarray(caixas).tolist(), np.asarray(velocidades).tolist(),
+                                        np.asarray(parados).tolist())])
+
+    def registrar_evento(self, camera, tipo, t=None, track_id=None, caixa=None, **dados):
+        """Registra um evento e devolve o id dele (gerado aqui, antes de chegar ao disco)."""
+        id_evento = uuid.uuid4().hex
+        x1, y1, x2, y2 = caixa if caixa is not None else (None, None, None, None)
+        self._enfileirar("eventos", [(id_evento, str(camera), time.time() if t is None else t, tipo,
+                                      None if track_id is None else str(track_id), x1, y1, x2, y2,
+                                      json.dumps(dados, ensure_ascii=False) if dados else None, None)])
+        return id_evento
+
+    def reconhecer_evento(self, id_evento, t=None):
+        """Marca o evento como visto pelo operador (ex.: alerta dispensado na interface)."""
+        self._enfileirar("reconhecer", [(time.time() if t is None else t, id_evento)])
+
+    def _escrever(self):
+        conexao = conectar(self.caminho)
+        rodando = True
+        while rodando:
+            lote = {}
+            n = 0
+            limite = time.monotonic() + self.intervalo
+            # Junta itens até encher o lote ou passar o intervalo
+            while n < self.tamanho_lote:
+                try:
+                    item = self.fila.get(timeout=max(0.0, limite - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    rodando = False
+                    break
+                tabela, linhas = item
+                lote.setdefault(tabela, []).extend(linhas)
+                n += len(linhas)
+            if not lote:
+                continue
+            t0 = time.perf_counter()
+            try:
+                with conexao:
+                    # Inserções antes das atualizações: um reconhecimento pode vir no mesmo lote do evento
+                    for tabela in ("deteccoes", "tracks", "eventos", "reconhecer"):
+                        if tabela in lote:
+                            conexao.executemany(_INSERTS[tabela], lote[tabela])
+            except sqlite3.Error as e:
+                self.erro = e
+                self.descartados += n
+                print(f"[armazenamento] Falha ao gravar lote de {n} linhas: {e}")
+            metricas.observar("armazem_lote", time.perf_counter() - t0)
+        conexao.close()
+
+    def fechar(self, timeout=10.0):
+        """Grava o que ainda está na fila e encerra a thread escritora."""
+        self.fila.put(None)
+        self.thread.join(timeout)
+
+    # === Consulta (conexão própria por chamada) ===
+    def _consultar(self, sql, parametros):
+        conexao = sqlite3.connect(self.caminho, timeout=30.0)
+        conexao.row_factory = sqlite3.Row
+        try:
+            return [dict(linha) for linha in conexao.execute(sql, parametros)]
+        finally:
+            conexao.close()
+
+    def consultar_eventos(self, camera=None, tipo=None, inicio=None, fim=None, nao_reconhecidos=False,
+                          limite=None):
+        """Eventos em ordem de tempo; `inicio`/`fim` em segundos Unix ou datetime."""
+        condicoes, parametros = [], []
+        for coluna, valor in (("tipo", tipo), ("camera", None if camera is None else str(camera))):
+            if valor is not None:
+                condicoes.append(f"{coluna} = ?")
+                parametros.append(valor)
+        if inicio is not None:
+            condicoes.append("t >= ?")
+            parametros.append(_segundos(inicio))
+        if fim is not None:
+            condicoes.append("t < ?")
+            parametros.append(_segundos(fim))
+        if nao_reconhecidos:
+            condicoes.append("reconhecido IS NULL")
+        sql = "SELECT * FROM eventos"
+        if condicoes:
+            sql += " WHERE " + " AND ".join(condicoes)
+        sql += " ORDER BY t"
+        if limite is not None:
+            sql += f" LIMIT {int(limite)}"
+        eventos = self._consultar(sql, parametros)
+        for evento in eventos:
+            evento["dados"] = json.loads(evento["dados"]) if evento["dados"] else {}
+        return eventos
+
+    def trajetoria(self, camera, track_id, inicio=None, fim=None):
+        """Posições de um track em ordem de tempo."""
+        sql = "SELECT * FROM tracks WHERE camera = ? AND track_id = ? AND t >= ? AND t < ? ORDER BY t"
+        return self._consultar(sql, (str(camera), str(track_id), _segundos(inicio) or 0.0,
+                                     _segundos(fim) or float("inf")))
+
+    def tracks_no_intervalo(self, camera, inicio, fim):
+        sql = "SELECT * FROM tracks WHERE camera = ? AND t >= ? AND t < ? ORDER BY t"
+        return self._consultar(sql, (str(camera), _segundos(inicio), _segundos(fim)))
+
+
+def dia_inteiro(data):
+    """(início, fim) em segundos Unix do dia local de `data` (date ou datetime)."""
+    inicio = datetime(data.year, data.month, data.day)
+    return inicio.timestamp(), (inicio + timedelta(days=1)).timestamp()
+
+
+def ultimo_dia_da_semana(dia_semana, hoje=None):
+    """Data do último `dia_semana` (0 = segunda ... 6 = domingo) antes de hoje."""
+    hoje = hoje or date.today()
+    return hoje - timedelta(days=(hoje.weekday() - dia_semana) % 7 or 7)
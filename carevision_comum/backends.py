@@ -0,0 +1,190 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+# Relativos à pasta de onde o script roda, como o caminho dos pesos
+CONFIG_PADRAO = os.path.join("Modelos", "config.json")
+CACHE_PADRAO = "cache_modelos"
+# Frames das próprias câmeras para validar as exportações (*.jpg/*.png); têm prioridade sobre os do ultralytics
+PASTA_VALIDACAO = os.path.join("Modelos", "validacao")
+
+# Tolerâncias da validação contra o PyTorch
+IOU_MINIMO = 0.5
+FRACAO_MINIMA_ENCONTRADA = 0.95
+DIFERENCA_MAXIMA_CONF = 0.05
+
+
+def ler_input_size(caminho_config=CONFIG_PADRAO, padrao=640):
+    try:
+        with open(caminho_config, encoding="utf-8") as f:
+            return int(json.load(f).get("input_size", padrao))
+    except (OSError, ValueError):
+        return padrao
+
+
+def hash_arquivo(caminho, bloco=1 << 20):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for parte in iter(lambda: f.read(bloco), b""):
+            h.update(parte)
+    return h.hexdigest()[:16]
+
+
+def pasta_artefato(caminho_pesos, backend, input_size, pasta_cache=CACHE_PADRAO):
+    """O cache é indexado pelo hash dos pesos e pelo input_size: trocar qualquer um gera nova exportação."""
+    return os.path.join(pasta_cache, f"{hash_arquivo(caminho_pesos)}_{input_size}_{backend}")
+
+
+def imagens_validacao_padrao():
+    """Frames em PASTA_VALIDACAO ou, sem eles, as imagens de exemplo do ultralytics (bus.jpg, zidane.jpg)."""
+    proprias = sorted(glob.glob(os.path.join(PASTA_VALIDACAO, "*.jpg"))
+                      + glob.glob(os.path.join(PASTA_VALIDACAO, "*.png")))
+    if proprias:
+        return proprias
+    try:
+        from ultralytics.utils import ASSETS
+    except ImportError:
+        return []
+    return [str(p) for p in sorted(ASSETS.glob("*.jpg"))]
+
+
+def _iou(a, b):
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def comparar_deteccoes(referencia, candidato):
+    """
+    Compara dois Results do YOLO. Retorna (fração das caixas de referência
+    encontradas com mesma classe e IoU >= IOU_MINIMO, maior diferença de confiança).
+    """
+    ref_xyxy = referencia.boxes.xyxy.cpu().numpy()
+    cand_xyxy = candidato.boxes.xyxy.cpu().numpy()
+    if len(ref_xyxy) == 0:
+        return (1.0 if len(cand_xyxy) == 0 else 0.0), 0.0
+    if len(cand_xyxy) == 0:
+        return 0.0, 1.0
+
+    ref_cls = referencia.boxes.cls.cpu().numpy()
+    cand_cls = candidato.boxes.cls.cpu().numpy()
+    ref_conf = referencia.boxes.conf.cpu().numpy()
+    cand_conf = candidato.boxes.conf.cpu().numpy()
+
+    iou = _iou(ref_xyxy, cand_xyxy)
+    iou[ref_cls[:, None] != cand_cls[None, :]] = 0
+    melhor = iou.argmax(axis=1)
+    encontrados = iou[np.arange(len(ref_xyxy)), melhor] >= IOU_MINIMO
+    if not encontrados.any():
+        return 0.0, 1.0
+    diferenca = np.abs(ref_conf[encontrados] - cand_conf[melhor[encontrados]]).max()
+    return float(encontrados.mean()), float(diferenca)
+
+
+def validar_backend(modelo_ref, modelo, imagens, input_size, conf=0.25):
+    """
+    Roda as duas versões nas mesmas imagens e verifica se as detecções batem.
+    Se o PyTorch não detectar nada em nenhuma imagem não há o que comparar (um
+    export quebrado que não detecta nada passaria): o resultado é "não validado".
+    """
+    pior_fracao, pior_diferenca = 1.0, 0.0
+    deteccoes_referencia = 0
+    for imagem in imagens:
+        ref = modelo_ref.predict(imagem, imgsz=input_size, conf=conf, verbose=False)[0]
+        cand = modelo.predict(imagem, imgsz=input_size, conf=conf, verbose=False)[0]
+        deteccoes_referencia += len(ref.boxes)
+        fracao, diferenca = comparar_deteccoes(ref, cand)
+        pior_fracao = min(pior_fracao, fracao)
+        pior_diferenca = max(pior_diferenca, diferenca)
+    if deteccoes_referencia == 0:
+        return {"aprovado": False, "imagens": len(imagens), "deteccoes_referencia": 0,
+                "aviso": "não validado: o PyTorch não detectou nada nas imagens de validação"}
+    aprovado = pior_fracao >= FRACAO_MINIMA_ENCONTRADA and pior_diferenca <= DIFERENCA_MAXIMA_CONF
+    return {"aprovado": aprovado, "imagens": len(imagens), "deteccoes_referencia": deteccoes_referencia,
+            "fracao_encontrada": pior_fracao, "diferenca_conf": pior_diferenca}
+
+
+def validado(validacao):
+    """True se a validação comparou alguma detecção (o resultado dela vale, aprovado ou não)."""
+    return validacao.get("imagens", 0) > 0 and validacao.get("deteccoes_referencia", 0) > 0
+
+
+def exportar(caminho_pesos, backend, input_size, destino):
+    from ultralytics import YOLO
+    # dynamic=True para o escalonador poder mandar lotes de tamanho variável
+    exportado = YOLO(caminho_pesos).export(format=backend, imgsz=input_size, dynamic=True)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    if os.path.exists(destino):
+        shutil.rmtree(destino, ignore_errors=True)
+    os.makedirs(destino)
+    alvo = os.path.join(destino, os.path.basename(str(exportado).rstrip("/\\")))
+    shutil.move(str(exportado), alvo)
+    return alvo
+
+
+def carregar_modelo(caminho_pesos, backend="pytorch", caminho_config=CONFIG_PADRAO,
+                    pasta_cache=CACHE_PADRAO, imagens_validacao=None):
+    """
+    Devolve um YOLO pronto para `predict`. Para "onnx" e "openvino" o modelo é
+    exportado na primeira vez e guardado no cache; nas próximas execuções o
+    artefato é carregado direto. Após a exportação a precisão é comparada com
+    o PyTorch; se a validação falhar, o PyTorch é usado. Sem imagens de
+    validação, ou se o PyTorch não detectar nada nelas, o artefato fica no
+    cache como não validado, o PyTorch é usado e a validação é tentada de
+    novo na próxima carga.
+    """
+    from ultralytics import YOLO
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+    if backend == "pytorch":
+        return YOLO(caminho_pesos)
+
+    input_size = ler_input_size(caminho_config)
+    pasta = pasta_artefato(caminho_pesos, backend, input_size, pasta_cache)
+    caminho_meta = os.path.join(pasta, "meta.json")
+
+    if os.path.exists(caminho_meta):
+        with open(caminho_meta, encoding="utf-8") as f:
+            meta = json.load(f)
+        # Só vale o resultado de uma validação que comparou alguma detecção
+        if validado(meta["validacao"]):
+            if meta["validacao"]["aprovado"]:
+                return YOLO(meta["artefato"], task="detect")
+            print(f"[backends] Artefato {backend} em cache reprovado na validação; usando PyTorch.")
+            return YOLO(caminho_pesos)
+        artefato = meta["artefato"]
+    else:
+        print(f"[backends] Exportando {os.path.basename(caminho_pesos)} para {backend} (input_size={input_size})...")
+        artefato = exportar(caminho_pesos, backend, input_size, pasta)
+    modelo = YOLO(artefato, task="detect")
+    modelo_ref = YOLO(caminho_pesos)
+
+    if imagens_validacao is None:
+        imagens_validacao = imagens_validacao_padrao()
+    if imagens_validacao:
+        validacao = validar_backend(modelo_ref, modelo, imagens_validacao, input_size)
+    else:
+        validacao = {"aprovado": False, "imagens": 0, "deteccoes_referencia": 0,
+                     "aviso": "não validado: sem imagens de validação"}
+
+    with open(caminho_meta, "w", encoding="utf-8") as f:
+        json.dump({"pesos": os.path.abspath(caminho_pesos), "backend": backend,
+                   "input_size": input_size, "artefato": artefato, "validacao": validacao}, f, indent=2)
+
+    if not validado(validacao):
+        print(f"[backends] Artefato {backend} {validacao['aviso']} (coloque frames das câmeras, com veículos, "
+              f"em {PASTA_VALIDACAO}); usando PyTorch.")
+        return modelo_ref
+    print(f"[backends] Validação contra PyTorch: {validacao}")
+    if not validacao["aprovado"]:
+        return modelo_ref
+    return modelo
@@ -0,0 +1,277 @@
+"""
+Envio de alertas para webhooks/HTTP sem travar quem gera os eventos.
+
+`DespachanteAlertas.enviar(evento)` só coloca o evento numa fila e volta na
+hora; uma thread de envio junta os eventos em lotes (até `tamanho_lote` ou
+`intervalo` segundos) e manda cada lote como um POST JSON
+{"eventos": [...]} para cada destino, numa conexão HTTP mantida aberta por
+destino (keep-alive).
+
+Se um destino falha (erro de rede, 5xx, 408 ou 429), o lote vai para um
+arquivo de spool em disco (JSONL, um por destino) e o destino entra em
+espera com backoff exponencial; enquanto houver spool, os eventos novos
+também vão para o fim dele, para a ordem se manter. Quando a espera acaba o
+spool é reenviado em lotes e apagado. Como o spool fica em disco, o que não
+foi entregue sobrevive a um reinício. Respostas 4xx (exceto 408/429) não
+vão melhorar com outra tentativa: o lote é descartado e contado.
+
+Cada evento leva um "id" único; um reenvio depois de um timeout pode
+entregar o mesmo evento duas vezes, e o destino usa o id para ignorar a cópia.
+"""
+import hashlib
+import http.client
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+from carevision_comum import metricas, PASTA_DADOS
+
+PASTA_SPOOL_PADRAO = os.path.join(PASTA_DADOS, "spool_alertas")
+
+
+class FalhaEnvio(Exception):
+    def __init__(self, mensagem, definitiva=False):
+        super().__init__(mensagem)
+        self.definitiva = definitiva
+
+
+class _Destino:
+    """Estado de um destino: conexão reaproveitada, spool em disco e backoff."""
+
+    def __init__(self, url, pasta_spool, cabecalhos, timeout):
+        self.url = url
+        partes = urlsplit(url)
+        self.https = partes.scheme == "https"
+        self.host = partes.hostname
+        self.porta = partes.port
+        self.caminho = (partes.path or "/") + (f"?{partes.query}" if partes.query else "")
+        self.cabecalhos = dict(cabecalhos or {}, **{"Content-Type": "application/json"})
+        self.timeout = timeout
+        self.conexao = None
+        self.spool = os.path.join(pasta_spool, hashlib.sha256(url.encode()).hexdigest()[:16] + ".jsonl")
+        self.no_spool = self._contar_spool()
+        self.falhas_seguidas = 0
+        self.proxima_tentativa = 0.0
+
+    def _contar_spool(self):
+        try:
+            with open(self.spool, encoding="utf-8") as f:
+                return sum(1 for linha in f if linha.strip())
+        except OSError:
+            return 0
+
+    def _conectar(self):
+        classe = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return classe(self.host, self.porta, timeout=self.timeout)
+
+    def post(self, eventos):
+        corpo = json.dumps({"eventos": eventos}, ensure_ascii=False).encode("utf-8")
+        # Uma conexão keep-alive parada pode ter sido fechada pelo servidor: uma reconexão na hora
+        for tentativa in range(2):
+            if self.conexao is None:
+                self.conexao = self._conectar()
+            try:
+                self.conexao.request("POST", self.caminho, body=corpo, headers=self.cabecalhos)
+                resposta = self.conexao.getresponse()
+                resposta.read()
+            except (OSError, http.client.HTTPException) as e:
+                self.fechar()
+                if tentativa == 0 and isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError,
+                                                     BrokenPipeError)):
+                    continue
+                raise FalhaEnvio(f"{type(e).__name__}: {e}")
+            if resposta.will_close:
+                self.fechar()
+            if 200 <= resposta.status < 300:
+                return
+            definitiva = 400 <= resposta.status < 500 and resposta.status not in (408, 429)
+            raise FalhaEnvio(f"HTTP {resposta.status} {resposta.reason}", definitiva)
+
+    def fechar(self):
+        if self.conexao is not None:
+            self.conexao.close()
+            self.conexao = None
+
+    # === Spool ===
+    def guardar(self, eventos, maximo):
+        with open(self.spool, "a", encoding="utf-8") as f:
+            for evento in eventos:
+                f.write(json.dumps(evento, ensure_ascii=False) + "\n")
+        self.no_spool += len(eventos)
+        if self.no_spool > maximo:
+            # Queda longa demais: os eventos mais antigos saem para o disco não encher
+            excesso = self.no_spool - maximo
+            self.reescrever(self.ler()[excesso:])
+            return excesso
+        return 0
+
+    def ler(self):
+        try:
+            with open(self.spool, encoding="utf-8") as f:
+                return [json.loads(linha) for linha in f if linha.strip()]
+        except OSError:
+            return []
+
+    def reescrever(self, eventos):
+        if not eventos:
+            if os.path.exists(self.spool):
+                os.remove(self.spool)
+            self.no_spool = 0
+            return
+        temporario = self.spool + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            for evento in eventos:
+                f.write(json.dumps(evento, ensure_ascii=False) + "\n")
+        os.replace(temporario, self.spool)
+        self.no_spool = len(eventos)
+
+
+class DespachanteAlertas:
+    def __init__(self, destinos, pasta_spool=PASTA_SPOOL_PADRAO, cabecalhos=None, tamanho_lote=50, intervalo=1.0,
+                 timeout=5.0, backoff_inicial=1.0, backoff_max=300.0, max_fila=10000, max_spool=100000):
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.backoff_inicial = backoff_inicial
+        self.backoff_max = backoff_max
+        self.max_spool = max_spool
+        self.fila = queue.Queue(maxsize=max_fila)
+        self.enviados = 0
+        self.descartados = 0
+        self.falhas = 0
+
+        os.makedirs(pasta_spool, exist_ok=True)
+        self.destinos = [_Destino(url, pasta_spool, cabecalhos, timeout) for url in destinos]
+        self.thread = threading.Thread(target=self._rodar, daemon=True)
+        self.thread.start()
+
+    # === Produtores (qualquer thread; nunca bloqueia) ===
+    def enviar(self, evento):
+        """Enfileira um dict serializável em JSON; ganha "id" e "t" se não tiver."""
+        evento = dict(evento)
+        evento.setdefault("id", uuid.uuid4().hex)
+        evento.setdefault("t", time.time())
+        try:
+            self.fila.put_nowait(evento)
+        except queue.Full:
+            # A thread de envio não dá conta nem de gravar no spool: melhor perder que travar a análise
+            self.descartados += 1
+            metricas.incrementar("alertas_envio_descartados")
+
+    def fechar(self, timeout=10.0):
+        """Tenta entregar o que está na fila; o que não for entregue fica no spool."""
+        self.fila.put(None)
+        self.thread.join(timeout)
+
+    # === Thread de envio ===
+    def _juntar_lote(self):
+        """Eventos até encher o lote ou passar o intervalo; None no fim da lista = fechar."""
+        lote = []
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.tamanho_lote:
+            try:
+                item = self.fila.get(timeout=max(0.0, limite - time.monotonic()))
+            except queue.Empty:
+                break
+            lote.append(item)
+            if item is None:
+                break
+        return lote
+
+    def _rodar(self):
+        rodando = True
+        while rodando:
+            lote = self._juntar_lote()
+            if lote and lote[-1] is None:
+                lote.pop()
+                rodando = False
+            for destino in self.destinos:
+                self._entregar(destino, lote, forcar=not rodando)
+        for destino in self.destinos:
+            destino.fechar()
+
+    def _entregar(self, destino, lote, forcar=False):
+        agora = time.monotonic()
+        em_espera = agora < destino.proxima_tentativa and not forcar
+        if destino.no_spool and not em_espera:
+            # Fim da espera: o spool vai primeiro, e o lote atual entra no fim dele
+            if lote:
+                self._guardar(destino, lote)
+                lote = []
+            self._esvaziar_spool(destino)
+        if not lote:
+            return
+        if destino.no_spool or em_espera:
+            self._guardar(destino, lote)
+            return
+        try:
+            self._post(destino, lote)
+        except FalhaEnvio as e:
+            if e.definitiva:
+                self._descartar(destino, lote, e)
+            else:
+                self._guardar(destino, lote)
+                self._adiar(destino, e)
+
+    def _esvaziar_spool(self, destino):
+        pendentes = destino.ler()
+        enviados = 0
+        try:
+            while enviados < len(pendentes):
+                lote = pendentes[enviados:enviados + self.tamanho_lote]
+                try:
+                    self._post(destino, lote)
+                except FalhaEnvio as e:
+                    if not e.definitiva:
+                        raise
+                    self._descartar(destino, lote, e)
+                enviados += len(lote)
+        except FalhaEnvio as e:
+            self._adiar(destino, e)
+        destino.reescrever(pendentes[enviados:])
+
+    def _post(self, destino, eventos):
+        t0 = time.perf_counter()
+        destino.post(eventos)
+        metricas.observar("envio_alerta", time.perf_counter() - t0, destino=destino.host)
+        metricas.incrementar("alertas_enviados", len(eventos), destino=destino.host)
+        self.enviados += len(eventos)
+        destino.falhas_seguidas = 0
+
+    def _adiar(self, destino, erro):
+        espera = min(self.backoff_max, self.backoff_inicial * 2 ** destino.falhas_seguidas)
+        # Jitter para vários despachantes não voltarem todos no mesmo instante
+        espera *= random.uniform(0.5, 1.0)
+        destino.falhas_seguidas += 1
+        destino.proxima_tentativa = time.monotonic() + espera
+        self.falhas += 1
+        metricas.incrementar("alertas_envio_falhas", destino=destino.host)
+        print(f"[envio_alerta] {destino.url}: {erro}; nova tentativa em {espera:.1f} s "
+              f"({destino.no_spool} evento(s) no spool)")
+
+    def _guardar(self, destino, eventos):
+        try:
+            perdidos = destino.guardar(eventos, self.max_spool)
+        except OSError as e:
+            print(f"[envio_alerta] Falha ao gravar o spool de {destino.url}: {e}")
+            perdidos = len(eventos)
+        if perdidos:
+            self.descartados += perdidos
+            metricas.incrementar("alertas_envio_descartados", perdidos)
+
+    def _descartar(self, destino, eventos, erro):
+        self.descartados += len(eventos)
+        metricas.incrementar("alertas_envio_descartados", len(eventos))
+        print(f"[envio_alerta] {destino.url} recusou {len(eventos)} evento(s): {erro}; descartados")
+
+    def estatisticas(self):
+        return {"enviados": self.enviados, "descartados": self.descartados, "falhas": self.falhas,
+                "na_fila": self.fila.qsize(), "no_spool": {d.url: d.no_spool for d in self.destinos}}
+
+
+def ler_destinos(valor):
+    """URLs separadas por vírgula ou espaço (variável de ambiente, QSettings)."""
+    return [url for url in str(valor or "").replace(",", " ").split() if url]
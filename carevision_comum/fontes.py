@@ -0,0 +1,189 @@
+"""
+Fontes de vídeo de rede (RTSP/HTTP/UDP) com leitura contínua e reconexão.
+
+O decodificador do FFmpeg acumula frames se ninguém lê na velocidade da
+câmera, e o atraso cresce para segundos. FonteStream mantém uma thread
+drenando o stream com grab() o tempo todo e só faz o retrieve() (conversão
+para BGR) do frame mais recente quando alguém vai ler. Se a conexão cai, a
+thread reabre o stream com backoff exponencial.
+
+`abrir_fonte` devolve uma FonteStream para URLs e um cv2.VideoCapture comum
+para índices e arquivos; as duas têm read()/isOpened()/release()/get().
+"""
+import threading
+import time
+import cv2
+import numpy as np
+from carevision_comum import metricas
+
+PREFIXOS_URL = ("rtsp://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
+# Estados reportados em saude()
+CONECTANDO = "conectando"
+ATIVO = "ativo"
+RECONECTANDO = "reconectando"
+ENCERRADO = "encerrado"
+
+
+def eh_url(fonte):
+    return isinstance(fonte, str) and fonte.lower().startswith(PREFIXOS_URL)
+
+
+class FonteStream:
+    """Stream de rede drenado por uma thread própria; usado como um cv2.VideoCapture."""
+
+    def __init__(self, url, backoff_inicial=0.5, backoff_max=10.0, timeout_abertura=5.0,
+                 timeout_leitura=5.0, nome=None):
+        self.url = url
+        self.nome = nome or url
+        self.backoff_inicial = backoff_inicial
+        self.backoff_max = backoff_max
+        self.timeout_abertura = timeout_abertura
+        self.timeout_leitura = timeout_leitura
+        self.reconecta = True  # read() pode esperar uma reconexão em vez de encerrar
+
+        self.cond = threading.Condition()
+        self.cap = None
+        self.estado = CONECTANDO
+        self.rodando = True
+        self.seq_grab = 0  # frames drenados do stream
+        self.seq_lido = 0  # seq_grab do último frame entregue por read()
+        self.quer_frame = False
+        self.frame = None
+        self.tempo_frame = 0.0  # perf_counter do grab do frame atual
+        self.propriedades = {}
+
+        self.reconexoes = 0
+        self.ultimo_erro = None
+        self.descartados = 0
+        self.fps = 0.0
+        self.latencia = 0.0  # idade (s) do último frame entregue, no momento da entrega
+
+        self.thread = threading.Thread(target=self._drenar, daemon=True)
+        self.thread.start()
+
+    def _abrir(self):
+        cap = cv2.VideoCapture(self.url, cv2.CAP_FFMPEG,
+                               [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(self.timeout_abertura * 1000),
+                                cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(self.timeout_leitura * 1000)])
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        return cap
+
+    def _drenar(self):
+        backoff = self.backoff_inicial
+        while self.rodando:
+            cap = self._abrir()
+            if cap is None:
+                self._falhou("não foi possível abrir o stream", backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+                continue
+            with self.cond:
+                self.cap = cap
+                self.propriedades = {prop: cap.get(prop) for prop in
+                                     (cv2.CAP_PROP_FRAME_WIDTH, cv2.CAP_PROP_FRAME_HEIGHT, cv2.CAP_PROP_FPS)}
+            ultimo = time.perf_counter()
+            while self.rodando:
+                if not cap.grab():
+                    break
+                agora = time.perf_counter()
+                intervalo = max(agora - ultimo, 1e-6)
+                self.fps = 0.9 * self.fps + 0.1 / intervalo if self.fps else 1.0 / intervalo
+                ultimo = agora
+                if self.estado != ATIVO:
+                    metricas.definir("fonte_ativa", 1, fonte=self.nome)
+                with self.cond:
+                    self.estado = ATIVO
+                    self.seq_grab += 1
+                    if not self.quer_frame:
+                        # Ninguém esperando: o frame fica só no decodificador e é substituído pelo próximo
+                        continue
+                ok, frame = cap.retrieve()
+                if not ok:
+                    break
+                backoff = self.backoff_inicial
+                with self.cond:
+                    self.frame = frame
+                    self.tempo_frame = agora
+                    self.quer_frame = False
+                    self.cond.notify_all()
+            cap.release()
+            with self.cond:
+                self.cap = None
+            if self.rodando:
+                self._falhou("stream interrompido", backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+        with self.cond:
+            self.estado = ENCERRADO
+            self.cond.notify_all()
+
+    def _falhou(self, erro, espera):
+        with self.cond:
+            self.estado = RECONECTANDO if self.estado != CONECTANDO else CONECTANDO
+            self.ultimo_erro = erro
+            self.reconexoes += 1
+            self.cond.notify_all()
+        metricas.incrementar("fonte_reconexoes", fonte=self.nome)
+        metricas.definir("fonte_ativa", 0, fonte=self.nome)
+        print(f"[fontes] {self.nome}: {erro}; nova tentativa em {espera:.1f} s")
+        with self.cond:
+            self.cond.wait_for(lambda: not self.rodando, espera)
+
+    def read(self, image=None, timeout=None):
+        """
+        Devolve (True, frame) com o frame mais recente, ainda não entregue. Com
+        timeout=None espera o tempo que for preciso (inclusive reconexões) e
+        só retorna (False, None) depois de release().
+        """
+        with self.cond:
+            self.quer_frame = True
+            chegou = self.cond.wait_for(lambda: self.frame is not None or not self.rodando, timeout)
+            if not chegou or self.frame is None:
+                return False, None
+            frame, self.frame = self.frame, None
+            self.descartados += max(0, self.seq_grab - self.seq_lido - 1)
+            self.seq_lido = self.seq_grab
+            self.latencia = time.perf_counter() - self.tempo_frame
+        metricas.observar("fonte_latencia", self.latencia, fonte=self.nome)
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def isOpened(self):
+        return self.rodando
+
+    def get(self, prop):
+        return self.propriedades.get(prop, 0.0)
+
+    def release(self, esperar=True):
+        """
+        Encerra o stream. Com `esperar=True` aguarda a thread de drenagem, que
+        pode estar presa num grab() por até `timeout_leitura`. Chamadas
+        repetidas não fazem nada.
+        """
+        with self.cond:
+            if not self.rodando:
+                return
+            self.rodando = False
+            self.cond.notify_all()
+        if esperar and self.thread is not threading.current_thread():
+            self.thread.join(self.timeout_leitura + 1.0)
+
+    def saude(self):
+        with self.cond:
+            return {"fonte": self.nome, "estado": self.estado, "fps": round(self.fps, 1),
+                    "latencia_ms": round(self.latencia * 1000, 1), "reconexoes": self.reconexoes,
+                    "frames": self.seq_grab, "descartados": self.descartados,
+                    "ultimo_erro": self.ultimo_erro}
+
+
+def abrir_fonte(fonte, backend=None, **kwargs):
+    """FonteStream para URLs; cv2.VideoCapture para índices de câmera e arquivos."""
+    if eh_url(fonte):
+        return FonteStream(fonte, **kwargs)
+    if backend is not None:
+        return cv2.VideoCapture(fonte, backend)
+    return cv2.VideoCapture(fonte)
@@ -0,0 +1,187 @@
+"""
+Inferência em ladrilhos para frames de drone em alta resolução.
+
+Um frame 4K entregue inteiro ao YOLO é reduzido para o input_size do modelo
+(640) e um carro de 40 px vira um borrão de 7 px que ninguém detecta. Aqui o
+frame é cortado em ladrilhos de `tamanho` px que se sobrepõem, todos vão ao
+`predict` num lote só, as caixas voltam para coordenadas do frame e as
+duplicatas nas emendas são unidas por um NMS vetorizado.
+
+No modo adaptativo só rodam os ladrilhos que tiveram detecção nos últimos
+`memoria` frames, mais uma passada global reduzida que acha veículos
+grandes e novos; a cada `intervalo_completo` frames todos os ladrilhos
+rodam para achar veículos pequenos que acabaram de entrar na cena.
+"""
+import numpy as np
+from carevision_comum import metricas
+from carevision_comum.metricas import cronometro
+
+
+def gerar_ladrilhos(largura, altura, tamanho=640, sobreposicao=0.2):
+    """
+    Caixas (x1, y1, x2, y2) dos ladrilhos, Kx4 int. O último ladrilho de cada
+    linha/coluna encosta na borda do frame em vez de sair dele; um frame menor
+    que o ladrilho vira um ladrilho só.
+    """
+    passo = max(1, int(tamanho * (1 - sobreposicao)))
+
+    def inicios(total):
+        if total <= tamanho:
+            return [0]
+        pontos = list(range(0, total - tamanho, passo))
+        return pontos + [total - tamanho]
+
+    return np.array([(x, y, min(x + tamanho, largura), min(y + tamanho, altura))
+                     for y in inicios(altura) for x in inicios(largura)], dtype=np.int64).reshape(-1, 4)
+
+
+def nms(caixas, confs, classes=None, limiar=0.6, metrica="ios", unir=True):
+    """
+    NMS guloso com a matriz de sobreposição calculada de uma vez. Retorna
+    (caixas, confs, classes) das caixas mantidas, em ordem de confiança.
+
+    `metrica="ios"` (interseção sobre a menor) reconhece como duplicata o
+    pedaço de um veículo cortado pela borda de um ladrilho, que tem IoU baixo
+    com a caixa inteira; com `unir=True` a caixa mantida cresce até a união
+    do grupo, para o pedaço de maior confiança não ficar no lugar do veículo.
+    """
+    caixas = np.asarray(caixas, dtype=np.float64).reshape(-1, 4)
+    confs = np.asarray(confs, dtype=np.float64)
+    classes = np.zeros(len(confs), np.int64) if classes is None else np.asarray(classes, dtype=np.int64)
+    if len(confs) == 0:
+        return caixas, confs, classes
+
+    ordem = np.argsort(-confs, kind="stable")
+    caixas, confs, classes = caixas[ordem], confs[ordem], classes[ordem]
+    areas = np.maximum(caixas[:, 2] - caixas[:, 0], 0) * np.maximum(caixas[:, 3] - caixas[:, 1], 0)
+
+    x1 = np.maximum(caixas[:, None, 0], caixas[None, :, 0])
+    y1 = np.maximum(caixas[:, None, 1], caixas[None, :, 1])
+    x2 = np.minimum(caixas[:, None, 2], caixas[None, :, 2])
+    y2 = np.minimum(caixas[:, None, 3], caixas[None, :, 3])
+    inter = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    if metrica == "ios":
+        base = np.minimum(areas[:, None], areas[None, :])
+    else:
+        base = areas[:, None] + areas[None, :] - inter
+    sobreposicao = inter / np.maximum(base, 1e-9)
+    # Classes diferentes nunca se suprimem
+    sobreposicao[classes[:, None] != classes[None, :]] = 0.0
+
+    suprimida = np.zeros(len(confs), dtype=bool)
+    mantidas = []
+    for i in range(len(confs)):
+        if suprimida[i]:
+            continue
+        grupo = (sobreposicao[i] > limiar) & ~suprimida
+        grupo[i] = True
+        suprimida |= grupo
+        mantidas.append(i)
+        if unir:
+            membros = caixas[grupo]
+            caixas[i] = (membros[:, 0].min(), membros[:, 1].min(), membros[:, 2].max(), membros[:, 3].max())
+    mantidas = np.array(mantidas, dtype=np.int64)
+    return caixas[mantidas], confs[mantidas], classes[mantidas]
+
+
+def caixas_do_resultado(resultado):
+    """(xyxy Nx4, conf N, cls N) de um Results do YOLO, sem laço em Python por caixa."""
+    boxes = resultado.boxes
+    if len(boxes) == 0:
+        return np.empty((0, 4)), np.empty(0), np.empty(0, np.int64)
+    return (np.asarray(boxes.xyxy.cpu().numpy(), dtype=np.float64).reshape(-1, 4),
+            np.asarray(boxes.conf.cpu().numpy(), dtype=np.float64).reshape(-1),
+            np.asarray(boxes.cls.cpu().numpy()).reshape(-1).astype(np.int64))
+
+
+class DetectorLadrilhado:
+    """
+    Troca o `detectar_veiculos` de uma passada só: `detectar(frame)` devolve a
+    lista ([x, y, w, h], conf, cls) que o DeepSort espera.
+    """
+
+    def __init__(self, model, classes_veiculos, tamanho=640, sobreposicao=0.2, conf=0.5,
+                 limiar_nms=0.6, adaptativo=False, passada_global=True, intervalo_completo=15,
+                 memoria=5, lote_max=None):
+        self.model = model
+        self.classes_veiculos = classes_veiculos
+        self.tamanho = tamanho
+        self.sobreposicao = sobreposicao
+        self.conf = conf
+        self.limiar_nms = limiar_nms
+        self.adaptativo = adaptativo
+        self.passada_global = passada_global
+        self.intervalo_completo = intervalo_completo
+        self.memoria = memoria
+        self.lote_max = lote_max
+
+        self.ladrilhos = None
+        self.dimensoes = None
+        self.ultima_deteccao = None  # por ladrilho, o último frame em que algo foi detectado nele
+        self.n_frame = 0
+        self.ladrilhos_rodados = 0
+
+    def _preparar(self, frame):
+        altura, largura = frame.shape[:2]
+        if self.dimensoes != (largura, altura):
+            self.dimensoes = (largura, altura)
+            self.ladrilhos = gerar_ladrilhos(largura, altura, self.tamanho, self.sobreposicao)
+            self.ultima_deteccao = np.full(len(self.ladrilhos), -(1 << 30), dtype=np.int64)
+            self.n_frame = 0
+
+    def _escolher(self):
+        """Máscara dos ladrilhos que rodam neste frame."""
+        if not self.adaptativo or self.n_frame % self.intervalo_completo == 0:
+            return np.ones(len(self.ladrilhos), dtype=bool)
+        return self.ultima_deteccao >= self.n_frame - self.memoria
+
+    def _predict(self, imagens):
+        resultados = []
+        passo = self.lote_max or len(imagens)
+        for i in range(0, len(imagens), passo):
+            resultados.extend(self.model.predict(source=imagens[i:i + passo], conf=self.conf,
+                                                 classes=self.classes_veiculos, imgsz=self.tamanho,
+                                                 verbose=False))
+        return resultados
+
+    def detectar(self, frame):
+        self._preparar(frame)
+        escolhidos = self._escolher()
+        origens = self.ladrilhos[escolhidos]
+        imagens = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in origens.tolist()]
+        deslocamentos = [origem[:2] for origem in origens]
+        # Ladrilho único = frame inteiro: a passada global seria repetida
+        if self.passada_global and (len(self.ladrilhos) > 1 or not escolhidos.any()):
+            imagens.append(frame)
+            deslocamentos.append(np.zeros(2, dtype=np.int64))
+
+        with cronometro("estagio", estagio="predict"):
+            resultados = self._predict(imagens) if imagens else []
+
+        with cronometro("estagio", estagio="nms_ladrilhos"):
+            partes = [caixas_do_resultado(r) for r in resultados]
+            caixas = np.concatenate([p[0] + np.tile(d, 2) for p, d in zip(partes, deslocamentos)]
+                                    or [np.empty((0, 4))])
+            confs = np.concatenate([p[1] for p in partes] or [np.empty(0)])
+            classes = np.concatenate([p[2] for p in partes] or [np.empty(0, np.int64)])
+            caixas, confs, classes = nms(caixas, confs, classes, self.limiar_nms)
+
+            # Cada detecção mantém ativo só o ladrilho de centro mais próximo do dela, o
+            # que tem mais margem em volta do veículo; os vizinhos da sobreposição ficam de fora
+            if len(caixas):
+                centros = (caixas[:, :2] + caixas[:, 2:]) / 2
+                centros_ladrilhos = (self.ladrilhos[:, :2] + self.ladrilhos[:, 2:]) / 2
+                distancias = np.abs(centros[:, None, :] - centros_ladrilhos[None, :, :]).max(axis=2)
+                self.ultima_deteccao[distancias.argmin(axis=1)] = self.n_frame
+
+        self.n_frame += 1
+        self.ladrilhos_rodados += int(escolhidos.sum())
+        metricas.definir("ladrilhos_por_frame", int(escolhidos.sum()))
+        return [([x1, y1, x2 - x1, y2 - y1], conf, cls) for (x1, y1, x2, y2), conf, cls in
+                zip(caixas.tolist(), confs.tolist(), classes.tolist()) if cls in self.classes_veiculos]
+
+    def estatisticas(self):
+        total = len(self.ladrilhos) if self.ladrilhos is not None else 0
+        media = self.ladrilhos_rodados / self.n_frame if self.n_frame else 0.0
+        return {"ladrilhos": total, "frames": self.n_frame, "ladrilhos_por_frame": media,
+                "fracao_rodada": media / total if total else 0.0}
@@ -0,0 +1,215 @@
+"""
+Instrumentação dos pontos quentes: cronômetros por estágio, contadores e
+medidores (profundidade de filas, frames descartados, latência captura ->
+exibição), expostos num endpoint HTTP local no formato texto do Prometheus e,
+opcionalmente, desenhados por cima do vídeo.
+
+Desligada por padrão: com ATIVO = False, `cronometro` devolve um objeto nulo e
+as demais funções retornam na primeira linha. Para ligar:
+    CAREVISION_METRICAS=1 [CAREVISION_METRICAS_PORTA=9108] [CAREVISION_OVERLAY=1]
+e chamar configurar_pelo_ambiente() no início do programa.
+"""
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ATIVO = False
+OVERLAY = False
+PORTA_PADRAO = 9108
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class _Nulo:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULO = _Nulo()
+
+
+class _Histograma:
+    def __init__(self):
+        self.contagens = [0] * (len(BUCKETS) + 1)
+        self.soma = 0.0
+        self.n = 0
+        self.media_movel = None
+
+    def observar(self, valor):
+        i = 0
+        while i < len(BUCKETS) and valor > BUCKETS[i]:
+            i += 1
+        self.contagens[i] += 1
+        self.soma += valor
+        self.n += 1
+        self.media_movel = valor if self.media_movel is None else 0.9 * self.media_movel + 0.1 * valor
+
+
+class Registro:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histogramas = {}
+        self.contadores = {}
+        self.medidores = {}
+
+    @staticmethod
+    def _chave(nome, rotulos):
+        return nome, tuple(sorted(rotulos.items()))
+
+    def observar(self, nome, valor, rotulos):
+        chave = self._chave(nome, rotulos)
+        with self.lock:
+            hist = self.histogramas.get(chave)
+            if hist is None:
+                hist = self.histogramas[chave] = _Histograma()
+            hist.observar(valor)
+
+    def incrementar(self, nome, valor, rotulos):
+        chave = self._chave(nome, rotulos)
+        with self.lock:
+            self.contadores[chave] = self.contadores.get(chave, 0) + valor
+
+    def definir(self, nome, valor, rotulos):
+        with self.lock:
+            self.medidores[self._chave(nome, rotulos)] = valor
+
+    def medias_moveis(self, nome):
+        """{rótulos: média móvel em segundos} de um histograma (usado no overlay)."""
+        with self.lock:
+            return {rotulos: h.media_movel for (n, rotulos), h in self.histogramas.items() if n == nome}
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus."""
+        linhas = []
+        with self.lock:
+            nomes = sorted({n for n, _ in self.histogramas})
+            for nome in nomes:
+                linhas.append(f"# TYPE carevision_{nome}_segundos histogram")
+                for (n, rotulos), h in sorted(self.histogramas.items()):
+                    if n != nome:
+                        continue
+                    acumulado = 0
+                    for limite, contagem in zip(BUCKETS + ("+Inf",), h.contagens):
+                        acumulado += contagem
+                        le = limite if limite == "+Inf" else repr(limite)
+                        linhas.append(f"carevision_{nome}_segundos_bucket{_rotulos(rotulos, le=le)} {acumulado}")
+                    linhas.append(f"carevision_{nome}_segundos_sum{_rotulos(rotulos)} {h.soma}")
+                    linhas.append(f"carevision_{nome}_segundos_count{_rotulos(rotulos)} {h.n}")
+            for tipo, dados in (("counter", self.contadores), ("gauge", self.medidores)):
+                for nome in sorted({n for n, _ in dados}):
+                    linhas.append(f"# TYPE carevision_{nome} {tipo}")
+                    for (n, rotulos), valor in sorted(dados.items()):
+                        if n == nome:
+                            linhas.append(f"carevision_{nome}{_rotulos(rotulos)} {valor}")
+        return "\n".join(linhas) + "\n"
+
+
+def _rotulos(rotulos, **extra):
+    pares = list(rotulos) + list(extra.items())
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pares) + "}"
+
+
+REGISTRO = Registro()
+
+
+class _Cronometro:
+    __slots__ = ("nome", "rotulos", "t0")
+
+    def __init__(self, nome, rotulos):
+        self.nome = nome
+        self.rotulos = rotulos
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        REGISTRO.observar(self.nome, time.perf_counter() - self.t0, self.rotulos)
+        return False
+
+
+def cronometro(nome, **rotulos):
+    """`with cronometro("predict", camera=0): ...` registra a duração do bloco."""
+    if not ATIVO:
+        return _NULO
+    return _Cronometro(nome, rotulos)
+
+
+def observar(nome, segundos, **rotulos):
+    if not ATIVO:
+        return
+    REGISTRO.observar(nome, segundos, rotulos)
+
+
+def incrementar(nome, valor=1, **rotulos):
+    if not ATIVO:
+        return
+    REGISTRO.incrementar(nome, valor, rotulos)
+
+
+def definir(nome, valor, **rotulos):
+    if not ATIVO:
+        return
+    REGISTRO.definir(nome, valor, rotulos)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        corpo = REGISTRO.exportar().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def iniciar_servidor(porta=PORTA_PADRAO, host="127.0.0.1"):
+    """Sobe o endpoint /metrics numa thread daemon. Retorna o servidor."""
+    servidor = ThreadingHTTPServer((host, porta), _Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def ativar(servidor=True, porta=PORTA_PADRAO, overlay=False):
+    global ATIVO, OVERLAY
+    ATIVO = True
+    OVERLAY = overlay
+    if servidor:
+        return iniciar_servidor(porta)
+    return None
+
+
+def configurar_pelo_ambiente():
+    if os.environ.get("CAREVISION_METRICAS") == "1":
+        porta = int(os.environ.get("CAREVISION_METRICAS_PORTA", PORTA_PADRAO))
+        ativar(porta=porta, overlay=os.environ.get("CAREVISION_OVERLAY") == "1")
+        print(f"[metricas] Endpoint em http://127.0.0.1:{porta}/metrics")
+
+
+def desenhar_overlay(frame, nome="estagio", **filtro):
+    """Escreve no canto do frame a média móvel (ms) de cada estágio do histograma `nome`."""
+    if not (ATIVO and OVERLAY):
+        return
+    import cv2
+    y = 20
+    for rotulos, media in sorted(REGISTRO.medias_moveis(nome).items()):
+        dic = dict(rotulos)
+        if any(dic.get(k) != str(v) and dic.get(k) != v for k, v in filtro.items()):
+            continue
+        texto = f"{dic.get('estagio', nome)}: {media * 1000:.1f} ms"
+        cv2.putText(frame, texto, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3)
+        cv2.putText(frame, texto, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        y += 18
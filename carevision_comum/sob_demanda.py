@@ -0,0 +1,78 @@
+import threading
+import time
+import numpy as np
+
+
+class SobDemanda:
+    """
+    Adia a construção de um objeto pesado (modelo YOLO, DeepSort) até o
+    primeiro uso. Os atributos são repassados ao objeto real, então
+    `SobDemanda(...).predict(...)` funciona onde o código espera o modelo.
+    A construção acontece uma única vez, mesmo com várias threads; o
+    aquecimento, se houver, roda junto dela, antes de o objeto ser entregue.
+    """
+
+    def __init__(self, fabrica, nome="objeto"):
+        self._fabrica = fabrica
+        self._nome = nome
+        self._objeto = None
+        self._lock = threading.Lock()
+        self._aquecimento = None
+        self.tempo_carga = None  # segundos gastos na fábrica (e no aquecimento)
+
+    def obter(self):
+        objeto = self._objeto
+        if objeto is None:
+            with self._lock:
+                if self._objeto is None:
+                    t0 = time.perf_counter()
+                    objeto = self._fabrica()
+                    if self._aquecimento is not None:
+                        self._aquecer(objeto)
+                    self.tempo_carga = time.perf_counter() - t0
+                    # Só publicado depois de aquecido: ninguém usa o objeto durante o aquecimento
+                    self._objeto = objeto
+                objeto = self._objeto
+        return objeto
+
+    def carregado(self):
+        return self._objeto is not None
+
+    def __getattr__(self, nome):
+        # Só é chamado para atributos que não existem no proxy
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        return getattr(self.obter(), nome)
+
+    def _aquecer(self, objeto):
+        try:
+            self._aquecimento(objeto)
+        except Exception as e:
+            # Sem aquecimento o objeto ainda funciona; só o primeiro uso fica mais lento
+            print(f"[sob_demanda] Falha ao aquecer {self._nome}: {e}")
+
+    def aquecer_em_segundo_plano(self, aquecimento=None):
+        """
+        Constrói o objeto numa thread daemon e, se dado, roda `aquecimento(objeto)`
+        ainda dentro da construção. Quem usar o objeto antes disso espera as
+        duas coisas terminarem; se o objeto já tinha sido construído, não há
+        aquecimento (o primeiro uso já pagou por ele).
+        """
+        self._aquecimento = aquecimento
+
+        def rodar():
+            try:
+                self.obter()
+            except Exception as e:
+                # O erro reaparece no primeiro uso de verdade, com o traceback no lugar certo
+                print(f"[sob_demanda] Falha ao preparar {self._nome}: {e}")
+
+        thread = threading.Thread(target=rodar, daemon=True)
+        thread.start()
+        return thread
+
+
+def aquecer_modelo(modelo, input_size=640):
+    """Um predict num frame preto do tamanho de entrada paga a montagem do grafo e a fusão das camadas."""
+    frame = np.zeros((input_size, input_size, 3), np.uint8)
+    modelo.predict(source=frame, conf=0.5, verbose=False)